@@ -0,0 +1,222 @@
+# availability_benchmark.py
+"""
+Comparación del motor de disponibilidad con la implementación anterior.
+
+Archivo: availability_benchmark.py
+Propósito: Medir is_time_available y get_available_time_slots sobre un día
+           completamente ocupado, con el motor de intervalos (core/availability.py)
+           y con el cálculo anterior por listas de horas "HH:MM", y comprobar que
+           ambos dan el mismo resultado.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python benchmarks/availability_benchmark.py [--chairs 4] [--repeat 20]
+    python benchmarks/availability_benchmark.py --db benchmarks/data/bench_100k.db
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.run_benchmarks import time_benchmark
+from core.appointment_manager import AppointmentManager
+from core.availability import DayAvailability, to_minutes
+from db.database import DatabaseManager
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_REPEAT = 20
+DEFAULT_CHAIRS = 1
+BOOKED_DATE = '2025-03-10'
+OPEN_HOUR = 9
+CLOSE_HOUR = 18
+DURATIONS = (15, 30, 60)
+# Consultas de is_time_available por iteración (una por cuarto de hora del día)
+PROBES = [(f"{h:02d}:{m:02d}", f"{h + (m + 30) // 60:02d}:{(m + 30) % 60:02d}")
+          for h in range(OPEN_HOUR, CLOSE_HOUR) for m in (0, 15, 30, 45)]
+
+
+# =============================================
+# Implementación anterior (referencia)
+# =============================================
+def legacy_is_time_available(db: DatabaseManager, date: str, start_time: str, end_time: str) -> bool:
+    """Comprobación anterior: tres comparaciones de texto unidas con OR."""
+    query = """
+            SELECT id
+            FROM appointments
+            WHERE date = ?
+              AND status != 'cancelled'
+              AND ((start_time < ? AND end_time > ?)
+                OR (start_time < ? AND end_time > ?)
+                OR (start_time >= ? AND end_time <= ?))
+            """
+    params = (date, end_time, start_time, start_time, end_time, start_time, end_time)
+    return len(db.execute_query(query, params, fetch_all=True)) == 0
+
+
+def legacy_available_time_slots(db: DatabaseManager, date: str, duration: int) -> List[str]:
+    """Cálculo anterior: citas del día con JOIN a pacientes y lista de cuartos de hora ocupados."""
+    query = """
+            SELECT a.*, p.first_name, p.last_name
+            FROM appointments a
+                     JOIN patients p ON a.patient_id = p.id
+            WHERE a.date = ?
+            ORDER BY a.start_time
+            """
+    booked_slots = []
+    for appt in db.execute_query(query, (date,), fetch_all=True):
+        if appt['status'] == 'cancelled':
+            continue
+        current = datetime.strptime(appt['start_time'], '%H:%M')
+        end = datetime.strptime(appt['end_time'], '%H:%M')
+        while current < end:
+            booked_slots.append(current.strftime('%H:%M'))
+            current += timedelta(minutes=15)
+
+    available_slots = []
+    for hour in range(OPEN_HOUR, CLOSE_HOUR):
+        for minute in [0, 15, 30, 45]:
+            slot_time = datetime(2020, 1, 1, hour, minute)
+            end_time = slot_time + timedelta(minutes=duration)
+            current = slot_time
+            is_available = True
+            while current < end_time:
+                if current.strftime('%H:%M') in booked_slots:
+                    is_available = False
+                    break
+                current += timedelta(minutes=15)
+            if is_available and end_time <= datetime(2020, 1, 1, CLOSE_HOUR, 0):
+                available_slots.append(slot_time.strftime('%H:%M'))
+    return available_slots
+
+
+# =============================================
+# Datos de la prueba
+# =============================================
+def build_booked_day(db: DatabaseManager, chairs: int) -> str:
+    """
+    Llena un día de citas consecutivas de 30 minutos en varios gabinetes.
+
+    Sólo queda libre la última media hora (la búsqueda recorre el día entero) y
+    cada séptima cita tiene además una cita cancelada en el mismo horario.
+
+    Returns:
+        str: Fecha ocupada
+    """
+    patient_id = db.insert_record('patients', {'first_name': 'Prueba', 'last_name': 'Disponibilidad'})
+    rows = []
+    for _ in range(chairs):
+        for index, start in enumerate(range(OPEN_HOUR * 60, CLOSE_HOUR * 60 - 30, 30)):
+            times = {
+                'start_time': f"{start // 60:02d}:{start % 60:02d}",
+                'end_time': f"{(start + 30) // 60:02d}:{(start + 30) % 60:02d}",
+            }
+            rows.append(dict(times, patient_id=patient_id, date=BOOKED_DATE, status='scheduled'))
+            if index % 7 == 0:
+                rows.append(dict(times, patient_id=patient_id, date=BOOKED_DATE, status='cancelled'))
+    db.insert_records('appointments', rows)
+    return BOOKED_DATE
+
+
+def busiest_date(db: DatabaseManager) -> str:
+    """Fecha con más citas no canceladas de una base de datos existente."""
+    row = db.execute_query(
+        """
+        SELECT date, COUNT(*) AS total
+        FROM appointments
+        WHERE status != 'cancelled'
+        GROUP BY date
+        ORDER BY total DESC
+        LIMIT 1
+        """,
+        fetch_one=True
+    )
+    return row['date']
+
+
+# =============================================
+# Ejecución
+# =============================================
+def _check_probes(availability: DayAvailability) -> List[bool]:
+    """Comprueba todos los horarios de PROBES sobre una ocupación ya cargada."""
+    return [availability.is_free(to_minutes(start), to_minutes(end)) for start, end in PROBES]
+
+
+def run(db: DatabaseManager, date: str, repeat: int) -> List[Tuple[str, Dict[str, float], Dict[str, float]]]:
+    """
+    Mide cada operación con las dos implementaciones tras comprobar que coinciden.
+
+    Returns:
+        list: Tuplas (operación, tiempos anteriores, tiempos actuales)
+
+    Raises:
+        AssertionError: Si las dos implementaciones dan resultados distintos
+    """
+    manager = AppointmentManager(db)
+    cases: List[Tuple[str, Callable[[], Any], Callable[[], Any]]] = [
+        (
+            f"is_time_available[x{len(PROBES)}]",
+            lambda: [legacy_is_time_available(db, date, start, end) for start, end in PROBES],
+            lambda: [manager.is_time_available(date, start, end) for start, end in PROBES],
+        ),
+        (
+            f"get_day_availability + is_free[x{len(PROBES)}]",
+            lambda: [legacy_is_time_available(db, date, start, end) for start, end in PROBES],
+            lambda: _check_probes(manager.get_day_availability(date)),
+        ),
+    ]
+    for duration in DURATIONS:
+        cases.append((
+            f"get_available_time_slots[{duration} min]",
+            lambda duration=duration: legacy_available_time_slots(db, date, duration),
+            lambda duration=duration: manager.get_available_time_slots(
+                date, duration, OPEN_HOUR, CLOSE_HOUR
+            ),
+        ))
+
+    results = []
+    for name, legacy, current in cases:
+        assert legacy() == current(), f"{name}: los resultados no coinciden"
+        results.append((name, time_benchmark(legacy, repeat), time_benchmark(current, repeat)))
+    return results
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Compara el motor de disponibilidad con el cálculo anterior")
+    parser.add_argument('--db', help="Base de datos existente (se usa su día con más citas)")
+    parser.add_argument('--chairs', type=int, default=DEFAULT_CHAIRS,
+                        help="Gabinetes ocupados en paralelo en el día generado")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Ejecuciones medidas por prueba")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db = DatabaseManager(args.db)
+            date = busiest_date(db)
+        else:
+            db = DatabaseManager(os.path.join(tmp, 'availability.db'))
+            date = build_booked_day(db, args.chairs)
+
+        total = db.execute_query("SELECT COUNT(*) AS total FROM appointments WHERE date = ?", (date,), fetch_one=True)
+        print(f"Día {date}: {total['total']} citas")
+        print(f"  {'operación':<36}{'anterior (ms)':>15}{'actual (ms)':>15}{'mejora':>10}")
+        for name, legacy, current in run(db, date, args.repeat):
+            speedup = legacy['median_ms'] / current['median_ms'] if current['median_ms'] else float('inf')
+            print(f"  {name:<36}{legacy['median_ms']:>15.3f}{current['median_ms']:>15.3f}{speedup:>9.1f}x")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# booking_stress.py
+"""
+Prueba de concurrencia de la reserva de citas.
+
+Archivo: booking_stress.py
+Propósito: Lanzar varios procesos que reservan a la vez horarios solapados de la
+           misma agenda (como varios puestos de recepción sobre la misma base de
+           datos) y comprobar que no queda ninguna cita solapada.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python benchmarks/booking_stress.py [--workers 8] [--bookings 100]
+    python benchmarks/booking_stress.py --unsafe    # flujo anterior: comprobar y luego insertar
+
+Sale con código 1 si encuentra citas solapadas.
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.appointment_manager import AppointmentManager, BookingResult
+from core.availability import to_hhmm
+from db.database import DatabaseManager
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_WORKERS = 8
+DEFAULT_BOOKINGS = 100       # Reservas que intenta cada proceso
+DEFAULT_DAYS = 2             # Días de agenda en disputa
+STRESS_DATES = ['2025-06-02', '2025-06-03', '2025-06-04', '2025-06-05', '2025-06-06']
+OPEN_MINUTE = 9 * 60
+CLOSE_MINUTE = 14 * 60
+DURATIONS = (15, 30, 45, 60)
+
+
+# =============================================
+# Procesos de reserva
+# =============================================
+def _requests(seed: int, count: int, days: int) -> List[Tuple[str, str, str]]:
+    """Horarios (fecha, inicio, fin) que intenta reservar un proceso, en cuartos de hora."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        duration = rng.choice(DURATIONS)
+        start = rng.randrange(OPEN_MINUTE, CLOSE_MINUTE - duration + 1, 15)
+        requests.append((rng.choice(STRESS_DATES[:days]), to_hhmm(start), to_hhmm(start + duration)))
+    return requests
+
+
+def _unsafe_book(manager: AppointmentManager, patient_id: int, date: str, start: str, end: str) -> str:
+    """Flujo anterior: comprobación y alta en dos pasos independientes."""
+    if not manager.is_time_available(date, start, end):
+        return BookingResult.CONFLICT
+    manager.db_manager.insert_record('appointments', {
+        'patient_id': patient_id, 'date': date, 'start_time': start, 'end_time': end, 'status': 'scheduled'
+    })
+    return BookingResult.BOOKED
+
+
+def worker(db_path: str, patient_id: int, seed: int, count: int, days: int, unsafe: bool,
+           barrier, results) -> None:
+    """
+    Proceso de reserva: espera al resto y reserva sus horarios lo más rápido posible.
+
+    Args:
+        db_path (str): Base de datos compartida
+        patient_id (int): Paciente de las citas
+        seed (int): Semilla de los horarios de este proceso
+        count (int): Reservas a intentar
+        days (int): Días de agenda en disputa
+        unsafe (bool): Usar el flujo anterior en lugar de create_appointment
+        barrier: multiprocessing.Barrier para arrancar todos a la vez
+        results: multiprocessing.Queue donde se deja el recuento de estados
+    """
+    manager = AppointmentManager(DatabaseManager(db_path))
+    requests = _requests(seed, count, days)
+    statuses = Counter()
+    barrier.wait()
+    started = time.perf_counter()
+    for date, start, end in requests:
+        if unsafe:
+            statuses[_unsafe_book(manager, patient_id, date, start, end)] += 1
+        else:
+            result = manager.create_appointment(patient_id, date, start, end, '', 'Prueba de concurrencia')
+            statuses[result.status] += 1
+            statuses['retries'] += result.attempts - 1
+    statuses['seconds'] = time.perf_counter() - started
+    manager.db_manager.close_all()
+    results.put(dict(statuses))
+
+
+# =============================================
+# Comprobación
+# =============================================
+def count_overlaps(db: DatabaseManager) -> int:
+    """Número de pares de citas no canceladas que se solapan."""
+    row = db.execute_query(
+        """
+        SELECT COUNT(*) AS total
+        FROM appointments a
+                 JOIN appointments b
+                      ON b.date = a.date
+                          AND b.id > a.id
+                          AND b.start_time < a.end_time
+                          AND b.end_time > a.start_time
+        WHERE a.status != 'cancelled'
+          AND b.status != 'cancelled'
+        """,
+        fetch_one=True
+    )
+    return row['total']
+
+
+def run(workers: int, bookings: int, days: int, unsafe: bool, db_path: str) -> Dict[str, float]:
+    """
+    Lanza los procesos de reserva y reúne sus resultados.
+
+    Returns:
+        dict: Recuento total de estados, reintentos, citas creadas y solapes
+    """
+    db = DatabaseManager(db_path)
+    patient_id = db.insert_record('patients', {'first_name': 'Prueba', 'last_name': 'Concurrencia'})
+    db.close_all()
+
+    # spawn: cada proceso abre sus propias conexiones, igual que en Windows
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker,
+                        args=(db_path, patient_id, seed, bookings, days, unsafe, barrier, results))
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    totals = Counter()
+    slowest = 0.0
+    for _ in processes:
+        statuses = results.get()
+        slowest = max(slowest, statuses.pop('seconds'))
+        totals.update(statuses)
+    for process in processes:
+        process.join()
+
+    db = DatabaseManager(db_path)
+    totals['appointments'] = db.execute_query("SELECT COUNT(*) AS total FROM appointments", fetch_one=True)['total']
+    totals['overlaps'] = count_overlaps(db)
+    db.close_all()
+    totals['seconds'] = round(slowest, 2)
+    return dict(totals)
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Prueba de reservas concurrentes sin solapes")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Procesos que reservan a la vez")
+    parser.add_argument('--bookings', type=int, default=DEFAULT_BOOKINGS, help="Reservas por proceso")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, choices=range(1, len(STRESS_DATES) + 1),
+                        help="Días de agenda en disputa")
+    parser.add_argument('--unsafe', action='store_true',
+                        help="Usar el flujo anterior (comprobar y después insertar) para comparar")
+    parser.add_argument('--db', help="Base de datos a usar (por defecto, una temporal)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db or os.path.join(tmp, 'booking_stress.db')
+        totals = run(args.workers, args.bookings, args.days, args.unsafe, db_path)
+
+    mode = "flujo anterior" if args.unsafe else "create_appointment"
+    print(f"{args.workers} procesos x {args.bookings} reservas ({mode}) en {totals.pop('seconds')} s")
+    for name, value in sorted(totals.items()):
+        print(f"  {name:<14}{value}")
+    if totals['overlaps']:
+        print("\nHay citas solapadas")
+        sys.exit(1)
+    print("\nNinguna cita solapada")
+
+
+if __name__ == "__main__":
+    main()
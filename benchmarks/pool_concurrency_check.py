@@ -0,0 +1,132 @@
+# pool_concurrency_check.py
+"""
+Verificación del pool de conexiones con más hilos que conexiones.
+
+Archivo: pool_concurrency_check.py
+Propósito: Mantener vivos a la vez más hilos que conexiones tiene el pool (como
+           la interfaz, el hilo de envío de notificaciones y los reportes) y
+           comprobar que todos consultan sin agotar el pool y que ningún hilo
+           retiene una conexión entre operaciones.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python benchmarks/pool_concurrency_check.py [--threads 15] [--rounds 20]
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.notification_outbox import OutboxWorker
+from db.connection_pool import DEFAULT_POOL_SIZE
+from db.database import DatabaseManager
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_THREADS = DEFAULT_POOL_SIZE * 3
+DEFAULT_ROUNDS = 20
+PAUSE_SECONDS = 0.005  # Espera entre operaciones de cada hilo (un usuario o un ciclo de trabajo)
+
+
+# =============================================
+# Comprobaciones
+# =============================================
+def _client(db: DatabaseManager, index: int, rounds: int, barrier: threading.Barrier,
+            finished: threading.Event, errors: List[str]) -> None:
+    """Hilo de larga duración: consultas sueltas, lecturas perezosas anidadas y transacciones."""
+    try:
+        barrier.wait()
+        for round_number in range(rounds):
+            db.execute_query("SELECT COUNT(*) AS total FROM patients", fetch_one=True)
+            for row in db.iter_query("SELECT id FROM patients ORDER BY id LIMIT 3"):
+                # Consulta anidada: debe usar la misma conexión que iter_query
+                db.execute_query("SELECT first_name FROM patients WHERE id = ?", (row['id'],), fetch_one=True)
+            with db.transaction(immediate=True):
+                db.insert_record('patients', {'first_name': f"Hilo {index}", 'last_name': f"Ronda {round_number}"})
+            time.sleep(PAUSE_SECONDS)
+    except Exception as e:
+        errors.append(f"hilo {index}: {e}")
+    finally:
+        # El hilo sigue vivo hasta el final, como los de la aplicación
+        barrier.wait()
+        finished.wait()
+
+
+def check(threads: int = DEFAULT_THREADS, rounds: int = DEFAULT_ROUNDS) -> List[str]:
+    """
+    Ejecuta los hilos a la vez y comprueba el estado del pool.
+
+    Args:
+        threads (int): Hilos simultáneos (más que DEFAULT_POOL_SIZE)
+        rounds (int): Operaciones de cada hilo
+
+    Returns:
+        list: Descripción de cada problema (vacía si todo fue bien)
+    """
+    errors: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'pool_concurrency_check.db'))
+        worker = OutboxWorker(db, sender=lambda notification: True, interval=0.01).start()
+
+        barrier = threading.Barrier(threads + 1)
+        finished = threading.Event()
+        clients = [
+            threading.Thread(target=_client, args=(db, index, rounds, barrier, finished, errors), daemon=True)
+            for index in range(threads)
+        ]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        barrier.wait()  # Todos vivos: empiezan a la vez
+        barrier.wait()  # Todos terminaron sus operaciones y siguen vivos
+        elapsed = time.perf_counter() - start
+
+        stats = db.pool.stats()
+        finished.set()
+        for client in clients:
+            client.join()
+        worker.stop()
+
+        total = db.execute_query("SELECT COUNT(*) AS total FROM patients", fetch_one=True)['total']
+        if total != threads * rounds and not errors:
+            errors.append(f"se insertaron {total} pacientes en lugar de {threads * rounds}")
+        if stats['assigned'] > 1:
+            # Sólo el hilo de envío puede estar a mitad de un ciclo
+            errors.append(f"{stats['assigned']} conexiones siguen asignadas a hilos ociosos")
+        if stats['assigned'] + stats['idle'] > stats['pool_size']:
+            errors.append(f"el pool abrió {stats['assigned'] + stats['idle']} conexiones (máximo {stats['pool_size']})")
+        print(f"{threads} hilos x {rounds} rondas con un pool de {stats['pool_size']} conexiones: {elapsed:.2f} s")
+        db.close_all()
+    return errors
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Comprobar el pool de conexiones con más hilos que conexiones")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="Hilos simultáneos")
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help="Operaciones por hilo")
+    args = parser.parse_args()
+
+    errors = check(args.threads, args.rounds)
+    for error in errors:
+        print(f"ERROR  {error}")
+    if errors:
+        print(f"\n{len(errors)} problema(s) con el pool de conexiones")
+        sys.exit(1)
+    print("El pool de conexiones atiende a todos los hilos")
+
+
+if __name__ == "__main__":
+    main()
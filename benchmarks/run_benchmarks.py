@@ -0,0 +1,269 @@
+# run_benchmarks.py
+"""
+Pruebas de rendimiento de los gestores principales.
+
+Archivo: run_benchmarks.py
+Propósito: Medir los puntos de entrada más usados (búsqueda de pacientes,
+           disponibilidad de horarios, reportes y tratamientos populares) sobre una
+           base de datos sintética, guardar los resultados en JSON y compararlos
+           con una ejecución de referencia.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python benchmarks/run_benchmarks.py --scale 100k --output resultados.json
+    python benchmarks/run_benchmarks.py --scale 100k --baseline referencia.json --fail-on-regression
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.synthetic_data import SCALES, default_db_path, generate
+from core.appointment_manager import AppointmentManager
+from core.patient_manager import PatientManager
+from core.treatment_manager import TreatmentManager
+from db.database import DatabaseManager
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.20  # Una mediana un 20 % más lenta que la referencia es una regresión
+BENCHMARK_SEED = 7
+
+# Benchmark: (nombre, función sin argumentos que ejecuta una iteración)
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+# =============================================
+# Definición de las pruebas
+# =============================================
+def _sample_dates(db: DatabaseManager, rng: random.Random, count: int) -> List[str]:
+    """Fechas con citas elegidas al azar (deterministas)."""
+    bounds = db.execute_query("SELECT MIN(date) AS first, MAX(date) AS last FROM appointments", fetch_one=True)
+    first = datetime.date.fromisoformat(bounds['first'])
+    span = (datetime.date.fromisoformat(bounds['last']) - first).days
+    return [(first + datetime.timedelta(days=rng.randrange(span + 1))).isoformat() for _ in range(count)]
+
+
+def build_benchmarks(db: DatabaseManager) -> Tuple[List[Benchmark], Dict[str, str]]:
+    """
+    Prepara las pruebas sobre la base de datos indicada.
+
+    Args:
+        db (DatabaseManager): Base de datos sintética
+
+    Returns:
+        tuple: (pruebas, pruebas omitidas con el motivo)
+    """
+    rng = random.Random(BENCHMARK_SEED)
+    patients = PatientManager(db)
+    appointments = AppointmentManager(db)
+    treatments = TreatmentManager(db)
+    dates = _sample_dates(db, rng, 20)
+    last_date = max(dates)
+    month_start = f"{last_date[:7]}-01"
+    year_start = f"{int(last_date[:4]) - 1}{last_date[4:]}"
+
+    benchmarks: List[Benchmark] = [
+        ('PatientManager.search_patients[apellido]', lambda: patients.search_patients('Martínez')),
+        ('PatientManager.search_patients[nombre_parcial]', lambda: patients.search_patients('Alej')),
+        ('PatientManager.search_patients[telefono]', lambda: patients.search_patients('612')),
+        ('PatientManager.search_patients[sin_resultados]', lambda: patients.search_patients('zzzz')),
+        ('AppointmentManager.is_time_available[x20]', lambda: [
+            appointments.is_time_available(day, '10:00', '10:30') for day in dates
+        ]),
+        ('AppointmentManager.get_available_time_slots[x20]', lambda: [
+            appointments.get_available_time_slots(day, 30) for day in dates
+        ]),
+        ('AppointmentManager.find_next_slots[60min_mañanas_3sem]', lambda: appointments.find_next_slots(
+            60, dates[0], 21, {'latest': '14:00'}
+        )),
+        ('TreatmentManager.get_popular_treatments[todo]', lambda: treatments.get_popular_treatments()),
+        ('TreatmentManager.get_popular_treatments[anual]', lambda: treatments.get_popular_treatments(year_start, last_date)),
+    ]
+
+    skipped: Dict[str, str] = {}
+    report_names = [
+        'ReportGenerator.generate_income_report[mes]',
+        'ReportGenerator.generate_income_report[año]',
+        'ReportGenerator.generate_worked_hours_report[mes]',
+        'ReportGenerator.generate_empty_hours_report[mes]',
+    ]
+    try:
+        # Depende de pandas, matplotlib y fpdf: si faltan se omiten sólo estas pruebas
+        from core.report_generator import ReportGenerator
+    except ImportError as e:
+        for name in report_names:
+            skipped[name] = f"ImportError: {e}"
+    else:
+        reports = ReportGenerator(db)
+        benchmarks += list(zip(report_names, [
+            lambda: reports.generate_income_report(month_start, last_date),
+            lambda: reports.generate_income_report(year_start, last_date, group_by='month'),
+            lambda: reports.generate_worked_hours_report(month_start, last_date),
+            lambda: reports.generate_empty_hours_report(month_start, last_date),
+        ]))
+
+    return benchmarks, skipped
+
+
+# =============================================
+# Ejecución y comparación
+# =============================================
+def time_benchmark(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Ejecuta una prueba varias veces (más una de calentamiento).
+
+    Args:
+        function (callable): Prueba a medir
+        repeat (int): Número de ejecuciones medidas
+
+    Returns:
+        dict: Tiempos en milisegundos (min, median, mean, max) y repeticiones
+    """
+    function()  # Calentamiento: caché de páginas y de sentencias preparadas
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'max_ms': round(max(samples), 3),
+        'repeat': repeat,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """
+    Compara las medianas con las de una ejecución de referencia.
+
+    Args:
+        results (dict): Resultados actuales
+        baseline (dict): Resultados de referencia (mismo formato)
+        tolerance (float): Aumento relativo permitido antes de considerar regresión
+
+    Returns:
+        dict: Cociente actual/referencia por prueba y lista de regresiones
+    """
+    ratios = {}
+    regressions = []
+    for name, current in results['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or 'median_ms' not in current or 'median_ms' not in reference:
+            continue
+        ratio = current['median_ms'] / reference['median_ms'] if reference['median_ms'] else float('inf')
+        ratios[name] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+
+    return {
+        'baseline_meta': baseline.get('meta', {}),
+        'tolerance': tolerance,
+        'ratios': ratios,
+        'regressions': regressions,
+    }
+
+
+def _table_counts(db: DatabaseManager) -> Dict[str, int]:
+    """Filas de las tablas principales de la base de datos de prueba."""
+    tables = ['patients', 'appointments', 'appointment_treatments', 'payments', 'email_tracking']
+    return {table: db.execute_query(f"SELECT COUNT(*) AS n FROM {table}", fetch_one=True)['n'] for table in tables}
+
+
+def run(db_path: str, scale: str, repeat: int, only: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ejecuta todas las pruebas sobre una base de datos.
+
+    Args:
+        db_path (str): Base de datos sintética
+        scale (str): Escala con la que se generó (informativa)
+        repeat (int): Ejecuciones medidas por prueba
+        only (str): Si se indica, sólo las pruebas cuyo nombre contiene este texto
+
+    Returns:
+        dict: Metadatos de la ejecución y resultados por prueba
+    """
+    db = DatabaseManager(db_path)
+    benchmarks, skipped = build_benchmarks(db)
+
+    results: Dict[str, Any] = {name: {'skipped': reason} for name, reason in skipped.items()}
+    for name, function in benchmarks:
+        if only and only not in name:
+            continue
+        results[name] = time_benchmark(function, repeat)
+        print(f"  {name:<55} {results[name]['median_ms']:>10.2f} ms")
+    for name, reason in skipped.items():
+        print(f"  {name:<55} {'omitida':>13}  ({reason})")
+
+    meta = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'scale': scale,
+        'db_path': os.path.abspath(db_path),
+        'rows': _table_counts(db),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+    db.close_all()
+    return {'meta': meta, 'results': results}
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Pruebas de rendimiento de los gestores")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k', help="Escala de datos sintéticos")
+    parser.add_argument('--db', help="Base de datos a usar (se genera si no existe)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Ejecuciones medidas por prueba")
+    parser.add_argument('--only', help="Ejecutar sólo las pruebas cuyo nombre contiene este texto")
+    parser.add_argument('--output', help="Archivo JSON de resultados")
+    parser.add_argument('--baseline', help="Archivo JSON de referencia con el que comparar")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Aumento relativo permitido")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Salir con código 1 si hay regresiones")
+    args = parser.parse_args()
+
+    db_path = args.db or default_db_path(args.scale)
+    if not os.path.exists(db_path):
+        print(f"Generando datos sintéticos ({args.scale}) en {db_path}")
+        generate(db_path, SCALES[args.scale])
+
+    print(f"Pruebas de rendimiento sobre {db_path}")
+    results = run(db_path, args.scale, args.repeat, args.only)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            results['comparison'] = compare(results, json.load(f), args.tolerance)
+        for name, ratio in results['comparison']['ratios'].items():
+            marker = '  REGRESIÓN' if name in results['comparison']['regressions'] else ''
+            print(f"  {name:<55} x{ratio:<8}{marker}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.fail_on_regression and results.get('comparison', {}).get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
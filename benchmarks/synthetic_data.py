@@ -0,0 +1,393 @@
+# synthetic_data.py
+"""
+Generador determinista de datos sintéticos para pruebas de rendimiento.
+
+Archivo: synthetic_data.py
+Propósito: Llenar una base de datos nueva con pacientes, tratamientos, historial de
+           precios, citas, tratamientos aplicados, pagos y correos enviados en
+           escalas de 10k, 100k o 1M citas, con distribuciones parecidas a las de
+           una clínica real. Con la misma semilla produce siempre los mismos datos.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python benchmarks/synthetic_data.py --scale 100k --db benchmarks/data/bench_100k.db
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.database import DatabaseManager
+from utils.text_utils import patient_search_keys
+
+# =============================================
+# Configuración global
+# =============================================
+# Número de citas de cada escala
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+DEFAULT_SEED = 20250501
+DEFAULT_START_DATE = date(2020, 1, 6)  # Lunes
+APPOINTMENTS_PER_PATIENT = 10          # Media de citas por paciente
+CHUNK_SIZE = 50_000
+
+FIRST_NAMES = [
+    'María', 'Juan', 'Carmen', 'Antonio', 'Ana', 'José', 'Laura', 'Francisco', 'Isabel',
+    'Manuel', 'Lucía', 'David', 'Elena', 'Javier', 'Marta', 'Miguel', 'Sofía', 'Pablo',
+    'Paula', 'Alejandro', 'Cristina', 'Daniel', 'Raquel', 'Sergio', 'Pilar', 'Jorge',
+    'Rosa', 'Carlos', 'Teresa', 'Andrés', 'Noelia', 'Ramón', 'Beatriz', 'Íñigo', 'Nuria',
+]
+LAST_NAMES = [
+    'García', 'González', 'Rodríguez', 'Fernández', 'López', 'Martínez', 'Sánchez',
+    'Pérez', 'Gómez', 'Martín', 'Jiménez', 'Ruiz', 'Hernández', 'Díaz', 'Moreno',
+    'Muñoz', 'Álvarez', 'Romero', 'Alonso', 'Gutiérrez', 'Navarro', 'Torres',
+    'Domínguez', 'Vázquez', 'Ramos', 'Gil', 'Ramírez', 'Serrano', 'Blanco', 'Molina',
+    'Castro', 'Ortiz', 'Rubio', 'Marín', 'Sanz', 'Núñez', 'Iglesias', 'Medina', 'Peña',
+]
+STREETS = ['Calle Mayor', 'Av. Libertad', 'Plaza España', 'Calle Sol', 'Paseo del Prado', 'Calle Luna']
+CITIES = ['Madrid', 'Barcelona', 'Sevilla', 'Valencia', 'Bilbao', 'Zaragoza', 'Málaga']
+NOTES = ['', '', '', 'Alergia a la penicilina', 'Hipertensión', 'Diabetes tipo 2', 'Sin alergias conocidas']
+
+# Catálogo: (categoría, tratamiento, precio base, duración en minutos, peso de popularidad)
+CATALOG = [
+    ('Consulta', 'Consulta inicial', 50.0, 30, 10),
+    ('Consulta', 'Revisión periódica', 35.0, 30, 25),
+    ('Limpieza', 'Limpieza dental simple', 70.0, 30, 18),
+    ('Limpieza', 'Limpieza dental profunda', 120.0, 60, 8),
+    ('Ortodoncia', 'Instalación de brackets', 500.0, 90, 1),
+    ('Ortodoncia', 'Ajuste mensual de brackets', 80.0, 30, 9),
+    ('Cirugía', 'Extracción simple', 100.0, 30, 5),
+    ('Cirugía', 'Extracción quirúrgica', 250.0, 60, 2),
+    ('Estética', 'Blanqueamiento dental', 300.0, 60, 3),
+    ('Estética', 'Carilla dental', 350.0, 90, 1),
+    ('Endodoncia', 'Endodoncia uniradicular', 200.0, 60, 3),
+    ('Endodoncia', 'Endodoncia multiradicular', 320.0, 90, 2),
+    ('Prótesis', 'Corona dental', 380.0, 60, 2),
+    ('Prótesis', 'Prótesis parcial removible', 450.0, 90, 1),
+    ('Periodoncia', 'Tratamiento periodontal básico', 150.0, 30, 4),
+    ('Radiología', 'Radiografía panorámica', 80.0, 30, 6),
+    ('Odontopediatría', 'Consulta pediátrica', 60.0, 30, 4),
+]
+
+# Horario laboral (día ISO, inicio, fin): lunes a viernes en jornada partida
+WORK_SCHEDULE = [
+    (day, start, end)
+    for day in range(1, 6)
+    for start, end in (('09:00', '14:00'), ('16:00', '20:00' if day < 5 else '19:00'))
+]
+SLOT_MINUTES = 30
+OCCUPANCY = 0.8  # Fracción de huecos ocupados en un día laborable
+MAX_YEARS = 5    # Las escalas grandes usan varios gabinetes en paralelo en vez de más años
+
+PAYMENT_METHODS = ['tarjeta', 'tarjeta', 'efectivo', 'transferencia']
+EMAIL_TYPES = ['confirmacion_cita', 'recordatorio_cita']
+
+
+# =============================================
+# Generadores de filas
+# =============================================
+def _day_slots() -> Dict[int, List[Tuple[str, int]]]:
+    """Huecos de SLOT_MINUTES de cada día ISO laborable: (hora 'HH:MM', minuto del día)."""
+    slots: Dict[int, List[Tuple[str, int]]] = {}
+    for day, start, end in WORK_SCHEDULE:
+        start_minute = int(start[:2]) * 60 + int(start[3:])
+        end_minute = int(end[:2]) * 60 + int(end[3:])
+        for minute in range(start_minute, end_minute, SLOT_MINUTES):
+            slots.setdefault(day, []).append((f"{minute // 60:02d}:{minute % 60:02d}", minute))
+    return slots
+
+
+def _minutes_to_time(minute: int) -> str:
+    """Convierte minutos desde medianoche en 'HH:MM'."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def _patient_rows(rng: random.Random, count: int, start: date) -> Iterator[Dict[str, Any]]:
+    """Pacientes con nombres, contactos y fechas de registro verosímiles."""
+    for i in range(1, count + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = f"{rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+        birth = date(1940, 1, 1) + timedelta(days=rng.randrange(365 * 80))
+        registered = start + timedelta(days=rng.randrange(365 * 4), minutes=rng.randrange(8 * 60, 20 * 60))
+        row = {
+            'first_name': first,
+            'last_name': last,
+            'birthdate': birth.isoformat(),
+            'gender': rng.choice('FM'),
+            'phone': f"+34 6{rng.randrange(10 ** 8):08d}",
+            'email': f"{first.lower()}.{last.split()[0].lower()}{i}@email.com",
+            'address': f"{rng.choice(STREETS)} {rng.randrange(1, 200)}, {rng.choice(CITIES)}",
+            'registration_date': f"{registered:%Y-%m-%d} {_minutes_to_time(rng.randrange(8 * 60, 20 * 60))}:00",
+            'notes': rng.choice(NOTES),
+        }
+        row.update(patient_search_keys(row['first_name'], row['last_name'], row['phone'], row['email']))
+        yield row
+
+
+def _patient_weights(rng: random.Random, count: int) -> List[float]:
+    """Pesos acumulados de frecuencia de visita por paciente (cola larga tipo Pareto)."""
+    weights = []
+    total = 0.0
+    for _ in range(count):
+        total += rng.paretovariate(1.5)
+        weights.append(total)
+    return weights
+
+
+def _chairs_needed(count: int) -> int:
+    """Gabinetes simultáneos necesarios para repartir count citas en MAX_YEARS años."""
+    slots_per_week = sum(len(day_slots) for day_slots in _day_slots().values())
+    capacity = slots_per_week * 52 * MAX_YEARS * OCCUPANCY * 0.6  # ~60 % de huecos iniciados
+    return max(1, -(-count // int(capacity)))
+
+
+def _appointment_plan(rng: random.Random, count: int, start: date, chairs: int = 1) -> Iterator[Tuple[str, str, str]]:
+    """
+    Recorre los días laborables desde start llenando huecos.
+
+    Las citas de un mismo gabinete nunca se solapan; con varios gabinetes hay
+    citas simultáneas, como en las clínicas grandes.
+
+    Yields:
+        tuple: (fecha, inicio, fin)
+    """
+    slots = _day_slots()
+    shift_ends = {day: [] for day in slots}
+    for day, _, end in WORK_SCHEDULE:
+        shift_ends[day].append(int(end[:2]) * 60 + int(end[3:]))
+
+    produced = 0
+    day = start
+    while produced < count:
+        weekday = day.isoweekday()
+        free_until = [0] * chairs
+        for time_text, minute in slots.get(weekday, []):
+            for chair in range(chairs):
+                if produced >= count:
+                    break
+                if minute < free_until[chair] or rng.random() > OCCUPANCY:
+                    continue
+                # No invadir el descanso ni el cierre: recortar al final del turno
+                shift_end = min(end for end in shift_ends[weekday] if end > minute)
+                free_until[chair] = min(minute + rng.choice((30, 30, 30, 60, 60, 90)), shift_end)
+                yield day.isoformat(), time_text, _minutes_to_time(free_until[chair])
+                produced += 1
+        day += timedelta(days=1)
+
+
+def _price_history_rows(rng: random.Random, treatment_ids: List[int], start: date, end: date) -> List[Dict[str, Any]]:
+    """Entre 1 y 4 tramos de precio consecutivos por tratamiento."""
+    rows = []
+    for treatment_id, (_, _, base_price, _, _) in zip(treatment_ids, CATALOG):
+        changes = sorted(rng.sample(range(30, max((end - start).days, 31)), rng.randrange(0, 4)))
+        boundaries = [start] + [start + timedelta(days=offset) for offset in changes]
+        price = round(base_price * 0.85, 2)
+        for i, segment_start in enumerate(boundaries):
+            segment_end = boundaries[i + 1] - timedelta(days=1) if i + 1 < len(boundaries) else None
+            rows.append({
+                'treatment_id': treatment_id,
+                'price': price,
+                'start_date': segment_start.isoformat(),
+                'end_date': segment_end.isoformat() if segment_end else None,
+                'created_at': f"{segment_start.isoformat()} 08:00:00",
+            })
+            price = round(price * rng.uniform(1.02, 1.08), 2)
+    return rows
+
+
+# =============================================
+# Generación
+# =============================================
+def generate(
+    db_path: str,
+    appointments: int,
+    seed: int = DEFAULT_SEED,
+    start: date = DEFAULT_START_DATE,
+    overwrite: bool = False,
+    verbose: bool = True
+) -> Dict[str, int]:
+    """
+    Crea una base de datos nueva con datos sintéticos.
+
+    Args:
+        db_path (str): Ruta de la base de datos a crear
+        appointments (int): Número de citas a generar
+        seed (int): Semilla del generador aleatorio
+        start (date): Fecha de la primera cita
+        overwrite (bool): Si True, elimina la base de datos si ya existe
+        verbose (bool): Si True, imprime el avance por tabla
+
+    Returns:
+        dict: Filas insertadas por tabla
+
+    Raises:
+        FileExistsError: Si la base de datos existe y overwrite es False
+    """
+    if os.path.exists(db_path):
+        if not overwrite:
+            raise FileExistsError(f"La base de datos ya existe: {db_path}")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    rng = random.Random(seed)
+    db = DatabaseManager(db_path, profile='bulk-load')
+    counts: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    def insert(table: str, rows) -> List[int]:
+        result = db.insert_records(table, rows, chunk_size=CHUNK_SIZE)
+        if result['failed']:
+            raise RuntimeError(f"{len(result['failed'])} filas rechazadas en {table}: {result['failed'][0]['error']}")
+        counts[table] = counts.get(table, 0) + result['inserted']
+        if not result['inserted']:
+            return []
+        return list(range(result['first_id'], result['last_id'] + 1))
+
+    # Catálogos
+    categories = list(dict.fromkeys(category for category, *_ in CATALOG))
+    category_ids = dict(zip(categories, insert('treatment_categories', (
+        {'name': name, 'description': f"Tratamientos de {name.lower()}", 'created_at': f"{start} 08:00:00"}
+        for name in categories
+    ))))
+    treatment_ids = insert('treatments', (
+        {
+            'category_id': category_ids[category],
+            'name': name,
+            'description': name,
+            'default_price': price,
+            'duration': duration,
+            'created_at': f"{start} 08:00:00",
+            'updated_at': f"{start} 08:00:00",
+        }
+        for category, name, price, duration, _ in CATALOG
+    ))
+    insert('work_schedule', (
+        {'day_of_week': day, 'start_time': f"{begin}:00", 'end_time': f"{end}:00", 'is_working_day': 1}
+        for day, begin, end in WORK_SCHEDULE
+    ))
+
+    # Pacientes
+    patient_count = max(1, appointments // APPOINTMENTS_PER_PATIENT)
+    patient_ids = insert('patients', _patient_rows(rng, patient_count, start))
+    patient_weights = _patient_weights(rng, patient_count)
+    _report(verbose, 'patients', counts, started)
+
+    # Citas: el "hoy" sintético deja un 5 % de las citas en el futuro
+    plan = list(_appointment_plan(rng, appointments, start, _chairs_needed(appointments)))
+    today = plan[int(len(plan) * 0.95)][0] if plan else start.isoformat()
+    end_date = date.fromisoformat(plan[-1][0]) if plan else start
+    insert('treatment_price_history', _price_history_rows(rng, treatment_ids, start, end_date))
+
+    statuses = []
+    appointment_rows = []
+    for day, begin, end in plan:
+        if rng.random() < 0.06:
+            status = 'cancelled'
+        else:
+            status = 'completed' if day < today else 'scheduled'
+        statuses.append(status)
+        appointment_rows.append({
+            'patient_id': rng.choices(patient_ids, cum_weights=patient_weights)[0],
+            'date': day,
+            'start_time': begin,
+            'end_time': end,
+            'status': status,
+            'notes': '',
+        })
+    appointment_ids = insert('appointments', appointment_rows)
+    del appointment_rows
+    _report(verbose, 'appointments', counts, started)
+
+    # Tratamientos aplicados, pagos y correos derivados de cada cita, por bloques
+    treatment_weights = [weight for *_, weight in CATALOG]
+    buffers: Dict[str, List[Dict[str, Any]]] = {'appointment_treatments': [], 'payments': [], 'email_tracking': []}
+    for appointment_id, (day, _, end), status in zip(appointment_ids, plan, statuses):
+        if status == 'cancelled':
+            continue
+        total = 0.0
+        for index in rng.choices(range(len(CATALOG)), weights=treatment_weights, k=1 if rng.random() < 0.75 else 2):
+            price = CATALOG[index][2]
+            buffers['appointment_treatments'].append({
+                'appointment_id': appointment_id,
+                'treatment_id': treatment_ids[index],
+                'quantity': 1,
+                'price_applied': price,
+            })
+            total += price
+        if status == 'completed' and rng.random() < 0.92:
+            buffers['payments'].append({
+                'appointment_id': appointment_id,
+                'amount': total if rng.random() < 0.85 else round(total / 2, 2),
+                'payment_date': f"{day} {end}:00",
+                'payment_method': rng.choice(PAYMENT_METHODS),
+            })
+        if rng.random() < 0.7:
+            buffers['email_tracking'].append({
+                'tracking_id': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                'appointment_id': appointment_id,
+                'email_type': rng.choice(EMAIL_TYPES),
+                'recipient_email': f"paciente{appointment_id}@email.com",
+                'subject': 'Información sobre su cita',
+                'sent_date': f"{date.fromisoformat(day) - timedelta(days=rng.randrange(1, 8))} 09:00:00",
+                'status': 'sent',
+            })
+        for table, rows in buffers.items():
+            if len(rows) >= CHUNK_SIZE:
+                insert(table, rows)
+                rows.clear()
+
+    for table, rows in buffers.items():
+        if rows:
+            insert(table, rows)
+        _report(verbose, table, counts, started)
+
+    db.execute_query("ANALYZE")
+    db.close_all()
+    return counts
+
+
+def _report(verbose: bool, table: str, counts: Dict[str, int], started: float) -> None:
+    """Imprime el avance de una tabla si verbose está activo."""
+    if verbose:
+        print(f"  {table:<24} {counts.get(table, 0):>10,} filas  ({time.perf_counter() - started:.1f} s)")
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética para pruebas de rendimiento")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k', help="Número de citas")
+    parser.add_argument('--db', help="Ruta de la base de datos (por defecto benchmarks/data/bench_<escala>.db)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Semilla del generador")
+    parser.add_argument('--overwrite', action='store_true', help="Reemplazar la base de datos si existe")
+    args = parser.parse_args()
+
+    db_path = args.db or default_db_path(args.scale)
+    print(f"Generando {SCALES[args.scale]:,} citas en {db_path}")
+    generate(db_path, SCALES[args.scale], seed=args.seed, overwrite=args.overwrite)
+
+
+def default_db_path(scale: str) -> str:
+    """Ruta por defecto de la base de datos de una escala."""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', f"bench_{scale}.db")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# work_schedule_check.py
+"""
+Verificación de la lectura del horario de trabajo.
+
+Archivo: work_schedule_check.py
+Propósito: Cargar el horario de ejemplo (data/datospruba.sql) en una base de
+           datos recién migrada y comprobar que work_hours_by_weekday,
+           find_next_slots y el horario del reporte de horas sin citas asignan
+           cada tramo al día de la semana que indica el comentario de su fila
+           ("-- Lunes mañana", "-- Domingo no laborable"...).
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python benchmarks/work_schedule_check.py
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import os
+import re
+import sys
+import tempfile
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.appointment_manager import AppointmentManager
+from core.availability import to_minutes, work_hours_by_weekday
+from core.report_generator import ReportGenerator
+from db.database import DatabaseManager
+
+# =============================================
+# Configuración global
+# =============================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_PATH = os.path.join(BASE_DIR, 'data', 'datospruba.sql')
+
+# Nombres de los días en los comentarios del horario, en el orden de date.weekday()
+DAY_NAMES = ['lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo']
+# Claves de los días en el horario de ReportGenerator, en el mismo orden
+REPORT_DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+# Semana de referencia (empieza en lunes)
+CHECK_MONDAY = date(2030, 1, 14)
+
+_SCHEDULE_ROW = re.compile(
+    r"^\((\d+),\s*(\d+),\s*(NULL|'[\d:]+'),\s*(NULL|'[\d:]+'),\s*(\d)\)[,;]\s*--\s*(\w+)",
+    re.IGNORECASE
+)
+
+
+# =============================================
+# Horario de ejemplo
+# =============================================
+def load_seed_schedule(path: str = SEED_PATH) -> List[Tuple[Dict[str, object], int]]:
+    """
+    Lee las filas de work_schedule del script de datos de ejemplo.
+
+    Args:
+        path (str): Ruta al script SQL
+
+    Returns:
+        list: Tuplas (fila de work_schedule, día de la semana del comentario con 0 = lunes)
+    """
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            match = _SCHEDULE_ROW.match(line.strip())
+            if not match:
+                continue
+            row_id, day_of_week, start, end, working, day_name = match.groups()
+            rows.append(({
+                'id': int(row_id),
+                'day_of_week': int(day_of_week),
+                'start_time': None if start == 'NULL' else start.strip("'"),
+                'end_time': None if end == 'NULL' else end.strip("'"),
+                'is_working_day': int(working),
+            }, DAY_NAMES.index(day_name.lower())))
+    return rows
+
+
+def expected_hours(seed: List[Tuple[Dict[str, object], int]]) -> Dict[int, List[Tuple[int, int]]]:
+    """Tramos de cada día (0 = lunes) según los comentarios del script."""
+    hours = {weekday: [] for weekday in range(7)}
+    for row, weekday in seed:
+        if row['is_working_day']:
+            hours[weekday].append((to_minutes(row['start_time']), to_minutes(row['end_time'])))
+    return {weekday: sorted(shifts) for weekday, shifts in hours.items()}
+
+
+# =============================================
+# Comprobaciones
+# =============================================
+def check() -> List[str]:
+    """
+    Compara el horario leído por la aplicación con el del script de ejemplo.
+
+    Returns:
+        list: Descripción de cada discrepancia (vacía si todo coincide)
+    """
+    seed = load_seed_schedule()
+    if not seed:
+        return [f"No se encontraron filas de work_schedule en {SEED_PATH}"]
+    expected = expected_hours(seed)
+    errors = []
+
+    hours = work_hours_by_weekday([row for row, _ in seed])
+    for weekday in range(7):
+        if hours[weekday] != expected[weekday]:
+            errors.append(f"work_hours_by_weekday[{DAY_NAMES[weekday]}]: "
+                          f"{hours[weekday]} en lugar de {expected[weekday]}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'work_schedule_check.db'))
+        db.insert_records('work_schedule', (row for row, _ in seed))
+        manager = AppointmentManager(db)
+        for weekday in range(7):
+            day = CHECK_MONDAY + timedelta(days=weekday)
+            slots = manager.find_next_slots(30, day.isoformat(), horizon_days=1, limit=1000)
+            starts = [to_minutes(slot['start_time']) for slot in slots]
+            ends = [to_minutes(slot['end_time']) for slot in slots]
+            outside = [
+                slot for slot, start, end in zip(slots, starts, ends)
+                if not any(open_at <= start and end <= close_at for open_at, close_at in expected[weekday])
+            ]
+            if outside:
+                errors.append(f"find_next_slots({day}, {DAY_NAMES[weekday]}): "
+                              f"{len(outside)} horarios fuera del horario, p. ej. {outside[0]['start_time']}")
+            for open_at, close_at in expected[weekday]:
+                if open_at not in starts:
+                    errors.append(f"find_next_slots({day}, {DAY_NAMES[weekday]}): "
+                                  f"no propone la apertura del tramo {open_at // 60:02d}:{open_at % 60:02d}")
+
+        # El reporte usa un único tramo por día: debe ser uno de los de ese día
+        report_schedule = ReportGenerator(db)._get_work_schedule()
+        for weekday, day_key in enumerate(REPORT_DAYS):
+            day_schedule = report_schedule[day_key]
+            if day_schedule['is_working_day'] != bool(expected[weekday]):
+                errors.append(f"ReportGenerator._get_work_schedule[{day_key}]: "
+                              f"is_working_day={day_schedule['is_working_day']} para {DAY_NAMES[weekday]}")
+            elif day_schedule['is_working_day']:
+                shift = (to_minutes(day_schedule['start_time']), to_minutes(day_schedule['end_time']))
+                if shift not in expected[weekday]:
+                    errors.append(f"ReportGenerator._get_work_schedule[{day_key}]: "
+                                  f"{day_schedule['start_time']}-{day_schedule['end_time']} "
+                                  f"no es un tramo del {DAY_NAMES[weekday]}")
+        db.close_all()
+    return errors
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    errors = check()
+    for error in errors:
+        print(f"ERROR  {error}")
+    if errors:
+        print(f"\n{len(errors)} discrepancia(s) con el horario de ejemplo")
+        sys.exit(1)
+    print("El horario de trabajo coincide con el de ejemplo")
+
+
+if __name__ == "__main__":
+    main()
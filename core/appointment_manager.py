@@ -31,7 +31,97 @@ from email.mime.multipart import MIMEMultipart
 
 # Librerías propias del proyecto
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from db.database import DatabaseManager
+from core.availability import DEFAULT_GRANULARITY, DayAvailability, to_hhmm, to_minutes, work_hours_by_weekday
+from core.notification_outbox import NotificationOutbox, logger
+from core.recurrence import expand_rule
+from db.database import DatabaseManager, RetryPolicy, Transaction, is_busy_error
+
+# Días que find_next_slots revisa por defecto (tres semanas)
+DEFAULT_HORIZON_DAYS = 21
+# Citas leídas por bloque al recorrer el rango de find_next_slots
+SLOT_SCAN_BATCH_SIZE = 256
+# Reintentos de create_appointment si otro puesto tiene bloqueada la base de datos
+DEFAULT_BOOKING_RETRY = RetryPolicy(attempts=5, base_delay=0.05, max_delay=1.0)
+# Segundos máximos de espera al servidor SMTP (el envío corre en el hilo de OutboxWorker)
+SMTP_TIMEOUT = 30
+
+
+class BookingResult:
+    """
+    Resultado de create_appointment.
+
+    Es verdadero sólo si la cita se creó, de modo que "if result:" sigue
+    funcionando como con el ID que se devolvía antes.
+    """
+
+    BOOKED = 'booked'        # Cita creada (appointment_id)
+    CONFLICT = 'conflict'    # El horario se solapa con otras citas (conflicts)
+    INVALID = 'invalid'      # Datos de la cita no válidos
+    BUSY = 'busy'            # La base de datos siguió bloqueada tras los reintentos
+    ERROR = 'error'          # Otro error de base de datos
+
+    def __init__(
+            self,
+            status: str,
+            appointment_id: Optional[int] = None,
+            conflicts: Optional[List[Dict[str, Any]]] = None,
+            message: str = '',
+            attempts: int = 1
+    ):
+        """
+        Args:
+            status (str): Una de las constantes de la clase
+            appointment_id (int): ID de la cita creada (sólo si status es BOOKED)
+            conflicts (list): Citas que ocupan el horario: id, start_time y end_time
+            message (str): Descripción del problema para mostrar al usuario
+            attempts (int): Transacciones intentadas
+        """
+        self.status = status
+        self.appointment_id = appointment_id
+        self.conflicts = conflicts or []
+        self.message = message
+        self.attempts = attempts
+
+    def __bool__(self) -> bool:
+        return self.status == self.BOOKED
+
+    def __repr__(self) -> str:
+        return (f"BookingResult(status={self.status!r}, appointment_id={self.appointment_id!r}, "
+                f"conflicts={len(self.conflicts)}, attempts={self.attempts})")
+
+
+class SeriesBookingResult(BookingResult):
+    """
+    Resultado de create_recurring.
+
+    appointment_id es la primera cita creada; appointment_ids y dates, todas las
+    de la serie en orden. Cada elemento de conflicts incluye además la fecha.
+    """
+
+    def __init__(
+            self,
+            status: str,
+            appointment_ids: Optional[List[int]] = None,
+            dates: Optional[List[str]] = None,
+            skipped: Optional[List[str]] = None,
+            **kwargs: Any
+    ):
+        """
+        Args:
+            status (str): Una de las constantes de BookingResult
+            appointment_ids (list): IDs de las citas creadas
+            dates (list): Fechas de las citas creadas (YYYY-MM-DD)
+            skipped (list): Fechas omitidas por estar ocupadas (skip_conflicts)
+            **kwargs: conflicts, message y attempts como en BookingResult
+        """
+        self.appointment_ids = appointment_ids or []
+        self.dates = dates or []
+        self.skipped = skipped or []
+        super().__init__(status, self.appointment_ids[0] if self.appointment_ids else None, **kwargs)
+
+    def __repr__(self) -> str:
+        return (f"SeriesBookingResult(status={self.status!r}, appointments={len(self.appointment_ids)}, "
+                f"skipped={len(self.skipped)}, conflicts={len(self.conflicts)}, attempts={self.attempts})")
 
 
 class AppointmentManager:
@@ -45,14 +135,18 @@ class AppointmentManager:
     - Generar reportes de citas
     """
 
-    def __init__(self, db_manager: DatabaseManager = None):
+    def __init__(self, db_manager: DatabaseManager = None, retry_policy: Optional[RetryPolicy] = None):
         """
         Inicializa el gestor de citas.
 
         Args:
             db_manager (DatabaseManager): Instancia de DatabaseManager (opcional)
+            retry_policy (RetryPolicy): Reintentos de create_appointment ante bloqueos
+                                        (default: DEFAULT_BOOKING_RETRY)
         """
         self.db_manager = db_manager or DatabaseManager()
+        self.retry_policy = retry_policy or DEFAULT_BOOKING_RETRY
+        self.outbox = NotificationOutbox(self.db_manager)
         self.email_settings = self._load_email_settings()
 
     def _load_email_settings(self) -> Dict[str, Any]:
@@ -86,11 +180,21 @@ class AppointmentManager:
             end_time: str,
             doctor: str,
             reason: str,
-            status: str = "scheduled"
-    ) -> Optional[int]:
+            status: str = "scheduled",
+            retry: Optional[RetryPolicy] = None
+    ) -> BookingResult:
         """
         Crea una nueva cita en la base de datos.
 
+        La comprobación de solapes y la inserción se hacen en una sola transacción
+        BEGIN IMMEDIATE: el bloqueo de escritura se toma antes de mirar la agenda,
+        así que dos puestos que reservan el mismo horario a la vez no pueden pasar
+        ambos la comprobación. Si la base de datos está bloqueada, la transacción
+        se repite según la política de reintentos.
+
+        La confirmación por correo se guarda en la bandeja de salida dentro de la
+        misma transacción y la envía OutboxWorker después de responder.
+
         Args:
             patient_id (int): ID del paciente
             date (str): Fecha de la cita (YYYY-MM-DD)
@@ -99,54 +203,160 @@ class AppointmentManager:
             doctor (str): Nombre del doctor
             reason (str): Motivo de la cita
             status (str): Estado de la cita (default: "scheduled")
+            retry (RetryPolicy): Política de reintentos (default: la del gestor)
 
         Returns:
-            int: ID de la cita creada o None si hubo error
+            BookingResult: Verdadero si la cita se creó (con appointment_id); si no,
+                           status indica el motivo y conflicts las citas que ocupan
+                           el horario
         """
         try:
-            # Verificar disponibilidad
-            if not self.is_time_available(date, start_time, end_time):
-                raise ValueError("El horario seleccionado no está disponible")
-
-            # Calcular duración en minutos
-            start_dt = datetime.strptime(start_time, '%H:%M')
-            end_dt = datetime.strptime(end_time, '%H:%M')
-            duration = int((end_dt - start_dt).total_seconds() / 60)
-
-            # Crear la cita
-            appointment_data = {
-                'patient_id': patient_id,
+            datetime.strptime(date, '%Y-%m-%d')
+            if to_minutes(end_time) <= to_minutes(start_time):
+                return BookingResult(BookingResult.INVALID,
+                                     message="La hora de fin debe ser posterior a la de inicio")
+        except ValueError:
+            return BookingResult(BookingResult.INVALID, message="Fecha u hora con formato incorrecto")
+
+        appointment_data = {
+            'patient_id': patient_id,
+            'date': date,
+            'start_time': start_time,
+            'end_time': end_time,
+            'status': status,
+            'notes': reason
+        }
+        attempts = 0
+
+        def book(tx: Transaction) -> BookingResult:
+            nonlocal attempts
+            attempts += 1
+            conflicts = self._find_conflicts(date, start_time, end_time)
+            if conflicts:
+                return BookingResult(BookingResult.CONFLICT, conflicts=conflicts, attempts=attempts,
+                                     message="El horario seleccionado no está disponible")
+            appointment_id = self.db_manager.insert_record('appointments', appointment_data)
+            self._enqueue_notification(patient_id, appointment_id, 'created', {
                 'date': date,
-                'start_time': start_time,
-                'end_time': end_time,
-                'status': status,
-                'notes': reason
-            }
+                'time': start_time,
+                'doctor': doctor,
+                'reason': reason,
+            })
+            return BookingResult(BookingResult.BOOKED, appointment_id=appointment_id, attempts=attempts)
 
-            appointment_id = self.db_manager.insert_record('appointments', appointment_data)
+        policy = retry or self.retry_policy
+        try:
+            result = self.db_manager.run_transaction(book, immediate=True, retry=policy)
+        except sqlite3.Error as e:
+            print(f"Error al crear la cita: {e}")
+            if is_busy_error(e):
+                # El bloqueo puede llegar antes de entrar en book (BEGIN IMMEDIATE)
+                return BookingResult(BookingResult.BUSY, attempts=policy.attempts,
+                                     message="La agenda está ocupada por otro puesto; inténtelo de nuevo")
+            return BookingResult(BookingResult.ERROR, attempts=attempts, message=str(e))
 
-            # Obtener información del paciente para el correo
-            patient_info = self._get_patient_info(patient_id)
-            if patient_info and patient_info.get('email'):
-                self._send_appointment_email(
-                    patient_info['email'],
-                    f"{patient_info['first_name']} {patient_info['last_name']}",
-                    date,
-                    start_time,
-                    doctor,
-                    reason,
-                    appointment_id,
-                    'created'
-                )
-
-            return appointment_id
+        return result
+
+    def create_recurring(
+            self,
+            patient_id: int,
+            rule: str,
+            start_date: str,
+            start_time: str,
+            end_time: str,
+            doctor: str,
+            reason: str,
+            count: Optional[int] = None,
+            until: Optional[str] = None,
+            skip_conflicts: bool = False,
+            status: str = "scheduled",
+            retry: Optional[RetryPolicy] = None
+    ) -> SeriesBookingResult:
+        """
+        Crea una serie de citas periódicas (p. ej. un ajuste mensual de brackets).
+
+        Las fechas se calculan con la regla de repetición (ver core/recurrence.py).
+        En una sola transacción BEGIN IMMEDIATE se buscan con una consulta los
+        solapes de todas las fechas, se insertan todas las citas con executemany y
+        se guarda en la bandeja de salida un único correo con el resumen.
+
+        Args:
+            patient_id (int): ID del paciente
+            rule (str): Regla de repetición, p. ej. "FREQ=MONTHLY;INTERVAL=1"
+            start_date (str): Fecha de la primera cita (YYYY-MM-DD)
+            start_time (str): Hora de inicio de cada cita (HH:MM)
+            end_time (str): Hora de fin de cada cita (HH:MM)
+            doctor (str): Nombre del doctor
+            reason (str): Motivo de las citas
+            count (int): Número de citas (opcional si se indica until o va en la regla)
+            until (str): Última fecha posible, incluida (YYYY-MM-DD, opcional)
+            skip_conflicts (bool): Crear el resto de la serie omitiendo las fechas
+                                   ocupadas en lugar de no crear ninguna
+            status (str): Estado de las citas (default: "scheduled")
+            retry (RetryPolicy): Política de reintentos (default: la del gestor)
 
+        Returns:
+            SeriesBookingResult: Verdadero si se creó la serie; conflicts indica las
+                                 citas que ocupan cada fecha en conflicto
+        """
+        try:
+            if to_minutes(end_time) <= to_minutes(start_time):
+                return SeriesBookingResult(BookingResult.INVALID,
+                                           message="La hora de fin debe ser posterior a la de inicio")
+            dates = expand_rule(rule, start_date, count=count, until=until)
+        except ValueError as e:
+            return SeriesBookingResult(BookingResult.INVALID, message=str(e))
+        if not dates:
+            return SeriesBookingResult(BookingResult.INVALID, message="La regla no genera ninguna fecha")
+
+        attempts = 0
+
+        def book(tx: Transaction) -> SeriesBookingResult:
+            nonlocal attempts
+            attempts += 1
+            conflicts = self._find_series_conflicts(dates, start_time, end_time)
+            busy_dates = {conflict['date'] for conflict in conflicts}
+            free_dates = [day for day in dates if day not in busy_dates]
+            if busy_dates and (not skip_conflicts or not free_dates):
+                return SeriesBookingResult(BookingResult.CONFLICT, conflicts=conflicts, attempts=attempts,
+                                           message=f"{len(busy_dates)} de las {len(dates)} fechas no están disponibles")
+
+            inserted = self.db_manager.insert_records('appointments', (
+                {
+                    'patient_id': patient_id,
+                    'date': day,
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'status': status,
+                    'notes': reason
+                }
+                for day in free_dates
+            ))
+            if inserted['failed']:
+                # Sin la serie completa no se confirma nada
+                raise sqlite3.IntegrityError(inserted['failed'][0]['error'])
+            # Una sola sentencia con la base de datos bloqueada: IDs consecutivos
+            appointment_ids = list(range(inserted['first_id'], inserted['last_id'] + 1))
+
+            self._enqueue_notification(patient_id, appointment_ids[0], 'series_created', {
+                'date': free_dates[0],
+                'time': start_time,
+                'doctor': doctor,
+                'reason': reason,
+                'dates': free_dates,
+            })
+            return SeriesBookingResult(BookingResult.BOOKED, appointment_ids=appointment_ids, dates=free_dates,
+                                       skipped=sorted(busy_dates), conflicts=conflicts, attempts=attempts)
+
+        policy = retry or self.retry_policy
+        try:
+            return self.db_manager.run_transaction(book, immediate=True, retry=policy)
         except sqlite3.Error as e:
-            print(f"Error al crear la cita: {e}")
-            return None
-        except Exception as e:
-            print(f"Error inesperado: {e}")
-            return None
+            print(f"Error al crear la serie de citas: {e}")
+            if is_busy_error(e):
+                return SeriesBookingResult(BookingResult.BUSY, attempts=policy.attempts,
+                                           message="La agenda está ocupada por otro puesto; inténtelo de nuevo")
+            return SeriesBookingResult(BookingResult.ERROR, attempts=attempts, message=str(e))
 
     def update_appointment(
             self,
@@ -164,22 +374,23 @@ class AppointmentManager:
             bool: True si la actualización fue exitosa
         """
         try:
-            # Verificar que la cita existe
-            appointment = self.get_appointment(appointment_id)
-            if not appointment:
-                raise ValueError(f"No existe cita con ID {appointment_id}")
+            with self.db_manager.transaction(immediate=True):
+                # Verificar que la cita existe
+                appointment = self.get_appointment(appointment_id)
+                if not appointment:
+                    raise ValueError(f"No existe cita con ID {appointment_id}")
 
-            # Verificar disponibilidad si se cambia fecha/hora
-            if 'date' in kwargs or 'start_time' in kwargs or 'end_time' in kwargs:
-                date = kwargs.get('date', appointment['date'])
-                start_time = kwargs.get('start_time', appointment['start_time'])
-                end_time = kwargs.get('end_time', appointment['end_time'])
+                # Verificar disponibilidad si se cambia fecha/hora
+                if 'date' in kwargs or 'start_time' in kwargs or 'end_time' in kwargs:
+                    date = kwargs.get('date', appointment['date'])
+                    start_time = kwargs.get('start_time', appointment['start_time'])
+                    end_time = kwargs.get('end_time', appointment['end_time'])
 
-                if not self.is_time_available(date, start_time, end_time, exclude_id=appointment_id):
-                    raise ValueError("El nuevo horario no está disponible")
+                    if not self.is_time_available(date, start_time, end_time, exclude_id=appointment_id):
+                        raise ValueError("El nuevo horario no está disponible")
 
-            # Actualizar la cita
-            return self.db_manager.update_record('appointments', appointment_id, kwargs)
+                # Actualizar la cita
+                return self.db_manager.update_record('appointments', appointment_id, kwargs)
 
         except sqlite3.Error as e:
             print(f"Error al actualizar la cita: {e}")
@@ -196,6 +407,9 @@ class AppointmentManager:
         """
         Cancela una cita existente.
 
+        El aviso al paciente se guarda en la bandeja de salida en la misma
+        transacción que la cancelación.
+
         Args:
             appointment_id (int): ID de la cita a cancelar
             reason (str): Motivo de la cancelación
@@ -204,34 +418,30 @@ class AppointmentManager:
             bool: True si la cancelación fue exitosa
         """
         try:
-            # Obtener datos de la cita antes de cancelarla
-            appointment = self.get_appointment(appointment_id)
-            if not appointment:
-                raise ValueError(f"No existe cita con ID {appointment_id}")
-
-            # Actualizar estado y motivo
-            update_data = {
-                'status': 'cancelled',
-                'notes': f"{appointment.get('notes', '')}\nMotivo cancelación: {reason}"
-            }
-
-            success = self.db_manager.update_record('appointments', appointment_id, update_data)
-
-            # Notificar al paciente si la actualización fue exitosa
-            if success and appointment.get('patient_id'):
-                patient_info = self._get_patient_info(appointment['patient_id'])
-                if patient_info and patient_info.get('email'):
-                    self._send_appointment_email(
-                        patient_info['email'],
-                        f"{patient_info['first_name']} {patient_info['last_name']}",
-                        appointment['date'],
-                        appointment['start_time'],
-                        "",
-                        appointment.get('notes', ''),
-                        appointment_id,
-                        'cancelled',
-                        cancellation_reason=reason
-                    )
+            # Lectura y cancelación se confirman juntas
+            with self.db_manager.transaction(immediate=True):
+                # Obtener datos de la cita antes de cancelarla
+                appointment = self.get_appointment(appointment_id)
+                if not appointment:
+                    raise ValueError(f"No existe cita con ID {appointment_id}")
+
+                # Actualizar estado y motivo
+                update_data = {
+                    'status': 'cancelled',
+                    'notes': f"{appointment.get('notes', '')}\nMotivo cancelación: {reason}"
+                }
+
+                success = self.db_manager.update_record('appointments', appointment_id, update_data)
+
+                # Notificar al paciente si la actualización fue exitosa
+                if success and appointment.get('patient_id'):
+                    self._enqueue_notification(appointment['patient_id'], appointment_id, 'cancelled', {
+                        'date': appointment['date'],
+                        'time': appointment['start_time'],
+                        'doctor': "",
+                        'reason': appointment.get('notes', ''),
+                        'cancellation_reason': reason,
+                    })
 
             return success
 
@@ -314,6 +524,31 @@ class AppointmentManager:
                 """
         return self.db_manager.execute_query(query, (date,), fetch_all=True)
 
+    def get_day_availability(self, date: str, exclude_id: Optional[int] = None) -> DayAvailability:
+        """
+        Carga la ocupación de un día para consultarla en memoria.
+
+        Lee una sola vez las horas de las citas no canceladas del día (sin datos
+        del paciente) y las guarda como intervalos ordenados; para comprobar
+        muchos horarios del mismo día se carga una vez y se consulta con is_free.
+
+        Args:
+            date (str): Fecha (YYYY-MM-DD)
+            exclude_id (int): ID de cita a excluir (para actualizaciones)
+
+        Returns:
+            DayAvailability: Ocupación del día
+        """
+        query = """
+                SELECT start_time, end_time
+                FROM appointments
+                WHERE date = ?
+                  AND status != 'cancelled'
+                  AND (? IS NULL OR id != ?)
+                """
+        rows = self.db_manager.execute_query(query, (date, exclude_id, exclude_id), fetch_all=True)
+        return DayAvailability.from_times((row['start_time'], row['end_time']) for row in rows)
+
     def is_time_available(
             self,
             date: str,
@@ -324,6 +559,11 @@ class AppointmentManager:
         """
         Verifica si un horario está disponible.
 
+        Decide la consulta de solapes (_find_conflicts con LIMIT 1): las horas
+        'HH:MM' se comparan como texto en el índice de ocupación y basta con
+        encontrar una cita. Cargar el día en DayAvailability sólo compensa cuando
+        se prueban muchos horarios del mismo día (get_available_time_slots).
+
         Args:
             date (str): Fecha (YYYY-MM-DD)
             start_time (str): Hora inicio (HH:MM)
@@ -333,44 +573,72 @@ class AppointmentManager:
         Returns:
             bool: True si el horario está disponible
         """
+        # Basta con una cita que toque el horario para descartarlo
+        return not self._find_conflicts(date, start_time, end_time, exclude_id, limit=1)
+
+    def _find_conflicts(
+            self,
+            date: str,
+            start_time: str,
+            end_time: str,
+            exclude_id: Optional[int] = None,
+            limit: int = -1
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtiene las citas no canceladas que se solapan con un horario.
+
+        Sólo se leen las citas que tocan el horario, por el índice de ocupación.
+
+        Args:
+            date (str): Fecha (YYYY-MM-DD)
+            start_time (str): Hora inicio (HH:MM)
+            end_time (str): Hora fin (HH:MM)
+            exclude_id (int): ID de cita a excluir (para actualizaciones)
+            limit (int): Máximo de citas a devolver (-1 = todas)
+
+        Returns:
+            list: Citas (id, start_time, end_time) ordenadas por hora de inicio
+        """
         query = """
-                SELECT id
+                SELECT id, start_time, end_time
                 FROM appointments
                 WHERE date = ?
+                  AND start_time < ?
+                  AND end_time > ?
                   AND status != 'cancelled'
-                  AND (
-                    (start_time \
-                    < ? \
-                  AND end_time \
-                    > ?)
-                   OR
-                    (start_time \
-                    < ? \
-                  AND end_time \
-                    > ?)
-                   OR
-                    (start_time >= ? \
-                  AND end_time <= ?)
-                    )
+                  AND (? IS NULL OR id != ?)
+                ORDER BY start_time
+                LIMIT ?
                 """
+        params = (date, end_time, start_time, exclude_id, exclude_id, limit)
+        return self.db_manager.execute_query(query, params, fetch_all=True)
 
-        if exclude_id:
-            query += " AND id != ?"
-            params = (
-                date, end_time, start_time,
-                start_time, end_time,
-                start_time, end_time,
-                exclude_id
-            )
-        else:
-            params = (
-                date, end_time, start_time,
-                start_time, end_time,
-                start_time, end_time
-            )
+    def _find_series_conflicts(self, dates: List[str], start_time: str, end_time: str) -> List[Dict[str, Any]]:
+        """
+        Citas no canceladas que se solapan con el mismo horario en varias fechas.
 
-        result = self.db_manager.execute_query(query, params, fetch_all=True)
-        return len(result) == 0
+        Una sola consulta busca en el índice (date, start_time, end_time, status)
+        únicamente las fechas de la serie.
+
+        Args:
+            dates (list): Fechas (YYYY-MM-DD)
+            start_time (str): Hora de inicio (HH:MM)
+            end_time (str): Hora de fin (HH:MM)
+
+        Returns:
+            list: Citas en conflicto (id, date, start_time, end_time) por fecha y hora
+        """
+        placeholders = ', '.join('?' * len(dates))
+        query = f"""
+                SELECT id, date, start_time, end_time
+                FROM appointments
+                WHERE date IN ({placeholders})
+                  AND start_time < ?
+                  AND end_time > ?
+                  AND status != 'cancelled'
+                ORDER BY date, start_time
+                """
+        return self.db_manager.execute_query(query, (*dates, end_time, start_time), fetch_all=True)
 
     def _get_patient_info(self, patient_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -389,6 +657,67 @@ class AppointmentManager:
                 """
         return self.db_manager.execute_query(query, (patient_id,), fetch_one=True)
 
+    def _enqueue_notification(
+            self,
+            patient_id: int,
+            appointment_id: int,
+            action_type: str,
+            details: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Guarda en la bandeja de salida el correo de una cita.
+
+        Se llama dentro de la transacción que crea o modifica la cita, así que la
+        notificación se confirma o se revierte junto con ella.
+
+        Args:
+            patient_id (int): ID del paciente
+            appointment_id (int): ID de la cita
+            action_type (str): Tipo de acción (created/updated/cancelled)
+            details (dict): date, time, doctor, reason y, si procede, cancellation_reason
+
+        Returns:
+            int: ID de la notificación o None si el paciente no tiene correo
+        """
+        patient_info = self._get_patient_info(patient_id)
+        if not patient_info or not patient_info.get('email'):
+            return None
+        payload = dict(
+            details,
+            email=patient_info['email'],
+            patient_name=f"{patient_info['first_name']} {patient_info['last_name']}",
+            appointment_id=appointment_id,
+            action_type=action_type
+        )
+        return self.outbox.enqueue(f"appointment_{action_type}", patient_info['email'], payload, appointment_id)
+
+    def deliver_notification(self, notification: Dict[str, Any]) -> bool:
+        """
+        Envía una notificación de la bandeja de salida (emisor de OutboxWorker).
+
+        Args:
+            notification (dict): Notificación reservada, con el payload decodificado
+
+        Returns:
+            bool: True si se envió, False si no hay configuración de correo
+
+        Raises:
+            Exception: Si el envío falla (la notificación se reintentará)
+        """
+        payload = notification['payload']
+        return self._send_appointment_email(
+            payload['email'],
+            payload['patient_name'],
+            payload['date'],
+            payload['time'],
+            payload.get('doctor', ''),
+            payload.get('reason', ''),
+            payload['appointment_id'],
+            payload['action_type'],
+            cancellation_reason=payload.get('cancellation_reason'),
+            dates=payload.get('dates')
+        )
+
     def _send_appointment_email(
             self,
             email: str,
@@ -399,8 +728,9 @@ class AppointmentManager:
             reason: str,
             appointment_id: int,
             action_type: str,
-            cancellation_reason: Optional[str] = None
-    ) -> None:
+            cancellation_reason: Optional[str] = None,
+            dates: Optional[List[str]] = None
+    ) -> bool:
         """
         Envía un correo electrónico sobre la cita.
 
@@ -412,77 +742,98 @@ class AppointmentManager:
             doctor (str): Nombre doctor
             reason (str): Motivo cita
             appointment_id (int): ID cita
-            action_type (str): Tipo de acción (created/updated/cancelled)
+            action_type (str): Tipo de acción (created/updated/cancelled/series_created)
             cancellation_reason (str): Motivo cancelación (opcional)
+            dates (list): Fechas de la serie (sólo series_created)
+
+        Returns:
+            bool: True si se envió, False si no hay configuración de correo
+
+        Raises:
+            Exception: Si no se pudo construir o enviar el mensaje
         """
         if not self.email_settings:
-            print("Configuración de email no disponible")
-            return
-
-        try:
-            # Crear mensaje según tipo de acción
-            subject_map = {
-                'created': 'Confirmación de cita médica',
-                'updated': 'Actualización de cita médica',
-                'cancelled': 'Cancelación de cita médica'
-            }
-            subject = subject_map.get(action_type, 'Notificación de cita médica')
-
-            # Formatear fecha
-            formatted_date = datetime.strptime(date, '%Y-%m-%d').strftime('%d/%m/%Y')
-
-            # Construir cuerpo del mensaje
-            body = f"""
-            <html>
-            <body>
-            <h2>{subject}</h2>
-            <p>Estimado/a {patient_name},</p>
-            """
+            # La configuración puede haberse guardado después de crear el gestor
+            self.email_settings = self._load_email_settings()
+        if not self.email_settings:
+            logger.warning("Configuración de email no disponible: no se envía la notificación")
+            return False
 
-            if action_type == 'cancelled':
-                body += f"""
-                <p>Su cita ha sido cancelada con los siguientes detalles:</p>
-                <ul>
-                    <li><strong>Fecha:</strong> {formatted_date}</li>
-                    <li><strong>Hora:</strong> {time}</li>
-                    <li><strong>Motivo cancelación:</strong> {cancellation_reason or 'No especificado'}</li>
-                </ul>
-                """
-            else:
-                body += f"""
-                <p>Su cita ha sido {action_type} con los siguientes detalles:</p>
-                <ul>
-                    <li><strong>Fecha:</strong> {formatted_date}</li>
-                    <li><strong>Hora:</strong> {time}</li>
-                    <li><strong>Doctor:</strong> {doctor}</li>
-                    <li><strong>Motivo:</strong> {reason}</li>
-                </ul>
-                """
+        # Crear mensaje según tipo de acción
+        subject_map = {
+            'created': 'Confirmación de cita médica',
+            'updated': 'Actualización de cita médica',
+            'cancelled': 'Cancelación de cita médica',
+            'series_created': 'Confirmación de citas periódicas'
+        }
+        subject = subject_map.get(action_type, 'Notificación de cita médica')
+
+        # Formatear fecha
+        formatted_date = datetime.strptime(date, '%Y-%m-%d').strftime('%d/%m/%Y')
+
+        # Construir cuerpo del mensaje
+        body = f"""
+        <html>
+        <body>
+        <h2>{subject}</h2>
+        <p>Estimado/a {patient_name},</p>
+        """
 
-            body += """
-            <p>Atentamente,<br>El equipo médico</p>
-            </body>
-            </html>
+        if action_type == 'cancelled':
+            body += f"""
+            <p>Su cita ha sido cancelada con los siguientes detalles:</p>
+            <ul>
+                <li><strong>Fecha:</strong> {formatted_date}</li>
+                <li><strong>Hora:</strong> {time}</li>
+                <li><strong>Motivo cancelación:</strong> {cancellation_reason or 'No especificado'}</li>
+            </ul>
             """
-
-            # Configurar mensaje de email
-            msg = MIMEMultipart()
-            msg['From'] = self.email_settings['sender_email']
-            msg['To'] = email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'html'))
-
-            # Enviar email (comentar en desarrollo)
+        elif action_type == 'series_created':
+            date_items = ''.join(
+                f"<li>{datetime.strptime(day, '%Y-%m-%d').strftime('%d/%m/%Y')}</li>" for day in dates or [date]
+            )
+            body += f"""
+            <p>Se han programado {len(dates or [date])} citas con los siguientes detalles:</p>
+            <ul>
+                <li><strong>Hora:</strong> {time}</li>
+                <li><strong>Doctor:</strong> {doctor}</li>
+                <li><strong>Motivo:</strong> {reason}</li>
+            </ul>
+            <p><strong>Fechas:</strong></p>
+            <ul>{date_items}</ul>
             """
-            with smtplib.SMTP(self.email_settings['smtp_server'], self.email_settings['smtp_port']) as server:
-                server.starttls()
-                server.login(self.email_settings['email'], self.email_settings['password'])
-                server.send_message(msg)
+        else:
+            body += f"""
+            <p>Su cita ha sido {action_type} con los siguientes detalles:</p>
+            <ul>
+                <li><strong>Fecha:</strong> {formatted_date}</li>
+                <li><strong>Hora:</strong> {time}</li>
+                <li><strong>Doctor:</strong> {doctor}</li>
+                <li><strong>Motivo:</strong> {reason}</li>
+            </ul>
             """
-            print(f"Simulando envío de email a {email}")
 
-        except Exception as e:
-            print(f"Error al enviar email: {e}")
+        body += """
+        <p>Atentamente,<br>El equipo médico</p>
+        </body>
+        </html>
+        """
+
+        # Configurar mensaje de email
+        msg = MIMEMultipart()
+        msg['From'] = self.email_settings['sender_email']
+        msg['To'] = email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'html'))
+
+        # Los errores se propagan: OutboxWorker los registra y reintenta el envío
+        with smtplib.SMTP(self.email_settings['smtp_server'], self.email_settings['smtp_port'],
+                          timeout=SMTP_TIMEOUT) as server:
+            server.starttls()
+            server.login(self.email_settings['email'], self.email_settings['password'])
+            server.send_message(msg)
+        logger.info(f"Notificación de la cita {appointment_id} enviada a {email}")
+        return True
 
     def get_filtered_appointments(self, date=None, patient_id=None, status=None):
         """Obtiene citas filtradas por fecha, paciente o estado"""
@@ -528,7 +879,8 @@ class AppointmentManager:
             date: str,
             duration: int = 30,
             start_hour: int = 9,
-            end_hour: int = 18
+            end_hour: int = 18,
+            granularity: int = DEFAULT_GRANULARITY
     ) -> List[str]:
         """
         Obtiene horarios disponibles para agendar citas.
@@ -538,58 +890,119 @@ class AppointmentManager:
             duration (int): Duración en minutos (default: 30)
             start_hour (int): Hora inicio (default: 9)
             end_hour (int): Hora fin (default: 18)
+            granularity (int): Minutos entre horarios propuestos (default: 15)
 
         Returns:
             list: Lista de horarios disponibles (HH:MM)
         """
         try:
-            # Obtener citas existentes para la fecha
-            appointments = self.get_daily_appointments(date)
-            booked_slots = []
-
-            # Calcular slots ocupados
-            for appt in appointments:
-                if appt['status'] == 'cancelled':
-                    continue
-
-                start = datetime.strptime(appt['start_time'], '%H:%M')
-                end = datetime.strptime(appt['end_time'], '%H:%M')
-
-                current = start
-                while current < end:
-                    booked_slots.append(current.strftime('%H:%M'))
-                    current += timedelta(minutes=15)
+            availability = self.get_day_availability(date)
+            slots = availability.free_slots(duration, start_hour * 60, end_hour * 60, granularity)
+            return [to_hhmm(slot) for slot in slots]
 
-            # Generar todos los posibles slots
-            all_slots = []
-            for hour in range(start_hour, end_hour):
-                for minute in [0, 15, 30, 45]:
-                    slot_time = datetime(2020, 1, 1, hour, minute)
-                    all_slots.append(slot_time.strftime('%H:%M'))
+        except Exception as e:
+            print(f"Error al calcular slots disponibles: {e}")
+            return []
 
-            # Filtrar slots disponibles
-            available_slots = []
-            slot_duration = timedelta(minutes=duration)
+    def find_next_slots(
+            self,
+            duration: int,
+            from_date: Optional[str] = None,
+            horizon_days: int = DEFAULT_HORIZON_DAYS,
+            constraints: Optional[Dict[str, Any]] = None,
+            limit: int = 5
+    ) -> List[Dict[str, str]]:
+        """
+        Busca los primeros horarios libres en los próximos días.
 
-            for slot in all_slots:
-                slot_time = datetime.strptime(slot, '%H:%M')
-                end_time = slot_time + slot_duration
+        Las citas de todo el rango se leen con una única consulta ordenada por
+        fecha (por el índice de fecha, sin datos del paciente) y de forma
+        perezosa: en cuanto se reúnen limit horarios se deja de leer. Cada día
+        se limita a los tramos de work_schedule de su día de la semana, y la
+        cita debe caber entera en un tramo.
 
-                # Verificar si el slot está completamente disponible
-                current = slot_time
-                is_available = True
+        Args:
+            duration (int): Duración de la cita en minutos
+            from_date (str): Primer día (YYYY-MM-DD); por defecto, hoy. Si es hoy,
+                             sólo se proponen horas posteriores a la actual
+            horizon_days (int): Número de días a revisar (default: 21)
+            constraints (dict): Restricciones opcionales:
+                - 'earliest' (str): Hora mínima de inicio (HH:MM)
+                - 'latest' (str): Hora máxima de fin (HH:MM), p. ej. '14:00' para
+                  sólo mañanas
+                - 'weekdays' (iterable): Días permitidos (0 = lunes ... 6 = domingo)
+                - 'granularity' (int): Minutos entre horas propuestas (default: 15)
+            limit (int): Número máximo de horarios (default: 5)
 
-                while current < end_time:
-                    if current.strftime('%H:%M') in booked_slots:
-                        is_available = False
-                        break
-                    current += timedelta(minutes=15)
+        Returns:
+            list: Diccionarios {'date', 'start_time', 'end_time'} en orden
+                  cronológico
+        """
+        try:
+            constraints = constraints or {}
+            granularity = constraints.get('granularity') or DEFAULT_GRANULARITY
+            earliest = to_minutes(constraints['earliest']) if constraints.get('earliest') else 0
+            latest = to_minutes(constraints['latest']) if constraints.get('latest') else 24 * 60
+            weekdays = set(constraints['weekdays']) if constraints.get('weekdays') is not None else None
+
+            now = datetime.now()
+            first_day = datetime.strptime(from_date, '%Y-%m-%d').date() if from_date else now.date()
+            last_day = first_day + timedelta(days=horizon_days - 1)
+            work_hours = self._get_work_hours()
+
+            query = """
+                    SELECT date, start_time, end_time
+                    FROM appointments
+                    WHERE date BETWEEN ? AND ?
+                      AND status != 'cancelled'
+                    ORDER BY date, start_time
+                    """
+            rows = self.db_manager.iter_query(
+                query, (first_day.isoformat(), last_day.isoformat()),
+                batch_size=SLOT_SCAN_BATCH_SIZE, row_format='tuple'
+            )
+            slots: List[Dict[str, str]] = []
+            try:
+                pending = next(rows, None)
+                day = first_day
+                while day <= last_day and len(slots) < limit:
+                    date_text = day.isoformat()
+                    booked = []
+                    while pending is not None and pending[0] <= date_text:
+                        booked.append((pending[1], pending[2]))
+                        pending = next(rows, None)
+
+                    if weekdays is None or day.weekday() in weekdays:
+                        availability = DayAvailability.from_times(booked)
+                        not_before = now.hour * 60 + now.minute if day == now.date() else 0
+                        for open_at, close_at in work_hours[day.weekday()]:
+                            open_at, close_at = max(open_at, earliest), min(close_at, latest)
+                            for start in availability.free_slots(duration, open_at, close_at, granularity):
+                                if len(slots) == limit:
+                                    break
+                                if start >= not_before:
+                                    slots.append({
+                                        'date': date_text,
+                                        'start_time': to_hhmm(start),
+                                        'end_time': to_hhmm(start + duration)
+                                    })
+                    day += timedelta(days=1)
+            finally:
+                # Libera la conexión aunque queden citas sin leer
+                rows.close()
+
+            return slots
 
-                if is_available and end_time <= datetime(2020, 1, 1, end_hour, 0):
-                    available_slots.append(slot)
+        except Exception as e:
+            print(f"Error al buscar horarios disponibles: {e}")
+            return []
 
-            return available_slots
+    def _get_work_hours(self) -> Dict[int, List[Any]]:
+        """
+        Obtiene los tramos de trabajo de cada día de la semana.
 
-        except Exception as e:
-            print(f"Error al calcular slots disponibles: {e}")
-            return []
\ No newline at end of file
+        Returns:
+            dict: Día de la semana (0 = lunes) -> tramos (inicio, fin) en minutos
+        """
+        query = "SELECT day_of_week, start_time, end_time, is_working_day FROM work_schedule"
+        return work_hours_by_weekday(self.db_manager.execute_query(query, fetch_all=True))
@@ -0,0 +1,189 @@
+# =============================================
+# Nombre del archivo: availability.py
+# Propósito: Cálculo de disponibilidad de la agenda sobre intervalos ordenados
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Motor de disponibilidad de un día de agenda.
+
+Las citas no canceladas de un día se cargan una vez como intervalos [inicio, fin)
+en minutos desde la medianoche, se ordenan y se fusionan los que se solapan. Con
+los intervalos disjuntos y ordenados, saber si un hueco está libre es una
+búsqueda binaria, y los huecos libres se recorren de izquierda a derecha sin
+volver a mirar las citas.
+"""
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Minuto de inicio y de fin (exclusivo) de un intervalo
+Interval = Tuple[int, int]
+
+# Separación por defecto entre horas de inicio propuestas
+DEFAULT_GRANULARITY = 15
+# Horario de los días laborables (lunes a viernes) sin filas en work_schedule,
+# el mismo que suponen los reportes
+DEFAULT_WORK_HOURS = ('09:00', '17:00')
+
+
+def to_minutes(time_text: str) -> int:
+    """
+    Convierte una hora 'HH:MM' (o 'HH:MM:SS') en minutos desde la medianoche.
+
+    Args:
+        time_text: Hora en texto
+
+    Returns:
+        int: Minutos desde las 00:00
+    """
+    return int(time_text[:2]) * 60 + int(time_text[3:5])
+
+
+def to_hhmm(minutes: int) -> str:
+    """
+    Convierte minutos desde la medianoche en una hora 'HH:MM'.
+
+    Args:
+        minutes: Minutos desde las 00:00
+
+    Returns:
+        str: Hora en formato HH:MM
+    """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def work_hours_by_weekday(rows: Iterable[Dict[str, Any]]) -> Dict[int, List[Interval]]:
+    """
+    Agrupa las filas de work_schedule por día de la semana.
+
+    work_schedule numera los días como date.isoweekday() (1 = lunes ... 7 =
+    domingo); el resultado usa la numeración de date.weekday() (0 = lunes).
+    Un día puede tener varios tramos (jornada partida). Los días laborables sin
+    ninguna fila usan DEFAULT_WORK_HOURS; los marcados con is_working_day = 0 y
+    los fines de semana sin filas quedan cerrados.
+
+    Args:
+        rows: Filas con day_of_week (1 = lunes), start_time, end_time e is_working_day
+
+    Returns:
+        dict: Día de la semana (0 = lunes) -> tramos (inicio, fin) en minutos, ordenados
+    """
+    hours: Dict[int, List[Interval]] = {}
+    for row in rows:
+        day_hours = hours.setdefault(row['day_of_week'] - 1, [])
+        if row['is_working_day'] and row['start_time'] and row['end_time']:
+            day_hours.append((to_minutes(row['start_time']), to_minutes(row['end_time'])))
+
+    default = (to_minutes(DEFAULT_WORK_HOURS[0]), to_minutes(DEFAULT_WORK_HOURS[1]))
+    for weekday in range(7):
+        if weekday not in hours:
+            hours[weekday] = [default] if weekday < 5 else []
+        hours[weekday].sort()
+    return hours
+
+
+class DayAvailability:
+    """Ocupación de un día como intervalos ordenados y disjuntos."""
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        """
+        Construye la ocupación a partir de intervalos en cualquier orden.
+
+        Args:
+            intervals: Pares (inicio, fin) en minutos; los vacíos se ignoran y los
+                       que se solapan o se tocan se fusionan
+        """
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in sorted(interval for interval in intervals if interval[1] > interval[0]):
+            if self._ends and start <= self._ends[-1]:
+                self._ends[-1] = max(self._ends[-1], end)
+            else:
+                self._starts.append(start)
+                self._ends.append(end)
+
+    @classmethod
+    def from_times(cls, rows: Iterable[Tuple[str, str]]) -> 'DayAvailability':
+        """
+        Construye la ocupación a partir de horas 'HH:MM'.
+
+        Args:
+            rows: Pares (start_time, end_time) de las citas del día
+
+        Returns:
+            DayAvailability: Ocupación del día
+        """
+        return cls((to_minutes(start), to_minutes(end)) for start, end in rows)
+
+    @property
+    def busy(self) -> List[Interval]:
+        """Intervalos ocupados, ordenados y sin solapes."""
+        return list(zip(self._starts, self._ends))
+
+    def is_free(self, start: int, end: int) -> bool:
+        """
+        Indica si [start, end) no se solapa con ninguna cita. O(log n).
+
+        Args:
+            start: Minuto de inicio
+            end: Minuto de fin (exclusivo)
+
+        Returns:
+            bool: True si el intervalo está libre
+        """
+        # Primer intervalo ocupado que termina después de start
+        index = bisect_right(self._ends, start)
+        return index == len(self._starts) or self._starts[index] >= end
+
+    def free_intervals(self, open_at: int, close_at: int) -> List[Interval]:
+        """
+        Huecos libres dentro del horario [open_at, close_at).
+
+        Args:
+            open_at: Minuto de apertura
+            close_at: Minuto de cierre
+
+        Returns:
+            list: Pares (inicio, fin) de los huecos, en orden
+        """
+        gaps = []
+        cursor = open_at
+        for index in range(bisect_right(self._ends, open_at), len(self._starts)):
+            if self._starts[index] >= close_at:
+                break
+            if self._starts[index] > cursor:
+                gaps.append((cursor, self._starts[index]))
+            cursor = max(cursor, self._ends[index])
+        if cursor < close_at:
+            gaps.append((cursor, close_at))
+        return gaps
+
+    def free_slots(self, duration: int, open_at: int, close_at: int,
+                   granularity: int = DEFAULT_GRANULARITY) -> List[int]:
+        """
+        Horas de inicio en las que cabe una cita de la duración indicada.
+
+        Las horas propuestas van de granularity en granularity minutos desde
+        open_at y la cita debe terminar, como tarde, en close_at.
+
+        Args:
+            duration: Duración de la cita en minutos
+            open_at: Minuto de apertura
+            close_at: Minuto de cierre
+            granularity: Minutos entre horas de inicio propuestas
+
+        Returns:
+            list: Minutos de inicio libres, en orden
+        """
+        slots = []
+        for gap_start, gap_end in self.free_intervals(open_at, close_at):
+            start = self._align(gap_start, open_at, granularity)
+            slots.extend(range(start, gap_end - duration + 1, granularity))
+        return slots
+
+    @staticmethod
+    def _align(minute: int, origin: int, granularity: int) -> int:
+        """Redondea minute hacia arriba a la rejilla origin + k * granularity."""
+        return origin + -(-(minute - origin) // granularity) * granularity
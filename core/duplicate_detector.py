@@ -0,0 +1,327 @@
+# =============================================
+# Nombre del archivo: duplicate_detector.py
+# Propósito: Detección de pacientes duplicados mediante claves de bloqueo
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Detección de pacientes duplicados en registros grandes.
+
+Comparar todos los pacientes entre sí es O(n²). En su lugar, cada paciente se
+asigna a varios bloques según sus claves (prefijo del primer apellido con la
+inicial del nombre, teléfono, parte local del email y fecha de nacimiento) y
+sólo se comparan los pacientes que comparten algún bloque. Con registros grandes
+los bloques se puntúan en un grupo de procesos. El resultado es una lista de
+pares ordenada por puntuación para revisarla y fusionarlos con
+PatientManager.merge_patients.
+
+Uso:
+    python core/duplicate_detector.py [--threshold 0.8] [--output revision.csv]
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import csv
+import datetime
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.patient_manager import PatientManager
+from db.database import DB_PATH, DatabaseManager
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_THRESHOLD = 0.8
+SURNAME_PREFIX_LENGTH = 4
+PHONE_DIGITS = 9           # Últimos dígitos comparados (sin prefijo internacional)
+MIN_PHONE_DIGITS = 6
+MIN_EMAIL_LOCAL_LENGTH = 3
+MAX_BLOCK_SIZE = 1000      # Bloques mayores se omiten: son claves demasiado comunes
+PARALLEL_MIN_PATIENTS = 20000  # Por debajo se puntúa en el propio proceso
+PAIRS_PER_TASK = 200000    # Pares aproximados por tarea enviada al grupo de procesos
+
+# Peso de cada campo en la puntuación. Si falta en alguno de los dos pacientes
+# cuenta como coincidencia a medias: ni confirma ni descarta el duplicado.
+WEIGHTS = {'name': 0.5, 'birthdate': 0.2, 'phone': 0.15, 'email': 0.15}
+UNKNOWN_SIMILARITY = 0.5
+
+# Paciente preparado para puntuar: (id, nombre completo, fecha ISO, teléfono, email, claves de bloqueo)
+Record = Tuple[int, str, str, str, str, Tuple[str, ...]]
+
+
+# =============================================
+# Claves de bloqueo y puntuación
+# =============================================
+def _iso_date(value: Optional[str]) -> str:
+    """Fecha de nacimiento en AAAA-MM-DD (se guardan también como DD/MM/AAAA); '' si no es válida."""
+    for date_format in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.datetime.strptime(value or '', date_format).date().isoformat()
+        except ValueError:
+            continue
+    return ''
+
+
+def make_record(patient: Dict[str, Any]) -> Record:
+    """
+    Prepara un paciente (con sus columnas *_key normalizadas) para la comparación.
+
+    Args:
+        patient (dict): Fila de patients con id, first_name_key, last_name_key,
+                        phone_key, email_key y birthdate
+
+    Returns:
+        Record: Datos comparables y claves de bloqueo del paciente
+    """
+    first = patient['first_name_key'] or ''
+    last = patient['last_name_key'] or ''
+    phone = patient['phone_key'] or ''
+    phone = phone[-PHONE_DIGITS:] if len(phone) >= MIN_PHONE_DIGITS else ''
+    email = patient['email_key'] or ''
+    birthdate = _iso_date(patient['birthdate'])
+
+    keys = []
+    surname = last.split(' ')[0] if last else ''
+    if surname:
+        keys.append(f"ap:{surname[:SURNAME_PREFIX_LENGTH]}|{first[:1]}")
+    if phone:
+        keys.append(f"tel:{phone}")
+    local = email.split('@')[0]
+    if len(local) >= MIN_EMAIL_LOCAL_LENGTH:
+        keys.append(f"em:{local}")
+    if birthdate:
+        keys.append(f"fn:{birthdate}")
+
+    return patient['id'], f"{last} {first}".strip(), birthdate, phone, email, tuple(sorted(keys))
+
+
+def _exact_fields(a: Record, b: Record) -> Tuple[float, List[str]]:
+    """Puntuación de fecha de nacimiento, teléfono y email (coincidencia exacta)."""
+    score = 0.0
+    reasons = []
+    for field, index in (('birthdate', 2), ('phone', 3), ('email', 4)):
+        if not a[index] or not b[index]:
+            score += WEIGHTS[field] * UNKNOWN_SIMILARITY
+        elif a[index] == b[index]:
+            score += WEIGHTS[field]
+            reasons.append(field)
+    return score, reasons
+
+
+def score_pair(a: Record, b: Record) -> Tuple[float, List[str]]:
+    """
+    Puntúa la probabilidad de que dos pacientes sean la misma persona.
+
+    Args:
+        a (Record): Primer paciente
+        b (Record): Segundo paciente
+
+    Returns:
+        tuple: (puntuación entre 0 y 1, campos que coinciden)
+    """
+    score, reasons = _exact_fields(a, b)
+    name_similarity = SequenceMatcher(None, a[1], b[1]).ratio()
+    if name_similarity >= 0.9:
+        reasons.insert(0, 'name')
+    return round(score + WEIGHTS['name'] * name_similarity, 4), reasons
+
+
+def _score_blocks(blocks: List[Tuple[str, List[Record]]], threshold: float) -> List[Tuple[float, int, int, List[str]]]:
+    """
+    Puntúa los pares de cada bloque (se ejecuta también en los procesos del grupo).
+
+    Un par que comparte varios bloques sólo se puntúa en el de menor clave, de
+    modo que cada par se evalúa una única vez sin coordinar los procesos.
+
+    Returns:
+        list: (puntuación, id menor, id mayor, campos que coinciden) de los pares
+              con puntuación >= threshold
+    """
+    matches = []
+    fields = (
+        (2, WEIGHTS['birthdate']), (3, WEIGHTS['phone']), (4, WEIGHTS['email'])
+    )
+    # Puntuación mínima de los campos exactos: por debajo, ni con nombres idénticos se llega al umbral
+    required = threshold - WEIGHTS['name']
+    for key, records in blocks:
+        for i, a in enumerate(records):
+            for b in records[i + 1:]:
+                partial = 0.0
+                for index, weight in fields:
+                    if not a[index] or not b[index]:
+                        partial += weight * UNKNOWN_SIMILARITY
+                    elif a[index] == b[index]:
+                        partial += weight
+                if partial < required:
+                    continue
+                # Primera clave compartida (las claves están ordenadas)
+                if next(k for k in a[5] if k in b[5]) != key:
+                    continue
+                score, reasons = score_pair(a, b)
+                if score >= threshold:
+                    low, high = (a[0], b[0]) if a[0] < b[0] else (b[0], a[0])
+                    matches.append((score, low, high, reasons))
+    return matches
+
+
+# =============================================
+# Detector
+# =============================================
+class DuplicateDetector:
+    """Busca pares de pacientes probablemente duplicados."""
+
+    def __init__(
+        self,
+        db_manager: Optional[DatabaseManager] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        workers: Optional[int] = None,
+        max_block_size: int = MAX_BLOCK_SIZE
+    ):
+        """
+        Inicializa el detector.
+
+        Args:
+            db_manager (DatabaseManager): Base de datos a revisar
+            threshold (float): Puntuación mínima (0-1) para proponer un par
+            workers (int): Procesos para puntuar (None = uno por CPU; 1 = sin procesos)
+            max_block_size (int): Tamaño máximo de bloque que se compara
+        """
+        self.db_manager = db_manager or DatabaseManager()
+        self.threshold = threshold
+        self.workers = workers
+        self.max_block_size = max_block_size
+        self.last_stats: Dict[str, Any] = {}
+
+    def load_records(self) -> List[Record]:
+        """Lee los pacientes por bloques de filas y los prepara para comparar."""
+        query = """
+                SELECT id, first_name_key, last_name_key, phone_key, email_key, birthdate
+                FROM patients \
+                """
+        return [make_record(patient) for patient in self.db_manager.iter_query(query)]
+
+    def build_blocks(self, records: Iterable[Record]) -> Dict[str, List[Record]]:
+        """
+        Agrupa los pacientes por clave de bloqueo.
+
+        Returns:
+            dict: {clave: pacientes} de los bloques con al menos dos pacientes
+        """
+        blocks: Dict[str, List[Record]] = {}
+        for record in records:
+            for key in record[5]:
+                blocks.setdefault(key, []).append(record)
+        return {key: members for key, members in blocks.items() if len(members) > 1}
+
+    def find_duplicates(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Busca duplicados en todo el registro de pacientes.
+
+        Args:
+            limit (int): Número máximo de pares devueltos (None = todos)
+
+        Returns:
+            list: Pares ordenados de mayor a menor puntuación, cada uno como
+                  {'patient_id', 'duplicate_id', 'score', 'reasons'}; patient_id es
+                  el registro más antiguo, el que se propone conservar
+        """
+        records = self.load_records()
+        blocks = self.build_blocks(records)
+        oversized = [key for key, members in blocks.items() if len(members) > self.max_block_size]
+        work = [(key, members) for key, members in blocks.items() if len(members) <= self.max_block_size]
+        pairs = sum(len(members) * (len(members) - 1) // 2 for _, members in work)
+
+        if self.workers == 1 or len(records) < PARALLEL_MIN_PATIENTS:
+            matches = _score_blocks(work, self.threshold)
+        else:
+            matches = []
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(_score_blocks, task, self.threshold) for task in self._split_tasks(work)]
+                for future in futures:
+                    matches += future.result()
+
+        matches.sort(key=lambda match: (-match[0], match[1], match[2]))
+        self.last_stats = {
+            'patients': len(records),
+            'blocks': len(work),
+            'oversized_blocks': oversized,
+            'pairs_compared': pairs,
+            'candidates': len(matches),
+        }
+        return [
+            {'patient_id': low, 'duplicate_id': high, 'score': score, 'reasons': reasons}
+            for score, low, high, reasons in matches[:limit]
+        ]
+
+    @staticmethod
+    def _split_tasks(blocks: List[Tuple[str, List[Record]]]) -> List[List[Tuple[str, List[Record]]]]:
+        """Reparte los bloques en tareas de aproximadamente PAIRS_PER_TASK pares."""
+        tasks: List[List[Tuple[str, List[Record]]]] = [[]]
+        pairs = 0
+        for key, members in blocks:
+            if pairs >= PAIRS_PER_TASK:
+                tasks.append([])
+                pairs = 0
+            tasks[-1].append((key, members))
+            pairs += len(members) * (len(members) - 1) // 2
+        return tasks
+
+
+# =============================================
+# Línea de comandos
+# =============================================
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Buscar pacientes duplicados")
+    parser.add_argument('--db', default=DB_PATH, help="Base de datos (por defecto data/clinic.db)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="Puntuación mínima (0-1)")
+    parser.add_argument('--workers', type=int, help="Procesos para puntuar (por defecto uno por CPU)")
+    parser.add_argument('--limit', type=int, help="Número máximo de pares")
+    parser.add_argument('--output', help="Guardar la lista de revisión en un CSV")
+    args = parser.parse_args()
+
+    db_manager = DatabaseManager(args.db)
+    detector = DuplicateDetector(db_manager, threshold=args.threshold, workers=args.workers)
+    candidates = detector.find_duplicates(limit=args.limit)
+    stats = detector.last_stats
+
+    print(f"{stats['patients']} pacientes, {stats['blocks']} bloques, "
+          f"{stats['pairs_compared']} pares comparados, {stats['candidates']} posibles duplicados")
+    if stats['oversized_blocks']:
+        print(f"Bloques omitidos por tamaño: {', '.join(stats['oversized_blocks'][:10])}")
+
+    if args.output:
+        patients = PatientManager(db_manager).get_patients_by_ids(
+            {c['patient_id'] for c in candidates} | {c['duplicate_id'] for c in candidates}
+        )
+        with open(args.output, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['puntuacion', 'conservar_id', 'conservar', 'duplicado_id', 'duplicado', 'coincidencias'])
+            for c in candidates:
+                keep, duplicate = patients.get(c['patient_id'], {}), patients.get(c['duplicate_id'], {})
+                writer.writerow([
+                    c['score'],
+                    c['patient_id'], f"{keep.get('nombre', '')} {keep.get('apellidos', '')}",
+                    c['duplicate_id'], f"{duplicate.get('nombre', '')} {duplicate.get('apellidos', '')}",
+                    ' '.join(c['reasons'])
+                ])
+        print(f"Lista de revisión guardada en {args.output}")
+    else:
+        for c in candidates[:20]:
+            print(f"  {c['score']:.2f}  {c['patient_id']} <- {c['duplicate_id']}  ({', '.join(c['reasons'])})")
+
+    db_manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# =============================================
+# Nombre del archivo: medical_record_manager.py
+# Propósito: Gestión del historial médico de los pacientes
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Módulo para la gestión del historial médico (tabla medical_records).
+
+Los textos clínicos largos (síntomas, diagnóstico, plan de tratamiento y notas)
+se guardan comprimidos con zlib como BLOB y se descomprimen al leerlos; los
+cortos se guardan como texto. Los registros antiguos en texto plano se leen igual.
+"""
+import os
+import sys
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+# Asegurar que podemos importar desde el directorio raíz
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.database import DatabaseManager
+
+# Campos de texto que se comprimen
+COMPRESSED_FIELDS = ('symptoms', 'diagnosis', 'treatment_plan', 'notes')
+# Por debajo de este tamaño (en bytes UTF-8) no compensa comprimir
+COMPRESS_MIN_BYTES = 256
+# Registros por página de list_records
+RECORDS_PAGE_SIZE = 20
+
+
+def pack_text(text: Optional[str]) -> Any:
+    """
+    Prepara un texto clínico para guardarlo.
+
+    Args:
+        text: Texto original (None se guarda como NULL)
+
+    Returns:
+        El texto sin cambios si es corto o no se reduce, o sus bytes comprimidos con zlib
+    """
+    if text is None:
+        return None
+    raw = text.encode('utf-8')
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return text
+    packed = zlib.compress(raw)
+    return packed if len(packed) < len(raw) else text
+
+
+def unpack_text(value: Any) -> Optional[str]:
+    """
+    Recupera un texto guardado con pack_text.
+
+    Args:
+        value: Valor leído de la base de datos (texto, BLOB comprimido o None)
+
+    Returns:
+        El texto original
+    """
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+class MedicalRecordManager:
+    """Clase para gestionar el historial médico de los pacientes."""
+
+    def __init__(self, db_manager=None):
+        """
+        Inicializa el gestor de historial médico.
+
+        Args:
+            db_manager: Instancia de DatabaseManager (opcional)
+        """
+        self.db_manager = db_manager or DatabaseManager()
+
+    def _unpack(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Descomprime los campos de texto de un registro leído."""
+        for field in COMPRESSED_FIELDS:
+            if field in record:
+                record[field] = unpack_text(record[field])
+        return record
+
+    def add_record(self, record_data: Dict[str, Any]) -> Optional[int]:
+        """
+        Agrega un registro al historial médico de un paciente.
+
+        Args:
+            record_data: Diccionario con patient_id y, opcionalmente, record_date
+                         ('AAAA-MM-DD HH:MM:SS'), symptoms, diagnosis, treatment_plan y notes
+
+        Returns:
+            ID del registro creado o None si hubo un error
+        """
+        try:
+            if not record_data.get('patient_id'):
+                return None
+
+            db_data = {'patient_id': record_data['patient_id']}
+            if record_data.get('record_date'):
+                db_data['record_date'] = record_data['record_date']
+            for field in COMPRESSED_FIELDS:
+                db_data[field] = pack_text(record_data.get(field))
+
+            return self.db_manager.insert_record('medical_records', db_data)
+
+        except Exception as e:
+            print(f"Error al agregar registro médico: {e}")
+            return None
+
+    def update_record(self, record_id: int, record_data: Dict[str, Any]) -> bool:
+        """
+        Actualiza los textos de un registro del historial médico.
+
+        Args:
+            record_id: ID del registro
+            record_data: Campos a modificar (symptoms, diagnosis, treatment_plan, notes, record_date)
+
+        Returns:
+            True si la actualización fue exitosa, False en caso contrario
+        """
+        try:
+            db_data = {field: pack_text(record_data[field]) for field in COMPRESSED_FIELDS if field in record_data}
+            if record_data.get('record_date'):
+                db_data['record_date'] = record_data['record_date']
+            if not db_data:
+                return False
+            return self.db_manager.update_record('medical_records', record_id, db_data)
+
+        except Exception as e:
+            print(f"Error al actualizar registro médico: {e}")
+            return False
+
+    def delete_record(self, record_id: int) -> bool:
+        """
+        Elimina un registro del historial médico.
+
+        Args:
+            record_id: ID del registro
+
+        Returns:
+            True si la eliminación fue exitosa, False en caso contrario
+        """
+        try:
+            return self.db_manager.delete_record('medical_records', record_id)
+        except Exception as e:
+            print(f"Error al eliminar registro médico: {e}")
+            return False
+
+    def get_record(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene un registro del historial médico con sus textos completos.
+
+        Args:
+            record_id: ID del registro
+
+        Returns:
+            Diccionario con el registro o None si no existe
+        """
+        try:
+            query = """
+                    SELECT id, patient_id, record_date, symptoms, diagnosis, treatment_plan, notes
+                    FROM medical_records
+                    WHERE id = ? \
+                    """
+            record = self.db_manager.execute_query(query, (record_id,), fetch_one=True)
+            return self._unpack(record) if record else None
+
+        except Exception as e:
+            print(f"Error al obtener registro médico: {e}")
+            return None
+
+    def list_records(self, patient_id: int, limit: int = RECORDS_PAGE_SIZE,
+                     before: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene una página del historial médico de un paciente, del más reciente al más antiguo.
+
+        Sólo se leen y descomprimen los registros de la página pedida; el índice
+        (patient_id, record_date, id) los devuelve ya ordenados.
+
+        Args:
+            patient_id: ID del paciente
+            limit: Número máximo de registros de la página
+            before: (record_date, id) del último registro de la página anterior
+                    (ver page_cursor); None para la primera página
+
+        Returns:
+            Lista de registros con sus textos descomprimidos. Si tiene menos de
+            limit elementos, es la última página.
+        """
+        try:
+            record_date, record_id = before or (None, None)
+            query = """
+                    SELECT id, patient_id, record_date, symptoms, diagnosis, treatment_plan, notes
+                    FROM medical_records
+                    WHERE patient_id = ?
+                      AND (? IS NULL OR (record_date, id) < (?, ?))
+                    ORDER BY record_date DESC, id DESC
+                    LIMIT ? \
+                    """
+            records = self.db_manager.execute_query(
+                query, (patient_id, record_date, record_date, record_id, limit), fetch_all=True
+            )
+            return [self._unpack(record) for record in records]
+
+        except Exception as e:
+            print(f"Error al obtener el historial médico: {e}")
+            return []
+
+    @staticmethod
+    def page_cursor(record: Dict[str, Any]) -> Tuple[str, int]:
+        """
+        Cursor para pedir la página siguiente a la que termina en record.
+
+        Args:
+            record: Último registro de una página de list_records
+
+        Returns:
+            tuple: (record_date, id), el valor de before de la página siguiente
+        """
+        return record['record_date'], record['id']
+
+    def count_records(self, patient_id: int) -> int:
+        """
+        Cuenta los registros del historial médico de un paciente.
+
+        Args:
+            patient_id: ID del paciente
+
+        Returns:
+            int: Número de registros (0 si hay un error)
+        """
+        try:
+            result = self.db_manager.execute_query(
+                "SELECT COUNT(*) AS total FROM medical_records WHERE patient_id = ?", (patient_id,), fetch_one=True
+            )
+            return result['total'] if result else 0
+        except Exception as e:
+            print(f"Error al contar registros médicos: {e}")
+            return 0
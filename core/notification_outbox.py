@@ -0,0 +1,264 @@
+# =============================================
+# Nombre del archivo: notification_outbox.py
+# Propósito: Bandeja de salida persistente de notificaciones y su hilo de envío
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Bandeja de salida (tabla notification_outbox) para las notificaciones de citas.
+
+Los gestores guardan la notificación con enqueue() dentro de la misma transacción
+que modifica la cita: si la transacción se revierte no queda notificación, y si
+se confirma la notificación ya está en disco aunque el programa se cierre antes
+de enviarla. OutboxWorker la envía después en un hilo aparte, de modo que el
+tiempo de respuesta de una reserva no depende del servidor SMTP.
+
+La entrega es "al menos una vez": si el proceso cae entre el envío y la marca de
+enviada, la notificación se vuelve a enviar al vencer su reserva.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# Asegurar que podemos importar desde el directorio raíz
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.database import DatabaseManager
+
+logger = logging.getLogger('notification_outbox')
+
+# Notificaciones reservadas por cada ciclo del hilo de envío
+OUTBOX_BATCH_SIZE = 20
+# Segundos entre ciclos del hilo de envío
+OUTBOX_POLL_INTERVAL = 5.0
+# Segundos que una notificación reservada queda apartada de otros envíos
+OUTBOX_LEASE_SECONDS = 120
+# Intentos antes de marcar una notificación como fallida
+OUTBOX_MAX_ATTEMPTS = 8
+# Espera tras el primer fallo; se dobla en cada intento hasta OUTBOX_MAX_BACKOFF
+OUTBOX_BASE_BACKOFF = 30
+OUTBOX_MAX_BACKOFF = 3600
+
+# Estados de una notificación
+PENDING = 'pending'
+SENT = 'sent'
+DISCARDED = 'discarded'  # El emisor no la envió (p. ej. correo sin configurar)
+FAILED = 'failed'
+
+# Emisor: recibe la notificación (con payload ya decodificado) y devuelve True si
+# la envió o False si la descarta; una excepción provoca un reintento.
+Sender = Callable[[Dict[str, Any]], bool]
+
+
+class NotificationOutbox:
+    """Operaciones sobre la tabla notification_outbox."""
+
+    def __init__(self, db_manager: Optional[DatabaseManager] = None):
+        """
+        Inicializa la bandeja de salida.
+
+        Args:
+            db_manager: Instancia de DatabaseManager (opcional)
+        """
+        self.db_manager = db_manager or DatabaseManager()
+
+    def enqueue(self, kind: str, recipient: str, payload: Dict[str, Any],
+                appointment_id: Optional[int] = None) -> int:
+        """
+        Guarda una notificación pendiente.
+
+        Si se llama dentro de DatabaseManager.transaction(), se confirma (o se
+        revierte) junto con el resto de la transacción.
+
+        Args:
+            kind: Tipo de notificación (p. ej. 'appointment_created')
+            recipient: Dirección de correo del destinatario
+            payload: Datos para construir el mensaje (serializables a JSON)
+            appointment_id: Cita relacionada (opcional)
+
+        Returns:
+            int: ID de la notificación
+        """
+        return self.db_manager.insert_record('notification_outbox', {
+            'kind': kind,
+            'appointment_id': appointment_id,
+            'recipient': recipient,
+            'payload': json.dumps(payload, ensure_ascii=False),
+        })
+
+    def claim(self, limit: int = OUTBOX_BATCH_SIZE,
+              lease_seconds: int = OUTBOX_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Reserva las notificaciones pendientes cuyo momento de envío ya llegó.
+
+        La lectura y la reserva van en una transacción BEGIN IMMEDIATE, así que
+        dos puestos con su propio hilo de envío no reservan la misma notificación.
+
+        Args:
+            limit: Máximo de notificaciones a reservar
+            lease_seconds: Segundos durante los que nadie más las reservará
+
+        Returns:
+            list: Notificaciones (id, kind, appointment_id, recipient, payload
+                  decodificado y attempts, ya contando este intento)
+        """
+        with self.db_manager.transaction(immediate=True) as tx:
+            rows = tx.execute(
+                """
+                SELECT id, kind, appointment_id, recipient, payload, attempts
+                FROM notification_outbox
+                WHERE status = 'pending'
+                  AND next_attempt_at <= datetime('now')
+                ORDER BY next_attempt_at, id
+                LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+            tx.connection.executemany(
+                "UPDATE notification_outbox SET attempts = attempts + 1, next_attempt_at = datetime('now', ?) "
+                "WHERE id = ?",
+                [(f"+{int(lease_seconds)} seconds", row['id']) for row in rows]
+            )
+
+        notifications = []
+        for row in rows:
+            notification = dict(row)
+            notification['payload'] = json.loads(notification['payload'])
+            notification['attempts'] += 1
+            notifications.append(notification)
+        return notifications
+
+    def mark_done(self, notification_id: int, status: str = SENT) -> None:
+        """
+        Marca una notificación como enviada o descartada.
+
+        Args:
+            notification_id: ID de la notificación
+            status: SENT o DISCARDED
+        """
+        self.db_manager.execute_query(
+            "UPDATE notification_outbox SET status = ?, sent_at = datetime('now'), last_error = NULL WHERE id = ?",
+            (status, notification_id)
+        )
+
+    def mark_failed(self, notification: Dict[str, Any], error: str,
+                    max_attempts: int = OUTBOX_MAX_ATTEMPTS) -> None:
+        """
+        Registra un envío fallido y programa el siguiente intento.
+
+        Args:
+            notification: Notificación devuelta por claim
+            error: Descripción del error
+            max_attempts: Intentos tras los que se marca como FAILED
+        """
+        attempts = notification['attempts']
+        status = FAILED if attempts >= max_attempts else PENDING
+        backoff = min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * (2 ** (attempts - 1)))
+        self.db_manager.execute_query(
+            "UPDATE notification_outbox SET status = ?, last_error = ?, next_attempt_at = datetime('now', ?) "
+            "WHERE id = ?",
+            (status, error[:1000], f"+{backoff} seconds", notification['id'])
+        )
+
+    def pending_count(self) -> int:
+        """
+        Cuenta las notificaciones pendientes de enviar.
+
+        Returns:
+            int: Notificaciones pendientes (incluidas las reservadas)
+        """
+        result = self.db_manager.execute_query(
+            "SELECT COUNT(*) AS total FROM notification_outbox WHERE status = 'pending'", fetch_one=True
+        )
+        return result['total'] if result else 0
+
+
+class OutboxWorker:
+    """
+    Hilo en segundo plano que entrega las notificaciones de la bandeja de salida.
+
+    En cada ciclo reserva un bloque de notificaciones, las pasa al emisor una a
+    una y registra el resultado. Un error en una notificación no detiene las demás.
+    """
+
+    def __init__(
+            self,
+            db_manager: DatabaseManager,
+            sender: Sender,
+            interval: float = OUTBOX_POLL_INTERVAL,
+            batch_size: int = OUTBOX_BATCH_SIZE
+    ):
+        """
+        Inicializa el hilo de envío.
+
+        Args:
+            db_manager: Base de datos con la bandeja de salida
+            sender: Función que envía una notificación (ver Sender)
+            interval: Segundos entre ciclos cuando no queda nada por enviar
+            batch_size: Notificaciones reservadas por ciclo
+        """
+        self.outbox = NotificationOutbox(db_manager)
+        self.sender = sender
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        Entrega un bloque de notificaciones.
+
+        Returns:
+            dict: Número de notificaciones enviadas, descartadas y fallidas
+        """
+        counts = {SENT: 0, DISCARDED: 0, FAILED: 0}
+        for notification in self.outbox.claim(self.batch_size):
+            if self._stop_event.is_set():
+                # Las reservadas y no enviadas vuelven a estar pendientes al vencer la reserva
+                break
+            try:
+                status = SENT if self.sender(notification) else DISCARDED
+            except Exception as e:
+                logger.warning(f"Error al enviar la notificación {notification['id']}: {e}")
+                self.outbox.mark_failed(notification, str(e))
+                counts[FAILED] += 1
+                continue
+            self.outbox.mark_done(notification['id'], status)
+            counts[status] += 1
+        return counts
+
+    def _run(self) -> None:
+        """Bucle del hilo de envío."""
+        while not self._stop_event.is_set():
+            try:
+                counts = self.run_once()
+            except Exception as e:
+                logger.warning(f"Ciclo de envío de notificaciones fallido: {e}")
+                counts = {}
+            # Si el bloque salió lleno puede quedar más: seguir sin esperar
+            if sum(counts.values()) < self.batch_size:
+                self._stop_event.wait(self.interval)
+
+    def start(self) -> 'OutboxWorker':
+        """Inicia el envío en un hilo demonio (si no estaba iniciado)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='notification-outbox', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Detiene el envío (termina la notificación en curso).
+
+        Args:
+            timeout (float): Segundos máximos de espera a que termine el hilo
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
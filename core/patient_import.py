@@ -0,0 +1,608 @@
+# =============================================
+# Nombre del archivo: patient_import.py
+# Propósito: Importación masiva de pacientes desde archivos CSV o Excel
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Importación de pacientes desde hojas de cálculo (CSV o XLSX).
+
+El archivo se lee fila a fila sin cargarlo entero en memoria; las columnas se
+asignan a los campos de PatientManager (nombre, apellidos, ...), cada fila se
+valida y normaliza, y las filas válidas se insertan por bloques, cada uno en su
+propia transacción. Las filas rechazadas se escriben en un archivo CSV con el
+motivo. Si la importación se interrumpe, al repetirla se reanuda desde el último
+bloque confirmado; un archivo que ya se importó entero no se vuelve a importar
+salvo que se fuerce.
+
+Uso:
+    python core/patient_import.py pacientes.csv [--dry-run] [--rejects rechazos.csv] [--force]
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import csv
+import datetime
+import hashlib
+import os
+import re
+import sys
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.patient_manager import PatientManager
+from db.database import DB_PATH, DatabaseManager
+from utils.text_utils import is_phone_like, normalize_text
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_CHUNK_SIZE = 5000  # Filas por transacción
+FINGERPRINT_BYTES = 1024 * 1024  # Bytes del inicio del archivo usados para identificarlo
+
+PATIENT_FIELDS = ('nombre', 'apellidos', 'fecha_nacimiento', 'telefono', 'email', 'direccion', 'notas_medicas')
+REQUIRED_FIELDS = ('nombre', 'apellidos')
+
+# Encabezados reconocidos (normalizados con normalize_text) para cada campo
+COLUMN_ALIASES = {
+    'nombre': ('nombre', 'nombres', 'first name', 'first_name', 'name'),
+    'apellidos': ('apellidos', 'apellido', 'last name', 'last_name', 'surname'),
+    'fecha_nacimiento': ('fecha_nacimiento', 'fecha de nacimiento', 'fecha nacimiento', 'nacimiento',
+                         'birthdate', 'date of birth', 'dob'),
+    'telefono': ('telefono', 'tel', 'tel.', 'movil', 'celular', 'phone'),
+    'email': ('email', 'e-mail', 'correo', 'correo electronico', 'mail'),
+    'direccion': ('direccion', 'domicilio', 'address'),
+    'notas_medicas': ('notas_medicas', 'notas medicas', 'notas', 'observaciones', 'notes'),
+}
+
+# Formatos de fecha aceptados; se guardan como DD/MM/AAAA, igual que el formulario de pacientes
+DATE_FORMATS = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d.%m.%Y', '%Y/%m/%d')
+CSV_DELIMITERS = (',', ';', '\t')  # Excel en español exporta con ';'
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_WHITESPACE = re.compile(r'\s+')
+
+# Callback de avance: (filas procesadas, pacientes insertados, filas rechazadas)
+ProgressCallback = Callable[[int, int, int], None]
+# Fila leída del archivo: (número de fila en el archivo, {encabezado: valor})
+SourceRow = Tuple[int, Dict[str, Any]]
+
+
+# =============================================
+# Lectura de archivos
+# =============================================
+def read_rows(path: str, sheet: Optional[str] = None) -> Tuple[List[str], Iterator[SourceRow]]:
+    """
+    Abre un archivo CSV o XLSX para leerlo fila a fila.
+
+    Args:
+        path (str): Ruta del archivo (.csv, .txt o .xlsx)
+        sheet (str): Hoja de Excel a leer (por defecto la activa)
+
+    Returns:
+        tuple: (encabezados, iterador de (número de fila, {encabezado: valor}))
+
+    Raises:
+        ValueError: Si el formato no es compatible o el archivo no tiene encabezados
+        ImportError: Si es un XLSX y openpyxl no está instalado
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.csv', '.txt'):
+        return _read_csv(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return _read_xlsx(path, sheet)
+    raise ValueError(f"Formato de archivo no compatible: {extension or path}")
+
+
+def _read_csv(path: str) -> Tuple[List[str], Iterator[SourceRow]]:
+    """Lector de CSV; el separador (',' ';' o tabulador) se deduce de la línea de encabezados."""
+    f = open(path, 'r', encoding='utf-8-sig', newline='')
+    try:
+        header_line = f.readline()
+        f.seek(0)
+        delimiter = max(CSV_DELIMITERS, key=header_line.count)
+        reader = csv.reader(f, delimiter=delimiter)
+        headers = next(reader, None)
+    except Exception:
+        f.close()
+        raise
+    if not headers:
+        f.close()
+        raise ValueError("El archivo no tiene fila de encabezados")
+    headers = [header.strip() for header in headers]
+
+    def rows() -> Iterator[SourceRow]:
+        with f:
+            for values in reader:
+                if any(value.strip() for value in values):
+                    yield reader.line_num, dict(zip(headers, values))
+
+    return headers, rows()
+
+
+def _read_xlsx(path: str, sheet: Optional[str]) -> Tuple[List[str], Iterator[SourceRow]]:
+    """Lector de Excel en modo de sólo lectura (las filas se leen bajo demanda)."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as e:
+        raise ImportError("Para importar archivos Excel es necesario instalar openpyxl") from e
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    worksheet = workbook[sheet] if sheet else workbook.active
+    values_iter = worksheet.iter_rows(values_only=True)
+    headers = next(values_iter, None)
+    if not headers:
+        workbook.close()
+        raise ValueError("La hoja no tiene fila de encabezados")
+    headers = ['' if header is None else str(header).strip() for header in headers]
+
+    def rows() -> Iterator[SourceRow]:
+        try:
+            for line, values in enumerate(values_iter, start=2):
+                if any(value not in (None, '') for value in values):
+                    yield line, dict(zip(headers, values))
+        finally:
+            workbook.close()
+
+    return headers, rows()
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Identifica el contenido de un archivo para reanudar sólo importaciones del mismo archivo.
+
+    Args:
+        path (str): Ruta del archivo
+
+    Returns:
+        str: Tamaño y SHA-1 del primer MB del archivo
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+    return f"{os.path.getsize(path)}:{digest.hexdigest()}"
+
+
+# =============================================
+# Asignación de columnas y validación
+# =============================================
+def map_columns(headers: List[str], column_map: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Asigna los encabezados del archivo a los campos del paciente.
+
+    Args:
+        headers (list): Encabezados del archivo
+        column_map (dict): Asignaciones explícitas {encabezado: campo}; tienen
+                           prioridad sobre los alias de COLUMN_ALIASES
+
+    Returns:
+        dict: {encabezado: campo} de las columnas que se importan
+
+    Raises:
+        ValueError: Si un campo de column_map no existe, un campo se asigna a dos
+                    columnas o faltan columnas obligatorias
+    """
+    mapping: Dict[str, str] = {}
+    for header, field in (column_map or {}).items():
+        if field not in PATIENT_FIELDS:
+            raise ValueError(f"Campo desconocido en la asignación de columnas: {field}")
+        if header not in headers:
+            raise ValueError(f"La columna '{header}' no está en el archivo")
+        mapping[header] = field
+
+    aliases = {alias: field for field, names in COLUMN_ALIASES.items() for alias in names}
+    for header in headers:
+        field = aliases.get(normalize_text(header))
+        if header not in mapping and field and field not in mapping.values():
+            mapping[header] = field
+
+    fields = list(mapping.values())
+    duplicated = sorted({field for field in fields if fields.count(field) > 1})
+    if duplicated:
+        raise ValueError(f"Campos asignados a más de una columna: {', '.join(duplicated)}")
+    missing = [field for field in REQUIRED_FIELDS if field not in fields]
+    if missing:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+    return mapping
+
+
+def _as_text(value: Any) -> str:
+    """Convierte el valor de una celda en texto sin espacios sobrantes."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel guarda los teléfonos escritos como número en coma flotante
+        value = int(value)
+    return _WHITESPACE.sub(' ', str(value)).strip()
+
+
+def _parse_date(value: Any) -> str:
+    """Normaliza una fecha a DD/MM/AAAA; lanza ValueError si no es válida."""
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    if isinstance(value, datetime.date):
+        date = value
+    else:
+        text = _as_text(value)
+        for date_format in DATE_FORMATS:
+            try:
+                date = datetime.datetime.strptime(text, date_format).date()
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"Fecha de nacimiento no válida: {text}")
+    if date > datetime.date.today():
+        raise ValueError(f"Fecha de nacimiento futura: {date.strftime('%d/%m/%Y')}")
+    return date.strftime('%d/%m/%Y')
+
+
+def normalize_row(row: Dict[str, Any], mapping: Dict[str, str]) -> Dict[str, str]:
+    """
+    Valida una fila y la convierte en los datos de un paciente.
+
+    Args:
+        row (dict): Fila del archivo {encabezado: valor}
+        mapping (dict): Asignación de columnas de map_columns
+
+    Returns:
+        dict: Datos del paciente con las claves de PATIENT_FIELDS
+
+    Raises:
+        ValueError: Con el motivo del rechazo si la fila no es válida
+    """
+    patient = {field: '' for field in PATIENT_FIELDS}
+    for header, field in mapping.items():
+        value = row.get(header)
+        if field == 'fecha_nacimiento' and value not in (None, ''):
+            patient[field] = _parse_date(value)
+        elif field == 'notas_medicas':
+            patient[field] = '' if value is None else str(value).strip()
+        else:
+            patient[field] = _as_text(value)
+
+    missing = [field for field in REQUIRED_FIELDS if not patient[field]]
+    if missing:
+        raise ValueError(f"Faltan campos obligatorios: {', '.join(missing)}")
+    if patient['telefono'] and not is_phone_like(patient['telefono']):
+        raise ValueError(f"Teléfono no válido: {patient['telefono']}")
+    if patient['email']:
+        patient['email'] = patient['email'].lower()
+        if not _EMAIL.match(patient['email']):
+            raise ValueError(f"Email no válido: {patient['email']}")
+    return patient
+
+
+# =============================================
+# Importador
+# =============================================
+class PatientImporter:
+    """
+    Importa pacientes por bloques con reanudación y archivo de rechazos.
+
+    Cada bloque de filas válidas se inserta con PatientManager.add_patients en
+    una transacción que también guarda el avance en import_jobs; un fallo a mitad
+    de bloque sólo revierte ese bloque. Las filas rechazadas de un bloque se
+    escriben en el archivo de rechazos antes de confirmarlo: si el proceso cae
+    entre ambos pasos, al reanudar se repiten en el archivo en lugar de perderse.
+    """
+
+    def __init__(self, patient_manager: Optional[PatientManager] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Inicializa el importador.
+
+        Args:
+            patient_manager (PatientManager): Gestor de pacientes de la base de datos destino
+            chunk_size (int): Filas del archivo por transacción
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size debe ser mayor o igual a 1")
+
+        self.patient_manager = patient_manager or PatientManager()
+        self.db_manager = self.patient_manager.db_manager
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def default_rejects_path(path: str) -> str:
+        """Archivo de rechazos por defecto: <archivo>_rechazados.csv junto al original."""
+        return f"{os.path.splitext(path)[0]}_rechazados.csv"
+
+    def find_completed_job(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una importación terminada de un archivo con el mismo contenido.
+
+        La búsqueda es por la huella del archivo (ver file_fingerprint), no por su
+        ruta, de modo que también reconoce una copia del archivo ya importado.
+
+        Args:
+            path (str): Archivo de origen
+
+        Returns:
+            dict: Última fila de import_jobs terminada, o None si no hay ninguna
+        """
+        query = """
+                SELECT *
+                FROM import_jobs
+                WHERE source_fingerprint = ? AND status = 'completed'
+                ORDER BY id DESC
+                LIMIT 1 \
+                """
+        return self.db_manager.execute_query(query, (file_fingerprint(path),), fetch_one=True)
+
+    def find_resumable_job(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una importación sin terminar del mismo archivo.
+
+        Args:
+            path (str): Archivo de origen
+
+        Returns:
+            dict: Fila de import_jobs a reanudar, o None si no hay ninguna
+        """
+        query = """
+                SELECT *
+                FROM import_jobs
+                WHERE source_path = ? AND source_fingerprint = ? AND status IN ('running', 'failed')
+                ORDER BY id DESC
+                LIMIT 1 \
+                """
+        return self.db_manager.execute_query(
+            query, (os.path.abspath(path), file_fingerprint(path)), fetch_one=True
+        )
+
+    def run(
+        self,
+        path: str,
+        column_map: Optional[Dict[str, str]] = None,
+        dry_run: bool = False,
+        rejects_path: Optional[str] = None,
+        resume: bool = True,
+        sheet: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        force: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Importa los pacientes de un archivo.
+
+        Si el mismo archivo ya se importó entero, no se hace nada (el resultado
+        lleva already_imported) salvo que se indique force.
+
+        Args:
+            path (str): Archivo CSV o XLSX
+            column_map (dict): Asignaciones explícitas {encabezado: campo}
+            dry_run (bool): Si True, sólo valida y escribe los rechazos, sin insertar
+            rejects_path (str): Archivo CSV de rechazos (por defecto junto al original)
+            resume (bool): Si True, continúa una importación interrumpida del mismo archivo
+            sheet (str): Hoja de Excel a leer
+            progress (callable): Se llama tras cada bloque con (procesadas, insertadas, rechazadas)
+            force (bool): Si True, importa el archivo aunque ya se haya importado
+
+        Returns:
+            dict: {
+                'job_id': ID en import_jobs (None en dry_run),
+                'already_imported': ID de la importación terminada del mismo archivo
+                                    si por ello no se importó nada (si no, None),
+                'processed': Filas del archivo procesadas (incluidas las de una ejecución anterior),
+                'inserted': Pacientes insertados,
+                'rejected': Filas rechazadas,
+                'resumed_from': Filas que ya estaban confirmadas al empezar,
+                'rejects_path': Archivo de rechazos (None si no hubo rechazos),
+                'mapping': Asignación de columnas usada
+            }
+
+        Raises:
+            ValueError: Si el archivo no se puede leer o le faltan columnas obligatorias
+            sqlite3.Error: Si falla la base de datos (el trabajo queda como 'failed' y
+                           puede reanudarse)
+        """
+        headers, rows = read_rows(path, sheet)
+        mapping = map_columns(headers, column_map)
+        rejects_path = rejects_path or self.default_rejects_path(path)
+
+        job = None
+        if not dry_run and not force:
+            completed = self.find_completed_job(path)
+            if completed:
+                return {
+                    'job_id': None, 'already_imported': completed['id'], 'processed': 0, 'inserted': 0,
+                    'rejected': 0, 'resumed_from': 0, 'rejects_path': None, 'mapping': mapping,
+                }
+
+        if not dry_run:
+            job = self.find_resumable_job(path) if resume else None
+            if job is None:
+                job_id = self.db_manager.insert_record('import_jobs', {
+                    'source_path': os.path.abspath(path),
+                    'source_fingerprint': file_fingerprint(path),
+                    'rejects_path': os.path.abspath(rejects_path),
+                })
+                job = {'id': job_id, 'rows_done': 0, 'inserted': 0, 'rejected': 0}
+            else:
+                self._update_job(job['id'], status='running', error=None)
+
+        result = {
+            'job_id': job['id'] if job else None,
+            'already_imported': None,
+            'processed': job['rows_done'] if job else 0,
+            'inserted': job['inserted'] if job else 0,
+            'rejected': job['rejected'] if job else 0,
+            'resumed_from': job['rows_done'] if job else 0,
+            'rejects_path': None,
+            'mapping': mapping,
+        }
+
+        # Las filas de bloques ya confirmados se leen pero no se procesan
+        rows = islice(rows, result['resumed_from'], None)
+        # Al reanudar se añade al archivo de rechazos de la ejecución anterior
+        rejects = _RejectsWriter(rejects_path, headers, append=result['resumed_from'] > 0)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+
+                valid: List[Tuple[int, Dict[str, Any], Dict[str, str]]] = []
+                rejected: List[Tuple[int, Dict[str, Any], str]] = []
+                for line, row in chunk:
+                    try:
+                        valid.append((line, row, normalize_row(row, mapping)))
+                    except ValueError as e:
+                        rejected.append((line, row, str(e)))
+
+                if dry_run:
+                    inserted = len(valid)
+                    rejects.write(rejected)
+                else:
+                    inserted, rejected = self._commit_chunk(
+                        job['id'], result['processed'] + len(chunk), valid, rejected, rejects
+                    )
+
+                result['processed'] += len(chunk)
+                result['inserted'] += inserted
+                result['rejected'] += len(rejected)
+                if progress:
+                    progress(result['processed'], result['inserted'], result['rejected'])
+        except Exception as e:
+            if job:
+                self._update_job(job['id'], status='failed', error=str(e) or type(e).__name__)
+            raise
+        finally:
+            rejects.close()
+
+        if job:
+            self._update_job(job['id'], status='completed')
+        result['rejects_path'] = rejects_path if result['rejected'] else None
+        return result
+
+    def _commit_chunk(
+        self,
+        job_id: int,
+        rows_done: int,
+        valid: List[Tuple[int, Dict[str, Any], Dict[str, str]]],
+        rejected: List[Tuple[int, Dict[str, Any], str]],
+        rejects: '_RejectsWriter'
+    ) -> Tuple[int, List[Tuple[int, Dict[str, Any], str]]]:
+        """
+        Inserta un bloque y registra el avance del trabajo en la misma transacción.
+
+        Los rechazos del bloque (los de la validación y los que rechaza la base
+        de datos) se escriben antes de confirmar la transacción que avanza rows_done.
+
+        Returns:
+            tuple: (pacientes insertados, filas rechazadas del bloque)
+        """
+        with self.db_manager.transaction(immediate=True) as tx:
+            outcome = self.patient_manager.add_patients([patient for _, _, patient in valid])
+            rejected = rejected + [
+                (valid[failure['index']][0], valid[failure['index']][1], failure['error'])
+                for failure in outcome['failed']
+            ]
+            tx.execute(
+                """
+                UPDATE import_jobs
+                SET rows_done  = ?,
+                    inserted   = inserted + ?,
+                    rejected   = rejected + ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? \
+                """,
+                (rows_done, outcome['inserted'], len(rejected), job_id)
+            )
+            rejects.write(rejected)
+        return outcome['inserted'], rejected
+
+    def _update_job(self, job_id: int, **fields: Any) -> None:
+        """Actualiza el estado de un trabajo de importación."""
+        # Misma referencia (UTC) que CURRENT_TIMESTAMP
+        fields['updated_at'] = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        self.db_manager.update_record('import_jobs', job_id, fields)
+
+
+class _RejectsWriter:
+    """Archivo CSV de filas rechazadas: fila, motivo y los valores originales."""
+
+    def __init__(self, path: str, headers: List[str], append: bool):
+        self.path = path
+        self.headers = headers
+        self.count = 0
+        self._append = append and os.path.exists(path)
+        self._file = None
+        self._writer = None
+
+    def write(self, rejected: List[Tuple[int, Dict[str, Any], str]]) -> None:
+        """
+        Añade las filas rechazadas de un bloque, ordenadas por fila, y las lleva a disco.
+
+        El archivo se crea con el primer rechazo.
+        """
+        if not rejected:
+            return
+        if self._writer is None:
+            self._file = open(self.path, 'a' if self._append else 'w', encoding='utf-8-sig', newline='')
+            self._writer = csv.writer(self._file)
+            if not self._append:
+                self._writer.writerow(['fila', 'motivo'] + self.headers)
+        for line, row, error in sorted(rejected, key=lambda reject: reject[0]):
+            self._writer.writerow([line, error] + [_as_text(row.get(header)) for header in self.headers])
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.count += len(rejected)
+
+    def close(self) -> None:
+        """Cierra el archivo si llegó a abrirse."""
+        if self._file is not None:
+            self._file.close()
+
+
+# =============================================
+# Línea de comandos
+# =============================================
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Importar pacientes desde un archivo CSV o Excel")
+    parser.add_argument('path', help="Archivo CSV o XLSX")
+    parser.add_argument('--db', default=DB_PATH, help="Base de datos (por defecto data/clinic.db)")
+    parser.add_argument('--sheet', help="Hoja de Excel a importar (por defecto la activa)")
+    parser.add_argument('--map', action='append', default=[], metavar='COLUMNA=CAMPO',
+                        help=f"Asignar una columna a un campo ({', '.join(PATIENT_FIELDS)})")
+    parser.add_argument('--rejects', help="Archivo CSV de filas rechazadas")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Filas por transacción")
+    parser.add_argument('--dry-run', action='store_true', help="Validar sin insertar")
+    parser.add_argument('--no-resume', action='store_true', help="Empezar de cero aunque haya una importación sin terminar")
+    parser.add_argument('--force', action='store_true', help="Importar aunque el archivo ya se haya importado")
+    args = parser.parse_args()
+
+    column_map = dict(item.split('=', 1) for item in args.map)
+    db_manager = DatabaseManager(args.db)
+    importer = PatientImporter(PatientManager(db_manager), chunk_size=args.chunk_size)
+
+    def report(processed: int, inserted: int, rejected: int) -> None:
+        print(f"  {processed} filas procesadas, {inserted} insertadas, {rejected} rechazadas", flush=True)
+
+    try:
+        result = importer.run(
+            args.path, column_map=column_map, dry_run=args.dry_run, rejects_path=args.rejects,
+            resume=not args.no_resume, sheet=args.sheet, progress=report, force=args.force
+        )
+    finally:
+        db_manager.close_all()
+
+    if result['already_imported']:
+        print(f"El archivo ya se importó (trabajo {result['already_imported']}); use --force para importarlo de nuevo")
+        return
+
+    if result['resumed_from']:
+        print(f"Reanudada desde la fila {result['resumed_from']}")
+    verb = "válidas" if args.dry_run else "insertadas"
+    print(f"Importación terminada: {result['inserted']} {verb}, {result['rejected']} rechazadas")
+    if result['rejects_path']:
+        print(f"Filas rechazadas en {result['rejects_path']}")
+
+
+if __name__ == "__main__":
+    main()
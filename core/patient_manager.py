@@ -11,41 +11,185 @@ Módulo para la gestión de pacientes en el sistema de control de pacientes.
 Permite crear, modificar, eliminar y consultar información de pacientes.
 """
 import os
+import sqlite3
 import sys
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 
 # Asegurar que podemos importar desde el directorio raíz
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.medical_record_manager import unpack_text
 from db.database import DatabaseManager
+from utils.cache import LRUCache
+from utils.photo_store import PhotoStore
+from utils.text_utils import is_phone_like, normalize_phone, normalize_text, patient_search_keys, prefix_upper_bound
+
+# Resultados máximos de una búsqueda (la lista de la interfaz no muestra más)
+SEARCH_LIMIT = 100
+# Longitud mínima de una palabra para el índice de trigramas
+MIN_FTS_TERM_LENGTH = 3
+# Pacientes por página del listado (list_patients)
+LIST_PAGE_SIZE = 100
+
+# Caché de pacientes por ID, compartida por todos los PatientManager de la misma
+# base de datos para que la invalidación de uno afecte a todos.
+DEFAULT_CACHE_SIZE = 2000
+DEFAULT_CACHE_TTL = 60.0  # Segundos: acota el desfase con cambios hechos desde otros puestos
+_CACHES: Dict[str, LRUCache] = {}
+_CACHES_LOCK = threading.Lock()
+# Máximo de IDs por consulta IN (...) en get_patients_by_ids
+IDS_PER_QUERY = 500
+# Eventos por página del historial del paciente (get_timeline)
+TIMELINE_PAGE_SIZE = 50
+
+# Columnas que merge_patients copia del duplicado si están vacías en el paciente conservado
+MERGE_FILL_COLUMNS = ('birthdate', 'gender', 'phone', 'email', 'address', 'notes')
+
+# Borrado en cascada (purge_patients): los IDs de cada lote se cargan en una tabla
+# temporal y cada tabla dependiente se archiva y borra con una sola sentencia.
+PURGE_BATCH_SIZE = 1000
+ARCHIVE_ALIAS = 'archive'
+# (tabla, filas del lote, borrado) en orden de archivado; se borran en orden inverso
+_CASCADE = [
+    (
+        'patients',
+        "SELECT * FROM patients WHERE id IN (SELECT id FROM temp.purge_ids)",
+        "DELETE FROM patients WHERE id IN (SELECT id FROM temp.purge_ids)",
+    ),
+    (
+        'appointments',
+        "SELECT * FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids)",
+        "DELETE FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids)",
+    ),
+    (
+        'appointment_treatments',
+        """
+        SELECT * FROM appointment_treatments
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+        """
+        DELETE FROM appointment_treatments
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+    ),
+    (
+        'payments',
+        """
+        SELECT * FROM payments
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+        """
+        DELETE FROM payments
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+    ),
+    (
+        'email_tracking',
+        """
+        SELECT * FROM email_tracking
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+        """
+        DELETE FROM email_tracking
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+    ),
+    (
+        'notification_outbox',
+        """
+        SELECT * FROM notification_outbox
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+        """
+        DELETE FROM notification_outbox
+        WHERE appointment_id IN (SELECT id FROM appointments WHERE patient_id IN (SELECT id FROM temp.purge_ids))
+        """,
+    ),
+    (
+        'medical_records',
+        "SELECT * FROM medical_records WHERE patient_id IN (SELECT id FROM temp.purge_ids)",
+        "DELETE FROM medical_records WHERE patient_id IN (SELECT id FROM temp.purge_ids)",
+    ),
+    (
+        'patient_photos',
+        "SELECT * FROM patient_photos WHERE patient_id IN (SELECT id FROM temp.purge_ids)",
+        "DELETE FROM patient_photos WHERE patient_id IN (SELECT id FROM temp.purge_ids)",
+    ),
+]
+
+
+def _get_shared_cache(db_path: str, maxsize: int, ttl: Optional[float]) -> LRUCache:
+    """Obtiene (o crea) la caché de pacientes de una base de datos."""
+    key = os.path.abspath(db_path)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = _CACHES[key] = LRUCache(maxsize=maxsize, ttl=ttl)
+        return cache
 
 
 class PatientManager:
     """Clase para gestionar los pacientes en el sistema."""
 
-    def __init__(self, db_manager=None):
+    def __init__(self, db_manager=None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 cache_ttl: Optional[float] = DEFAULT_CACHE_TTL):
         """
         Inicializa el gestor de pacientes.
 
         Args:
             db_manager: Instancia de DatabaseManager (opcional)
+            cache_size: Pacientes que se mantienen en la caché por ID
+            cache_ttl: Segundos de validez de cada paciente en caché (None = sin caducidad).
+                       Tamaño y caducidad los fija el primer gestor creado para la base de datos.
         """
         self.db_manager = db_manager or DatabaseManager()
+        self.cache = _get_shared_cache(self.db_manager.db_path, cache_size, cache_ttl)
 
-        # Directorio para almacenar fotografías de pacientes
+        # Directorio para almacenar fotografías de pacientes (por hash de contenido)
         self.photos_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'photos')
-
-        # Crear el directorio si no existe
-        if not os.path.exists(self.photos_dir):
-            os.makedirs(self.photos_dir)
+        self.photo_store = PhotoStore(self.photos_dir)
 
     def get_all_patients(self) -> List[Dict[str, Any]]:
         """
         Obtiene todos los pacientes del sistema.
 
+        Recorre el listado página a página con list_patients. Las pantallas deben
+        usar list_patients directamente y pedir sólo la página que muestran.
+
         Returns:
             Lista de diccionarios con la información de los pacientes
         """
+        patients: List[Dict[str, Any]] = []
+        after = None
+        while True:
+            page = self.list_patients(after=after, limit=LIST_PAGE_SIZE)
+            patients += page
+            if len(page) < LIST_PAGE_SIZE:
+                return patients
+            after = self.page_cursor(page[-1])
+
+    def list_patients(self, after: Optional[Tuple[str, str, int]] = None,
+                      limit: int = LIST_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """
+        Obtiene una página del listado de pacientes ordenado por apellidos y nombre.
+
+        La paginación es por clave: en lugar de OFFSET se indica el último
+        paciente de la página anterior, de modo que el coste de cada página no
+        depende de su posición ni del tamaño del registro.
+
+        Args:
+            after: (apellidos, nombre, id) del último paciente de la página anterior
+                   (ver page_cursor); None para la primera página
+            limit: Número máximo de pacientes de la página
+
+        Returns:
+            Lista de diccionarios con la información de los pacientes de la página,
+            sin las notas médicas. Si tiene menos de limit elementos, es la última.
+        """
         try:
+            # ('', '', 0) precede a cualquier paciente: la primera página usa la misma consulta
+            last_name, first_name, patient_id = after or ('', '', 0)
+
             query = """
                     SELECT id, \
                            first_name as nombre, \
@@ -54,39 +198,122 @@ class PatientManager:
                            phone      as telefono, \
                            email, \
                            address    as direccion, \
-                           notes      as notas_medicas, \
                            NULL       as foto_path
                     FROM patients
-                    ORDER BY last_name, first_name \
+                    WHERE (last_name, first_name, id) > (?, ?, ?)
+                    ORDER BY last_name, first_name, id
+                    LIMIT ? \
                     """
 
-            patients = self.db_manager.execute_query(query, fetch_all=True)
-
-            # Procesar los resultados para asegurar valores por defecto
-            for patient in patients:
-                for key in ['fecha_nacimiento', 'telefono', 'email', 'direccion', 'notas_medicas', 'foto_path']:
-                    if patient.get(key) is None:
-                        patient[key] = ''
-
-            return patients
+            patients = self.db_manager.execute_query(
+                query, (last_name, first_name, patient_id, limit), fetch_all=True
+            )
+            return self._fill_defaults(patients)
 
         except Exception as e:
             print(f"Error al obtener pacientes: {e}")
             return []
 
-    def search_patients(self, search_text: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def page_cursor(patient: Dict[str, Any]) -> Tuple[str, str, int]:
+        """
+        Cursor para pedir la página siguiente a la que termina en patient.
+
+        Args:
+            patient: Último paciente de una página de list_patients
+
+        Returns:
+            tuple: (apellidos, nombre, id), el valor de after de la página siguiente
+        """
+        return patient['apellidos'], patient['nombre'], patient['id']
+
+    def count_patients(self) -> int:
+        """
+        Cuenta los pacientes registrados.
+
+        Returns:
+            int: Número total de pacientes (0 si hay un error)
+        """
+        try:
+            result = self.db_manager.execute_query("SELECT COUNT(*) AS total FROM patients", fetch_one=True)
+            return result['total'] if result else 0
+        except Exception as e:
+            print(f"Error al contar pacientes: {e}")
+            return 0
+
+    def search_patients(self, search_text: str, limit: int = SEARCH_LIMIT) -> List[Dict[str, Any]]:
         """
         Busca pacientes que coincidan con el texto de búsqueda.
 
+        La búsqueda ignora tildes y mayúsculas ("nunez" encuentra "Núñez") y los
+        separadores de los teléfonos. Cada palabra del texto debe aparecer en el
+        nombre, los apellidos, el teléfono o el email. Las palabras de 3 o más
+        caracteres se buscan en cualquier posición con el índice FTS5 de
+        trigramas; las más cortas, que el índice no admite, se exigen como
+        prefijo del nombre o de los apellidos con rangos sobre las claves
+        indexadas ("jo garcia" encuentra a José García pero no a Roberto García).
+
         Args:
             search_text: Texto a buscar en nombres, apellidos, teléfono o email
+            limit: Número máximo de resultados
 
         Returns:
             Lista de diccionarios con la información de los pacientes que coinciden
+            (sin las notas médicas)
         """
         try:
-            search_pattern = f"%{search_text}%"
+            terms = [
+                normalize_phone(term) if is_phone_like(term) else normalize_text(term)
+                for term in search_text.split()
+            ]
+            terms = [term for term in terms if term]
+            # El índice de trigramas sólo reconoce palabras de 3 o más caracteres
+            long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM_LENGTH]
+            short_terms = [term for term in terms if len(term) < MIN_FTS_TERM_LENGTH]
+            if not long_terms:
+                return self._search_patients_by_prefix(terms, limit)
+
+            # Cada palabra como frase entre comillas: sin operadores FTS5 del usuario
+            match = ' '.join('"' + term.replace('"', '""') + '"' for term in long_terms)
 
+            query = """
+                    SELECT p.id, \
+                           p.first_name as nombre, \
+                           p.last_name  as apellidos, \
+                           p.birthdate  as fecha_nacimiento, \
+                           p.phone      as telefono, \
+                           p.email, \
+                           p.address    as direccion, \
+                           NULL         as foto_path
+                    FROM patients_fts
+                             JOIN patients p ON p.id = patients_fts.rowid
+                    WHERE patients_fts MATCH ? \
+                    """
+            # Las palabras cortas filtran las filas que devuelve el índice FTS
+            conditions, params = self._prefix_conditions(short_terms, 'p')
+            query += conditions
+            query += """
+                    ORDER BY bm25(patients_fts, 2.0, 2.0, 1.0, 1.0), p.last_name_key, p.first_name_key
+                    LIMIT ?"""
+
+            patients = self.db_manager.execute_query(query, (match, *params, limit), fetch_all=True)
+            return self._fill_defaults(patients)
+
+        except Exception as e:
+            print(f"Error al buscar pacientes: {e}")
+            return []
+
+    def _search_patients_by_prefix(self, terms: List[str], limit: int) -> List[Dict[str, Any]]:
+        """
+        Búsqueda para palabras de menos de 3 caracteres, que el índice FTS no admite.
+
+        Cada palabra debe ser prefijo del nombre o de los apellidos normalizados;
+        los prefijos se traducen a rangos (clave >= 'jo' AND clave < 'jp') que
+        usan los índices de las claves. Sin palabras, devuelve los primeros
+        pacientes en orden alfabético.
+        """
+        if not terms:
+            # Sin texto: los primeros pacientes recorriendo el índice ya ordenado
             query = """
                     SELECT id, \
                            first_name as nombre, \
@@ -95,41 +322,98 @@ class PatientManager:
                            phone      as telefono, \
                            email, \
                            address    as direccion, \
-                           notes      as notas_medicas, \
                            NULL       as foto_path
                     FROM patients
-                    WHERE first_name LIKE ?
-                       OR last_name LIKE ?
-                       OR phone LIKE ?
-                       OR email LIKE ?
-                    ORDER BY last_name, first_name \
+                    WHERE last_name_key >= ''
+                    ORDER BY last_name_key, first_name_key
+                    LIMIT ? \
                     """
+            patients = self.db_manager.execute_query(query, (limit,), fetch_all=True)
+            return self._fill_defaults(patients)
+
+        query = """
+                SELECT id, \
+                       first_name as nombre, \
+                       last_name  as apellidos, \
+                       birthdate  as fecha_nacimiento, \
+                       phone      as telefono, \
+                       email, \
+                       address    as direccion, \
+                       NULL       as foto_path
+                FROM patients
+                WHERE ((last_name_key >= ? AND last_name_key < ?)
+                    OR (first_name_key >= ? AND first_name_key < ?)) \
+                """
+        upper = prefix_upper_bound(terms[0])
+        conditions, params = self._prefix_conditions(terms[1:])
+        query += conditions
+        query += " ORDER BY last_name_key, first_name_key LIMIT ?"
+
+        patients = self.db_manager.execute_query(
+            query, (terms[0], upper, terms[0], upper, *params, limit), fetch_all=True
+        )
+        return self._fill_defaults(patients)
+
+    @staticmethod
+    def _prefix_conditions(terms: List[str], alias: str = '') -> Tuple[str, List[str]]:
+        """
+        Condiciones que exigen que cada palabra sea prefijo del nombre o de los apellidos.
 
-            params = (search_pattern, search_pattern, search_pattern, search_pattern)
-            patients = self.db_manager.execute_query(query, params, fetch_all=True)
-
-            # Procesar los resultados para asegurar valores por defecto
-            for patient in patients:
-                for key in ['fecha_nacimiento', 'telefono', 'email', 'direccion', 'notas_medicas', 'foto_path']:
-                    if patient.get(key) is None:
-                        patient[key] = ''
+        Args:
+            terms: Palabras normalizadas
+            alias: Alias de la tabla patients en la consulta (opcional)
 
-            return patients
+        Returns:
+            tuple: Fragmento SQL (" AND (...)" por palabra) y sus parámetros
+        """
+        column = f"{alias}." if alias else ''
+        sql = ''
+        params: List[str] = []
+        for term in terms:
+            sql += f"""
+                  AND (({column}last_name_key >= ? AND {column}last_name_key < ?)
+                    OR ({column}first_name_key >= ? AND {column}first_name_key < ?))"""
+            upper = prefix_upper_bound(term)
+            params += [term, upper, term, upper]
+        return sql, params
+
+    def _resolve_photos(self, patients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Convierte el hash de la foto vigente (columna foto_path) en la ruta del archivo."""
+        for patient in patients:
+            if patient.get('foto_path'):
+                patient['foto_path'] = self.photo_store.path_for(patient['foto_path'])
+        return patients
+
+    def _fill_defaults(self, patients: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Sustituye los campos NULL por cadenas vacías para la interfaz.
 
-        except Exception as e:
-            print(f"Error al buscar pacientes: {e}")
-            return []
+        Los listados no seleccionan las notas médicas (sólo get_patient_by_id y
+        get_patients_by_ids las leen), así que sólo se completan los campos presentes.
+        """
+        for patient in patients:
+            for key in ['fecha_nacimiento', 'telefono', 'email', 'direccion', 'notas_medicas', 'foto_path']:
+                if key in patient and patient[key] is None:
+                    patient[key] = ''
+        return patients
 
     def get_patient_by_id(self, patient_id: int) -> Optional[Dict[str, Any]]:
         """
         Obtiene la información de un paciente por su ID.
 
+        El resultado se guarda en la caché de pacientes; update_patient y
+        delete_patient invalidan la entrada correspondiente.
+
         Args:
             patient_id: ID del paciente
 
         Returns:
             Diccionario con la información del paciente o None si no existe
         """
+        cached = self.cache.get(patient_id)
+        if cached is not None:
+            return dict(cached)
+
         try:
             query = """
                     SELECT id, \
@@ -140,7 +424,11 @@ class PatientManager:
                            email, \
                            address    as direccion, \
                            notes      as notas_medicas, \
-                           NULL       as foto_path
+                           (SELECT ph.sha256
+                            FROM patient_photos ph
+                            WHERE ph.patient_id = patients.id
+                            ORDER BY ph.id DESC
+                            LIMIT 1)  as foto_path
                     FROM patients
                     WHERE id = ? \
                     """
@@ -149,10 +437,9 @@ class PatientManager:
 
             if patient:
                 # Asegurar valores por defecto para campos que pueden ser NULL
-                for key in ['fecha_nacimiento', 'telefono', 'email', 'direccion', 'notas_medicas', 'foto_path']:
-                    if patient.get(key) is None:
-                        patient[key] = ''
-                return patient
+                self._fill_defaults(self._resolve_photos([patient]))
+                self.cache.put(patient_id, patient)
+                return dict(patient)
             else:
                 return None
 
@@ -160,41 +447,264 @@ class PatientManager:
             print(f"Error al obtener paciente: {e}")
             return None
 
+    def get_patients_by_ids(self, patient_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Obtiene varios pacientes a la vez.
+
+        Los que no están en caché se leen con una sola consulta IN (...) (por
+        bloques de IDS_PER_QUERY) y se guardan en la caché.
+
+        Args:
+            patient_ids: IDs de los pacientes (se ignoran repetidos y vacíos)
+
+        Returns:
+            Diccionario ID -> información del paciente (los IDs inexistentes no aparecen)
+        """
+        patients: Dict[int, Dict[str, Any]] = {}
+        missing = []
+        for patient_id in dict.fromkeys(pid for pid in patient_ids if pid):
+            cached = self.cache.get(patient_id)
+            if cached is not None:
+                patients[patient_id] = dict(cached)
+            else:
+                missing.append(patient_id)
+
+        try:
+            for start in range(0, len(missing), IDS_PER_QUERY):
+                chunk = missing[start:start + IDS_PER_QUERY]
+                placeholders = ', '.join('?' * len(chunk))
+                query = f"""
+                    SELECT id,
+                           first_name as nombre,
+                           last_name  as apellidos,
+                           birthdate  as fecha_nacimiento,
+                           phone      as telefono,
+                           email,
+                           address    as direccion,
+                           notes      as notas_medicas,
+                           (SELECT ph.sha256
+                            FROM patient_photos ph
+                            WHERE ph.patient_id = patients.id
+                            ORDER BY ph.id DESC
+                            LIMIT 1)  as foto_path
+                    FROM patients
+                    WHERE id IN ({placeholders})
+                    """
+                rows = self.db_manager.execute_query(query, tuple(chunk), fetch_all=True)
+                for patient in self._fill_defaults(self._resolve_photos(rows)):
+                    self.cache.put(patient['id'], patient)
+                    patients[patient['id']] = dict(patient)
+
+        except Exception as e:
+            print(f"Error al obtener pacientes: {e}")
+
+        return patients
+
+    def get_timeline(self, patient_id: int, since: Optional[str] = None, limit: Optional[int] = None,
+                     before: Optional[Tuple[str, str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene el historial de un paciente: citas, tratamientos aplicados, pagos,
+        correos enviados e historiales médicos, del más reciente al más antiguo.
+
+        Todo sale de una única consulta UNION ALL en la que cada parte entra por
+        el índice de patient_id (o appointment_id) de su tabla. Para paginar se
+        pasa en before el cursor del último evento recibido (ver timeline_cursor).
+
+        Args:
+            patient_id: ID del paciente
+            since: Fecha mínima 'AAAA-MM-DD' o 'AAAA-MM-DD HH:MM' (opcional)
+            limit: Número máximo de eventos (None = todos)
+            before: Cursor (fecha, tipo, id) del último evento de la página anterior
+
+        Returns:
+            Lista de eventos con las claves event_at ('AAAA-MM-DD HH:MM'), kind
+            ('appointment', 'treatment', 'payment', 'email' o 'medical_record'),
+            ref_id (ID en su tabla), appointment_id, description, status y amount
+        """
+        try:
+            query = """
+                    SELECT event_at, kind, ref_id, appointment_id, description, status, amount
+                    FROM (SELECT substr(a.date || ' ' || a.start_time, 1, 16) AS event_at,
+                                 'appointment'                 AS kind,
+                                 a.id                          AS ref_id,
+                                 a.id                          AS appointment_id,
+                                 a.notes                       AS description,
+                                 a.status                      AS status,
+                                 NULL                          AS amount
+                          FROM appointments a
+                          WHERE a.patient_id = ?
+                          UNION ALL
+                          SELECT substr(a.date || ' ' || a.start_time, 1, 16), 'treatment', tr.id, a.id,
+                                 t.name, NULL, tr.price_applied * tr.quantity
+                          FROM appointments a
+                                   JOIN appointment_treatments tr ON tr.appointment_id = a.id
+                                   LEFT JOIN treatments t ON t.id = tr.treatment_id
+                          WHERE a.patient_id = ?
+                          UNION ALL
+                          SELECT substr(replace(p.payment_date, 'T', ' '), 1, 16), 'payment', p.id, a.id,
+                                 p.payment_method, NULL, p.amount
+                          FROM appointments a
+                                   JOIN payments p ON p.appointment_id = a.id
+                          WHERE a.patient_id = ?
+                          UNION ALL
+                          SELECT substr(replace(e.sent_date, 'T', ' '), 1, 16), 'email', e.id, a.id,
+                                 e.subject, e.status, NULL
+                          FROM appointments a
+                                   JOIN email_tracking e ON e.appointment_id = a.id
+                          WHERE a.patient_id = ?
+                          UNION ALL
+                          SELECT substr(replace(m.record_date, 'T', ' '), 1, 16), 'medical_record', m.id, NULL,
+                                 COALESCE(m.diagnosis, m.symptoms), NULL, NULL
+                          FROM medical_records m
+                          WHERE m.patient_id = ?)
+                    WHERE (? IS NULL OR event_at >= ?)
+                      AND (? IS NULL OR (event_at, kind, ref_id) < (?, ?, ?))
+                    ORDER BY event_at DESC, kind DESC, ref_id DESC
+                    LIMIT ? \
+                    """
+            event_at, kind, ref_id = before or (None, None, None)
+            params = (patient_id,) * 5 + (since, since, event_at, event_at, kind, ref_id,
+                                          -1 if limit is None else limit)
+            events = self.db_manager.execute_query(query, params, fetch_all=True)
+            # El diagnóstico o los síntomas pueden venir comprimidos
+            for event in events:
+                if event['kind'] == 'medical_record':
+                    event['description'] = unpack_text(event['description'])
+            return events
+
+        except Exception as e:
+            print(f"Error al obtener el historial del paciente: {e}")
+            return []
+
+    def iter_timeline(self, patient_id: int, since: Optional[str] = None,
+                      page_size: int = TIMELINE_PAGE_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Recorre el historial de un paciente página a página.
+
+        Args:
+            patient_id: ID del paciente
+            since: Fecha mínima (opcional)
+            page_size: Eventos por página
+
+        Yields:
+            Cada página de eventos de get_timeline, hasta agotar el historial
+        """
+        before = None
+        while True:
+            page = self.get_timeline(patient_id, since=since, limit=page_size, before=before)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            before = self.timeline_cursor(page[-1])
+
+    @staticmethod
+    def timeline_cursor(event: Dict[str, Any]) -> Tuple[str, str, int]:
+        """
+        Cursor para pedir los eventos anteriores a event.
+
+        Args:
+            event: Último evento de una página de get_timeline
+
+        Returns:
+            tuple: (event_at, kind, ref_id), el valor de before de la página siguiente
+        """
+        return event['event_at'], event['kind'], event['ref_id']
+
+    def invalidate_cache(self, patient_id: Optional[int] = None) -> None:
+        """
+        Descarta pacientes de la caché.
+
+        Args:
+            patient_id: ID a descartar; si es None, se vacía toda la caché
+        """
+        if patient_id is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(patient_id)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Contadores de la caché de pacientes.
+
+        Returns:
+            Diccionario con aciertos, fallos, tasa de aciertos, descartes y tamaño
+        """
+        return self.cache.stats()
+
+    @staticmethod
+    def _to_db_data(patient_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convierte los campos de la interfaz en columnas de patients, con sus claves de búsqueda."""
+        # Mapear los nombres de campos de la interfaz a los nombres de columnas de la BD
+        db_data = {
+            'first_name': patient_data.get('nombre', ''),
+            'last_name': patient_data.get('apellidos', ''),
+            'birthdate': patient_data.get('fecha_nacimiento', ''),
+            'phone': patient_data.get('telefono', ''),
+            'email': patient_data.get('email', ''),
+            'address': patient_data.get('direccion', ''),
+            'notes': patient_data.get('notas_medicas', '')
+        }
+        # Claves normalizadas para la búsqueda sin tildes ni mayúsculas
+        db_data.update(patient_search_keys(
+            db_data['first_name'], db_data['last_name'], db_data['phone'], db_data['email']
+        ))
+        return db_data
+
     def add_patient(self, patient_data: Dict[str, Any]) -> Optional[int]:
         """
         Agrega un nuevo paciente al sistema.
 
         Args:
-            patient_data: Diccionario con la información del paciente
+            patient_data: Diccionario con la información del paciente; si incluye
+                          foto_path (ruta de una imagen), se guarda con set_patient_photo
 
         Returns:
             ID del paciente creado o None si hubo un error
         """
         try:
-            # Mapear los nombres de campos de la interfaz a los nombres de columnas de la BD
-            db_data = {
-                'first_name': patient_data.get('nombre', ''),
-                'last_name': patient_data.get('apellidos', ''),
-                'birthdate': patient_data.get('fecha_nacimiento', ''),
-                'phone': patient_data.get('telefono', ''),
-                'email': patient_data.get('email', ''),
-                'address': patient_data.get('direccion', ''),
-                'notes': patient_data.get('notas_medicas', '')
-            }
+            db_data = self._to_db_data(patient_data)
 
             # Usar el método insert_record del DatabaseManager
-            return self.db_manager.insert_record('patients', db_data)
+            patient_id = self.db_manager.insert_record('patients', db_data)
+            if patient_id and patient_data.get('foto_path'):
+                self.set_patient_photo(patient_id, patient_data['foto_path'])
+            return patient_id
 
         except Exception as e:
             print(f"Error al agregar paciente: {e}")
             return None
 
+    def add_patients(self, patients_data: Iterable[Dict[str, Any]],
+                     chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Agrega muchos pacientes con inserciones por lotes.
+
+        Dentro de una transacción abierta (DatabaseManager.transaction) se une a
+        ella; si no, confirma una transacción por bloque de chunk_size pacientes.
+
+        Args:
+            patients_data: Diccionarios con la información de cada paciente
+            chunk_size: Pacientes por transacción (None = una sola transacción)
+
+        Returns:
+            dict: Resultado de DatabaseManager.insert_records ('inserted', 'first_id',
+                  'last_id' y 'failed' con el índice de cada paciente rechazado)
+
+        Raises:
+            sqlite3.Error: Si falla la transacción en su conjunto
+        """
+        return self.db_manager.insert_records(
+            'patients', (self._to_db_data(patient_data) for patient_data in patients_data), chunk_size=chunk_size
+        )
+
     def update_patient(self, patient_data: Dict[str, Any]) -> bool:
         """
         Actualiza la información de un paciente existente.
 
         Args:
-            patient_data: Diccionario con la información actualizada del paciente
+            patient_data: Diccionario con la información actualizada del paciente; si
+                          incluye foto_path (ruta de una imagen), se guarda con set_patient_photo
 
         Returns:
             True si la actualización fue exitosa, False en caso contrario
@@ -204,38 +714,250 @@ class PatientManager:
             if not patient_id:
                 return False
 
-            # Mapear los nombres de campos de la interfaz a los nombres de columnas de la BD
-            db_data = {
-                'first_name': patient_data.get('nombre', ''),
-                'last_name': patient_data.get('apellidos', ''),
-                'birthdate': patient_data.get('fecha_nacimiento', ''),
-                'phone': patient_data.get('telefono', ''),
-                'email': patient_data.get('email', ''),
-                'address': patient_data.get('direccion', ''),
-                'notes': patient_data.get('notas_medicas', '')
-            }
+            db_data = self._to_db_data(patient_data)
 
             # Usar el método update_record del DatabaseManager
-            return self.db_manager.update_record('patients', patient_id, db_data)
+            updated = self.db_manager.update_record('patients', patient_id, db_data)
+            self.cache.invalidate(patient_id)
+            if updated and patient_data.get('foto_path'):
+                self.set_patient_photo(patient_id, patient_data['foto_path'])
+            return updated
 
         except Exception as e:
             print(f"Error al actualizar paciente: {e}")
             return False
 
-    def delete_patient(self, patient_id: int) -> bool:
+    def set_patient_photo(self, patient_id: int, source_path: str) -> Optional[str]:
         """
-        Elimina un paciente del sistema.
+        Asigna una fotografía a un paciente.
+
+        La imagen se guarda en el almacén por su hash de contenido (subir la misma
+        imagen otra vez no crea otro archivo) y pasa a ser la foto vigente del
+        paciente. Si ya era la vigente no se modifica nada. Si la transacción
+        falla, se borra el archivo que se acaba de crear para no dejarlo huérfano.
+
+        Args:
+            patient_id: ID del paciente
+            source_path: Ruta de la imagen (puede ser una ruta del propio almacén)
+
+        Returns:
+            Ruta de la foto en el almacén o None si hubo un error
+        """
+        photo = None
+        try:
+            photo = self.photo_store.ingest(source_path)
+            with self.db_manager.transaction(immediate=True) as tx:
+                current = tx.execute(
+                    "SELECT sha256 FROM patient_photos WHERE patient_id = ? ORDER BY id DESC LIMIT 1", (patient_id,)
+                ).fetchone()
+                if current is None or current['sha256'] != photo['sha256']:
+                    # Una foto anterior que se vuelve a subir se mueve al final en lugar de repetirse
+                    tx.execute("DELETE FROM patient_photos WHERE patient_id = ? AND sha256 = ?",
+                               (patient_id, photo['sha256']))
+                    tx.execute(
+                        """
+                        INSERT INTO patient_photos (patient_id, sha256, size_bytes, width, height, format)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (patient_id, photo['sha256'], photo['size_bytes'], photo['width'], photo['height'],
+                         photo['format'])
+                    )
+            self.cache.invalidate(patient_id)
+            return photo['path']
+
+        except Exception as e:
+            print(f"Error al guardar la fotografía del paciente: {e}")
+            if photo and photo['created']:
+                try:
+                    self._remove_photos([photo['sha256']])
+                except sqlite3.Error as cleanup_error:
+                    print(f"No se pudo comprobar la fotografía {photo['path']}: {cleanup_error}")
+            return None
+
+    def merge_patients(self, keep_id: int, duplicate_id: int) -> bool:
+        """
+        Fusiona un paciente duplicado en otro en una única transacción.
+
+        Las citas y los historiales médicos del duplicado pasan al paciente que se
+        conserva, los datos vacíos de éste se completan con los del duplicado y el
+        duplicado se elimina. Si algo falla no se modifica nada.
+
+        Las fotografías siguen la misma regla que los datos: las del duplicado sólo
+        pasan al paciente conservado si éste no tiene ninguna; si no, se descartan
+        y se borran los archivos que ya no usa nadie.
+
+        Args:
+            keep_id: ID del paciente que se conserva
+            duplicate_id: ID del paciente duplicado que se elimina
+
+        Returns:
+            True si la fusión fue exitosa, False en caso contrario
+        """
+        if keep_id == duplicate_id:
+            return False
+
+        try:
+            query = """
+                    SELECT id, first_name, last_name, birthdate, gender, phone, email, address, notes
+                    FROM patients
+                    WHERE id = ? \
+                    """
+            with self.db_manager.transaction(immediate=True) as tx:
+                keep = tx.execute(query, (keep_id,)).fetchone()
+                duplicate = tx.execute(query, (duplicate_id,)).fetchone()
+                if keep is None or duplicate is None:
+                    return False
+
+                # Completar los datos que faltan en el paciente que se conserva
+                merged = dict(keep)
+                for column in MERGE_FILL_COLUMNS:
+                    if not merged[column] and duplicate[column]:
+                        merged[column] = duplicate[column]
+                merged.update(patient_search_keys(
+                    merged['first_name'], merged['last_name'], merged['phone'], merged['email']
+                ))
+                del merged['id']
+                self.db_manager.update_record('patients', keep_id, merged)
+
+                tx.execute("UPDATE appointments SET patient_id = ? WHERE patient_id = ?", (keep_id, duplicate_id))
+                tx.execute("UPDATE medical_records SET patient_id = ? WHERE patient_id = ?", (keep_id, duplicate_id))
+
+                discarded = []
+                if tx.execute("SELECT 1 FROM patient_photos WHERE patient_id = ? LIMIT 1", (keep_id,)).fetchone():
+                    discarded = [row['sha256'] for row in tx.execute(
+                        "SELECT sha256 FROM patient_photos WHERE patient_id = ?", (duplicate_id,)
+                    )]
+                    tx.execute("DELETE FROM patient_photos WHERE patient_id = ?", (duplicate_id,))
+                else:
+                    tx.execute("UPDATE patient_photos SET patient_id = ? WHERE patient_id = ?", (keep_id, duplicate_id))
+                tx.execute("DELETE FROM patients WHERE id = ?", (duplicate_id,))
+
+            self.cache.invalidate(keep_id)
+            self.cache.invalidate(duplicate_id)
+            self._remove_photos(discarded)
+            return True
+
+        except Exception as e:
+            print(f"Error al fusionar pacientes: {e}")
+            return False
+
+    def delete_patient(self, patient_id: int, archive_path: Optional[str] = None) -> bool:
+        """
+        Elimina un paciente junto con sus citas, tratamientos aplicados, pagos,
+        correos enviados, historial médico y fotografías.
 
         Args:
             patient_id: ID del paciente a eliminar
+            archive_path: Si se indica, las filas se copian antes a esta base de
+                          datos de archivo (ver purge_patients)
 
         Returns:
             True si la eliminación fue exitosa, False en caso contrario
         """
         try:
-            # Usar el método delete_record del DatabaseManager
-            return self.db_manager.delete_record('patients', patient_id)
+            removed = self.purge_patients([patient_id], archive_path=archive_path)
+            return removed['patients'] > 0
 
         except Exception as e:
             print(f"Error al eliminar paciente: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def purge_patients(self, patient_ids: Iterable[int], archive_path: Optional[str] = None,
+                       batch_size: int = PURGE_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Elimina muchos pacientes con todos sus datos dependientes (p. ej. tareas de
+        retención de datos).
+
+        Cada lote de batch_size pacientes se procesa en una transacción: las filas
+        de cada tabla se copian al archivo con un único INSERT ... SELECT y se
+        borran con un único DELETE, de modo que no quedan citas, pagos ni
+        historiales huérfanos. Sin archivo, los archivos de las fotografías que ya
+        no usa ningún paciente se eliminan después de confirmar cada lote; al
+        archivar se conservan, porque las filas archivadas de patient_photos
+        siguen apuntando a ellos.
+
+        Args:
+            patient_ids: IDs de los pacientes a eliminar
+            archive_path: Base de datos de archivo (se crea si no existe) que se
+                          adjunta a la transacción; None para borrar sin archivar
+            batch_size: Pacientes por transacción
+
+        Returns:
+            dict: Filas eliminadas (y archivadas) por tabla, más 'photos' con las
+                  fotografías borradas
+
+        Raises:
+            sqlite3.Error: Si falla un lote (ese lote se revierte por completo; los
+                           anteriores ya quedaron confirmados)
+        """
+        removed = {table: 0 for table, _, _ in _CASCADE}
+        removed['photos'] = 0
+        ids = sorted({int(patient_id) for patient_id in patient_ids})
+        attach = {ARCHIVE_ALIAS: archive_path} if archive_path else None
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with self.db_manager.transaction(immediate=True, attach=attach) as tx:
+                tx.temp_table('purge_ids')
+                tx.connection.executemany("INSERT INTO temp.purge_ids (id) VALUES (?)", [(i,) for i in batch])
+                hashes = [row['sha256'] for row in tx.execute(
+                    "SELECT DISTINCT sha256 FROM patient_photos WHERE patient_id IN (SELECT id FROM temp.purge_ids)"
+                )]
+
+                if archive_path:
+                    for table, select, _ in _CASCADE:
+                        columns = ', '.join(self._prepare_archive_table(tx.connection, table))
+                        tx.execute(
+                            f"INSERT INTO {ARCHIVE_ALIAS}.{table} ({columns}) SELECT {columns} FROM ({select})"
+                        )
+                for table, _, delete in reversed(_CASCADE):
+                    removed[table] += tx.execute(delete).rowcount
+                tx.execute("DELETE FROM temp.purge_ids")
+
+            for patient_id in batch:
+                self.cache.invalidate(patient_id)
+            if not archive_path:
+                removed['photos'] += self._remove_photos(hashes)
+
+        return removed
+
+    @staticmethod
+    def _prepare_archive_table(conn: sqlite3.Connection, table: str) -> List[str]:
+        """
+        Crea (o completa) la copia de una tabla en la base de datos de archivo.
+
+        Returns:
+            list: Columnas de la tabla original, en su orden
+        """
+        columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_ALIAS}.{table} AS SELECT * FROM main.{table} WHERE 0")
+        archived = {row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_ALIAS}.table_info({table})")}
+        # Columnas añadidas por migraciones posteriores a la creación del archivo
+        for column in columns:
+            if column not in archived:
+                conn.execute(f"ALTER TABLE {ARCHIVE_ALIAS}.{table} ADD COLUMN {column}")
+        return columns
+
+    def _remove_photos(self, hashes: Iterable[str]) -> int:
+        """
+        Borra los archivos del almacén que ya no enlaza ningún paciente.
+
+        Sólo se borran los archivos de los hashes indicados (los que tenían
+        enlazados en patient_photos los pacientes eliminados o descartados).
+
+        Args:
+            hashes: Hashes de las fotografías a revisar
+
+        Returns:
+            int: Número de archivos borrados
+        """
+        removed = 0
+        in_use = "SELECT 1 FROM patient_photos WHERE sha256 = ? LIMIT 1"
+        for sha256 in set(hashes):
+            if self.db_manager.execute_query(in_use, (sha256,), fetch_one=True):
+                continue
+            try:
+                removed += self.photo_store.remove(sha256)
+            except OSError as e:
+                print(f"No se pudo eliminar la fotografía {self.photo_store.path_for(sha256)}: {e}")
+        return removed
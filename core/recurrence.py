@@ -0,0 +1,189 @@
+# =============================================
+# Nombre del archivo: recurrence.py
+# Propósito: Expansión de reglas de repetición de citas (subconjunto de RRULE)
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Reglas de repetición para series de citas (p. ej. "Ajuste mensual de brackets").
+
+Se admite un subconjunto de RRULE (RFC 5545) con la sintaxis habitual
+"FREQ=MONTHLY;INTERVAL=1;COUNT=12":
+
+- FREQ: DAILY, WEEKLY o MONTHLY
+- INTERVAL: cada cuántos días, semanas o meses (por defecto 1)
+- COUNT / UNTIL: número de citas o última fecha (YYYY-MM-DD o YYYYMMDD)
+- BYDAY: en WEEKLY, días de la semana (MO,TH); en MONTHLY, el n-ésimo día de
+  la semana del mes (2TU = segundo martes, -1FR = último viernes)
+
+A diferencia de RFC 5545, una serie MONTHLY sin BYDAY que empieza un día que no
+existe en algún mes (29-31) se cita ese mes el último día, en lugar de saltarlo.
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# Máximo de citas de una serie (dos años de citas semanales)
+MAX_OCCURRENCES = 104
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+# Códigos RRULE de los días de la semana, en el orden de date.weekday() (0 = lunes)
+WEEKDAY_CODES = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+def _parse_date(text: str) -> date:
+    """Convierte una fecha YYYY-MM-DD o YYYYMMDD (se ignora la hora de UNTIL)."""
+    text = text.strip()[:10]
+    return datetime.strptime(text, '%Y-%m-%d' if '-' in text else '%Y%m%d').date()
+
+
+def parse_rule(rule: str) -> Dict[str, Any]:
+    """
+    Interpreta una regla "CLAVE=valor;CLAVE=valor".
+
+    Args:
+        rule: Regla de repetición (se admite el prefijo "RRULE:" y basta "MONTHLY")
+
+    Returns:
+        dict: freq, interval, count, until y byday (lista de (ordinal, día) con
+              ordinal None si no se indica y día 0 = lunes)
+
+    Raises:
+        ValueError: Si la regla no es válida o usa partes no admitidas
+    """
+    text = rule.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+    if '=' not in text:
+        text = f"FREQ={text}"
+
+    parts = {}
+    for part in filter(None, (p.strip() for p in text.split(';'))):
+        key, _, value = part.partition('=')
+        parts[key.strip().upper()] = value.strip().upper()
+
+    unsupported = set(parts) - {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL', 'BYDAY'}
+    if unsupported:
+        raise ValueError(f"Partes de la regla no admitidas: {', '.join(sorted(unsupported))}")
+    if parts.get('FREQ') not in FREQUENCIES:
+        raise ValueError(f"FREQ debe ser uno de {', '.join(FREQUENCIES)}")
+
+    parsed = {
+        'freq': parts['FREQ'],
+        'interval': int(parts.get('INTERVAL', 1)),
+        'count': int(parts['COUNT']) if 'COUNT' in parts else None,
+        'until': _parse_date(parts['UNTIL']) if 'UNTIL' in parts else None,
+        'byday': [],
+    }
+    if parsed['interval'] < 1:
+        raise ValueError("INTERVAL debe ser mayor que 0")
+
+    for code in filter(None, parts.get('BYDAY', '').split(',')):
+        code = code.strip()
+        if code[-2:] not in WEEKDAY_CODES:
+            raise ValueError(f"Día de la semana no válido en BYDAY: {code}")
+        ordinal = int(code[:-2]) if code[:-2] else None
+        if parsed['freq'] == 'DAILY' or (parsed['freq'] == 'WEEKLY') != (ordinal is None):
+            raise ValueError(f"BYDAY={code} no se admite con FREQ={parsed['freq']}")
+        if ordinal is not None and not (1 <= abs(ordinal) <= 5):
+            raise ValueError(f"Ordinal fuera de rango en BYDAY: {code}")
+        parsed['byday'].append((ordinal, WEEKDAY_CODES.index(code[-2:])))
+    return parsed
+
+
+def _add_months(year: int, month: int, months: int) -> tuple:
+    """Año y mes resultantes de sumar months meses."""
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def _nth_weekday(year: int, month: int, ordinal: int, weekday: int) -> Optional[date]:
+    """n-ésimo día de la semana del mes (ordinal negativo: contando desde el final)."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    if ordinal > 0:
+        first = date(year, month, 1)
+        day = 1 + (weekday - first.weekday()) % 7 + (ordinal - 1) * 7
+    else:
+        last = date(year, month, days_in_month)
+        day = days_in_month - (last.weekday() - weekday) % 7 + (ordinal + 1) * 7
+    return date(year, month, day) if 1 <= day <= days_in_month else None
+
+
+def _candidates(rule: Dict[str, Any], start: date):
+    """Fechas de la regla a partir de start, en orden y sin fin."""
+    interval = rule['interval']
+    if rule['freq'] == 'DAILY':
+        current = start
+        while True:
+            yield current
+            current += timedelta(days=interval)
+
+    elif rule['freq'] == 'WEEKLY':
+        weekdays = sorted({weekday for _, weekday in rule['byday']}) or [start.weekday()]
+        week_start = start - timedelta(days=start.weekday())
+        while True:
+            for weekday in weekdays:
+                yield week_start + timedelta(days=weekday)
+            week_start += timedelta(weeks=interval)
+
+    else:
+        months = 0
+        while True:
+            year, month = _add_months(start.year, start.month, months)
+            if rule['byday']:
+                days = [_nth_weekday(year, month, ordinal, weekday) for ordinal, weekday in rule['byday']]
+                yield from sorted({day for day in days if day})
+            else:
+                yield date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+            months += interval
+
+
+def expand_rule(
+        rule: str,
+        start_date: str,
+        count: Optional[int] = None,
+        until: Optional[str] = None,
+        limit: int = MAX_OCCURRENCES
+) -> List[str]:
+    """
+    Calcula las fechas de una serie.
+
+    La serie empieza en start_date (o en la primera fecha posterior que cumpla la
+    regla) y termina al llegar a count citas o pasar de until. count y until
+    sustituyen a COUNT y UNTIL de la regla; hace falta al menos uno de los dos.
+
+    Args:
+        rule: Regla de repetición (ver parse_rule)
+        start_date: Fecha de la primera cita (YYYY-MM-DD)
+        count: Número de citas (opcional)
+        until: Última fecha posible, incluida (YYYY-MM-DD, opcional)
+        limit: Máximo de citas admitido
+
+    Returns:
+        list: Fechas YYYY-MM-DD en orden
+
+    Raises:
+        ValueError: Si la regla o las fechas no son válidas, falta el final de la
+                    serie o ésta supera limit citas
+    """
+    parsed = parse_rule(rule)
+    start = _parse_date(start_date)
+    count = count if count is not None else parsed['count']
+    end = _parse_date(until) if until else parsed['until']
+    if count is None and end is None:
+        raise ValueError("Indique el número de citas (count) o la última fecha (until)")
+    if count is not None and not (1 <= count <= limit):
+        raise ValueError(f"El número de citas debe estar entre 1 y {limit}")
+
+    dates = []
+    for day in _candidates(parsed, start):
+        if day < start:
+            continue
+        if (end and day > end) or (count is not None and len(dates) == count):
+            break
+        if len(dates) == limit:
+            raise ValueError(f"La serie supera el máximo de {limit} citas")
+        dates.append(day.isoformat())
+    return dates
@@ -20,8 +20,9 @@ Permite generar reportes de ingresos, horas trabajadas y horas sin citas.
 import os
 import sys
 from datetime import datetime, timedelta, date
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterator, List, Optional, Union, Any
 import calendar
+import csv
 import io
 
 # Librerías de terceros
@@ -255,25 +256,23 @@ class ReportGenerator:
         self.db_manager = db_manager or DatabaseManager()
 
 
-    def generate_income_report(
+    def iter_income_rows(
             self,
             start_date: str,
-            end_date: str,
-            group_by: str = "day"
-    ) -> Dict[str, Union[List[Dict[str, Any]], float]]:
+            end_date: str
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Genera un reporte de ingresos para el período especificado.
+        Devuelve de forma perezosa las filas de ingresos por cita del período.
+
+        Las filas se leen por bloques desde la base de datos, por lo que sirve
+        para exportar períodos largos sin cargar el resultado completo en memoria.
 
         Args:
             start_date (str): Fecha de inicio en formato YYYY-MM-DD
             end_date (str): Fecha de fin en formato YYYY-MM-DD
-            group_by (str): Agrupar por 'day', 'week' o 'month'
 
-        Returns:
-            dict: {
-                'data': Lista de diccionarios con los datos del reporte,
-                'total': Total de ingresos en el período
-            }
+        Yields:
+            dict: {'date', 'patient', 'treatments', 'amount'} por cita completada
         """
         query = """
                 SELECT a.date, \
@@ -293,26 +292,48 @@ class ReportGenerator:
                   AND ?
                   AND a.status = 'completed'
                 GROUP BY
-                    a.id
+                    a.date, a.start_time, a.id
                 ORDER BY
-                    a.date \
+                    a.date, a.start_time \
                 """
 
         params = (start_date, end_date)
-        raw_data = self.db_manager.execute_query(query, params, fetch_all=True)
+        for appt_date, patient_name, treatments, amount in self.db_manager.iter_query(
+                query, params, row_format='tuple'):
+            yield {
+                'date': appt_date,
+                'patient': patient_name,
+                'treatments': treatments,
+                'amount': amount or 0.0
+            }
+
+    def generate_income_report(
+            self,
+            start_date: str,
+            end_date: str,
+            group_by: str = "day"
+    ) -> Dict[str, Union[List[Dict[str, Any]], float]]:
+        """
+        Genera un reporte de ingresos para el período especificado.
+
+        Args:
+            start_date (str): Fecha de inicio en formato YYYY-MM-DD
+            end_date (str): Fecha de fin en formato YYYY-MM-DD
+            group_by (str): Agrupar por 'day', 'week' o 'month'
 
+        Returns:
+            dict: {
+                'data': Lista de diccionarios con los datos del reporte,
+                'total': Total de ingresos en el período
+            }
+        """
         # Procesar datos para agrupación
         processed_data = []
         total_income = 0.0
 
         if group_by == "day":
-            for row in raw_data:
-                processed_data.append({
-                    'date': row['date'],
-                    'patient': row['patient_name'],
-                    'treatments': row['treatments'],
-                    'amount': row['amount']
-                })
+            for row in self.iter_income_rows(start_date, end_date):
+                processed_data.append(row)
                 total_income += row['amount']
 
         elif group_by == "week":
@@ -328,6 +349,31 @@ class ReportGenerator:
             'total': total_income
         }
 
+    def export_income_csv(
+            self,
+            start_date: str,
+            end_date: str,
+            output_path: str
+    ) -> float:
+        """
+        Exporta el detalle de ingresos a CSV escribiendo las filas a medida que se leen.
+
+        Args:
+            start_date (str): Fecha de inicio en formato YYYY-MM-DD
+            end_date (str): Fecha de fin en formato YYYY-MM-DD
+            output_path (str): Ruta del archivo CSV a generar
+
+        Returns:
+            float: Total de ingresos exportados
+        """
+        total_income = 0.0
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['date', 'patient', 'treatments', 'amount'])
+            writer.writeheader()
+            for row in self.iter_income_rows(start_date, end_date):
+                writer.writerow(row)
+                total_income += row['amount']
+        return total_income
 
     def generate_worked_hours_report(
             self,
@@ -368,12 +414,10 @@ class ReportGenerator:
 
         query += " ORDER BY a.date, a.start_time"
 
-        raw_data = self.db_manager.execute_query(query, tuple(params), fetch_all=True)
-
         processed_data = []
         total_hours = 0.0
 
-        for row in raw_data:
+        for row in self.db_manager.iter_query(query, tuple(params), row_format='row'):
             day_name = calendar.day_name[int(row['day_of_week'])]
 
             processed_data.append({
@@ -507,7 +551,8 @@ class ReportGenerator:
         days = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
 
         for day_num, day in enumerate(days):
-            day_schedule = next((item for item in schedule_data if item['day_of_week'] == day_num), None)
+            # work_schedule numera los días de 1 (lunes) a 7 (domingo)
+            day_schedule = next((item for item in schedule_data if item['day_of_week'] == day_num + 1), None)
 
             if day_schedule:
                 schedule[day] = {
@@ -552,21 +597,15 @@ class ReportGenerator:
                     date, start_time \
                 """
 
-        appointments = self.db_manager.execute_query(
-            query,
-            (start_date, end_date),
-            fetch_all=True
-        )
-
         grouped = {}
-        for appt in appointments:
-            date_str = appt['date']
+        for date_str, start_time, end_time in self.db_manager.iter_query(
+                query, (start_date, end_date), row_format='tuple'):
             if date_str not in grouped:
                 grouped[date_str] = []
 
             grouped[date_str].append({
-                'start_time': appt['start_time'],
-                'end_time': appt['end_time']
+                'start_time': start_time,
+                'end_time': end_time
             })
 
         return grouped
@@ -105,15 +105,16 @@ class TreatmentManager:
                 'duration': duration
             }
 
-            treatment_id = self.db_manager.insert_record('treatments', treatment_data)
+            with self.db_manager.transaction(immediate=True):
+                treatment_id = self.db_manager.insert_record('treatments', treatment_data)
 
-            # Registrar precio inicial en historial
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            self.db_manager.insert_record('treatment_price_history', {
-                'treatment_id': treatment_id,
-                'price': default_price,
-                'start_date': current_date
-            })
+                # Registrar precio inicial en historial
+                current_date = datetime.now().strftime('%Y-%m-%d')
+                self.db_manager.insert_record('treatment_price_history', {
+                    'treatment_id': treatment_id,
+                    'price': default_price,
+                    'start_date': current_date
+                })
 
             logger.info(f"Tratamiento creado con ID: {treatment_id}")
             return treatment_id
@@ -139,59 +140,61 @@ class TreatmentManager:
             bool: True si la actualización fue exitosa, False en caso contrario
         """
         try:
-            # Obtener datos actuales
-            current_data = self.db_manager.execute_query(
-                "SELECT * FROM treatments WHERE id = ?",
-                (treatment_id,),
-                fetch_one=True
-            )
-
-            if not current_data:
-                logger.warning(f"Tratamiento con ID {treatment_id} no encontrado")
-                return False
-
-            # Preparar datos para actualización
-            update_data = {}
-            if name is not None:
-                update_data['name'] = name
-            if category_id is not None:
-                update_data['category_id'] = category_id
-            if description is not None:
-                update_data['description'] = description
-            if duration is not None:
-                update_data['duration'] = duration
-            if active is not None:
-                update_data['active'] = 1 if active else 0
-
-            # Actualizar marca de tiempo
-            update_data['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-            # Si hay precio nuevo, actualizar historial
-            if default_price is not None and default_price != current_data['default_price']:
-                update_data['default_price'] = default_price
-
-                # Cerrar precio anterior en historial
-                current_date = datetime.now().strftime('%Y-%m-%d')
-                self.db_manager.execute_query('''
-                    UPDATE treatment_price_history
-                    SET end_date = ?
-                    WHERE treatment_id = ? AND end_date IS NULL
-                ''', (current_date, treatment_id))
-
-                # Registrar nuevo precio
-                self.db_manager.insert_record('treatment_price_history', {
-                    'treatment_id': treatment_id,
-                    'price': default_price,
-                    'start_date': current_date
-                })
-
-            if update_data:
-                self.db_manager.update_record('treatments', treatment_id, update_data)
-                logger.info(f"Tratamiento con ID {treatment_id} actualizado correctamente")
-                return True
-            else:
-                logger.info(f"No se realizaron cambios en el tratamiento {treatment_id}")
-                return False
+            # Lectura, historial de precios y actualización se confirman juntos
+            with self.db_manager.transaction(immediate=True):
+                # Obtener datos actuales
+                current_data = self.db_manager.execute_query(
+                    "SELECT * FROM treatments WHERE id = ?",
+                    (treatment_id,),
+                    fetch_one=True
+                )
+
+                if not current_data:
+                    logger.warning(f"Tratamiento con ID {treatment_id} no encontrado")
+                    return False
+
+                # Preparar datos para actualización
+                update_data = {}
+                if name is not None:
+                    update_data['name'] = name
+                if category_id is not None:
+                    update_data['category_id'] = category_id
+                if description is not None:
+                    update_data['description'] = description
+                if duration is not None:
+                    update_data['duration'] = duration
+                if active is not None:
+                    update_data['active'] = 1 if active else 0
+
+                # Actualizar marca de tiempo
+                update_data['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+                # Si hay precio nuevo, actualizar historial
+                if default_price is not None and default_price != current_data['default_price']:
+                    update_data['default_price'] = default_price
+
+                    # Cerrar precio anterior en historial
+                    current_date = datetime.now().strftime('%Y-%m-%d')
+                    self.db_manager.execute_query('''
+                        UPDATE treatment_price_history
+                        SET end_date = ?
+                        WHERE treatment_id = ? AND end_date IS NULL
+                    ''', (current_date, treatment_id))
+
+                    # Registrar nuevo precio
+                    self.db_manager.insert_record('treatment_price_history', {
+                        'treatment_id': treatment_id,
+                        'price': default_price,
+                        'start_date': current_date
+                    })
+
+                if update_data:
+                    self.db_manager.update_record('treatments', treatment_id, update_data)
+                    logger.info(f"Tratamiento con ID {treatment_id} actualizado correctamente")
+                    return True
+                else:
+                    logger.info(f"No se realizaron cambios en el tratamiento {treatment_id}")
+                    return False
         except Exception as e:
             logger.error(f"Error al actualizar tratamiento: {e}")
             return False
@@ -291,6 +294,54 @@ class TreatmentManager:
             logger.error(f"Error al asignar tratamiento a cita: {e}")
             return None
 
+    def assign_treatments_to_appointment(self, appointment_id, treatments):
+        """
+        Asigna varios tratamientos a una cita en una sola transacción
+
+        Args:
+            appointment_id (int): ID de la cita
+            treatments (list): Lista de diccionarios con 'treatment_id' y, opcionalmente,
+                               'price', 'quantity' y 'notes'
+
+        Returns:
+            dict: Resultado de DatabaseManager.insert_records (IDs insertados y fallos)
+                  o None si ocurrió un error
+        """
+        try:
+            # Resolver en una sola consulta los precios por defecto que falten
+            missing = sorted({t['treatment_id'] for t in treatments if t.get('price') is None})
+            default_prices = {}
+            if missing:
+                placeholders = ", ".join(["?"] * len(missing))
+                rows = self.db_manager.execute_query(
+                    f"SELECT id, default_price FROM treatments WHERE id IN ({placeholders})",
+                    tuple(missing),
+                    fetch_all=True
+                )
+                default_prices = {row['id']: row['default_price'] for row in rows}
+
+            records = []
+            for treatment in treatments:
+                price = treatment.get('price')
+                if price is None:
+                    price = default_prices.get(treatment['treatment_id'])
+                records.append({
+                    'appointment_id': appointment_id,
+                    'treatment_id': treatment['treatment_id'],
+                    'quantity': treatment.get('quantity', 1),
+                    'price_applied': price,
+                    'notes': treatment.get('notes')
+                })
+
+            result = self.db_manager.insert_records('appointment_treatments', records)
+            for failure in result['failed']:
+                logger.error(f"Tratamiento {failure['row']['treatment_id']} no asignado: {failure['error']}")
+            logger.info(f"{result['inserted']} tratamientos asignados a cita {appointment_id}")
+            return result
+        except Exception as e:
+            logger.error(f"Error al asignar tratamientos a cita: {e}")
+            return None
+
     def get_treatments_by_appointment(self, appointment_id):
         """
         Obtiene todos los tratamientos asignados a una cita
@@ -371,7 +422,7 @@ class TreatmentManager:
         """
         try:
             query = '''
-                SELECT at.*, t.name as treatment_name, a.date, a.status
+                SELECT at.*, t.name as treatment_name, a.date, a.status, a.patient_id
                 FROM appointment_treatments at
                 JOIN appointments a ON at.appointment_id = a.id
                 JOIN treatments t ON at.treatment_id = t.id
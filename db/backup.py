@@ -0,0 +1,238 @@
+# backup.py
+"""
+Copias de seguridad en caliente de la base de datos.
+
+Archivo: backup.py
+Propósito: Copiar la base de datos por bloques de páginas con la API de backup de
+           SQLite, cediendo el paso a los escritores entre bloques, en un hilo de
+           fondo con avance notificado mediante callbacks; rotar las copias
+           antiguas de data/backups y, opcionalmente, comprimirlas con gzip.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import datetime
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+
+# =============================================
+# Configuración global
+# =============================================
+BACKUP_PREFIX = 'clinic_backup_'
+DEFAULT_PAGES_PER_STEP = 256    # Páginas copiadas en cada paso (~1 MB con páginas de 4 KB)
+DEFAULT_STEP_SLEEP = 0.05       # Segundos de pausa entre pasos para dejar escribir a otros
+DEFAULT_KEEP = 10               # Copias conservadas por la rotación
+
+# Callback de avance: (páginas copiadas, páginas totales)
+ProgressCallback = Callable[[int, int], None]
+# Callback de fin: (ruta de la copia o None, excepción o None)
+DoneCallback = Callable[[Optional[str], Optional[BaseException]], None]
+
+
+class BackupCancelled(Exception):
+    """Se lanza cuando una copia en curso se cancela con BackupEngine.cancel()."""
+
+
+class BackupEngine:
+    """
+    Motor de copias de seguridad incrementales.
+
+    La copia se hace sobre un archivo temporal (.partial) que sólo se renombra al
+    nombre definitivo cuando termina, de modo que nunca queda una copia a medias
+    con el nombre de una copia válida.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        backup_dir: Optional[str] = None,
+        pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+        step_sleep: float = DEFAULT_STEP_SLEEP,
+        keep: int = DEFAULT_KEEP,
+        compress: bool = False
+    ):
+        """
+        Inicializa el motor.
+
+        Args:
+            db_path (str): Ruta de la base de datos a copiar
+            backup_dir (str): Carpeta de las copias (por defecto data/backups junto a la base)
+            pages_per_step (int): Páginas copiadas en cada paso
+            step_sleep (float): Pausa en segundos entre pasos
+            keep (int): Número de copias que conserva la rotación (0 = no rotar)
+            compress (bool): Si True, guarda la copia comprimida (.db.gz)
+        """
+        if pages_per_step < 1:
+            raise ValueError("pages_per_step debe ser mayor o igual a 1")
+
+        self.db_path = db_path
+        self.backup_dir = backup_dir or os.path.join(os.path.dirname(db_path), 'backups')
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.keep = keep
+        self.compress = compress
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # =============================================
+    # Copia
+    # =============================================
+    def default_backup_path(self) -> str:
+        """Ruta de la copia siguiente: data/backups/clinic_backup_AAAAMMDD_HHMMSS.db[.gz]."""
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        extension = '.db.gz' if self.compress else '.db'
+        return os.path.join(self.backup_dir, f"{BACKUP_PREFIX}{timestamp}{extension}")
+
+    def run(self, backup_path: Optional[str] = None, progress: Optional[ProgressCallback] = None) -> str:
+        """
+        Realiza una copia completa en el hilo actual.
+
+        Args:
+            backup_path (str): Ruta de destino (por defecto, una nueva en backup_dir)
+            progress (callable): Función llamada tras cada paso con (copiadas, totales)
+
+        Returns:
+            str: Ruta de la copia creada
+
+        Raises:
+            BackupCancelled: Si se canceló con cancel()
+            sqlite3.Error: Si falla la copia
+        """
+        self._cancel.clear()
+        return self._copy(backup_path, progress)
+
+    def _copy(self, backup_path: Optional[str], progress: Optional[ProgressCallback]) -> str:
+        """Copia por pasos sobre un archivo temporal, lo renombra y rota las copias."""
+        backup_path = backup_path or self.default_backup_path()
+        os.makedirs(os.path.dirname(os.path.abspath(backup_path)), exist_ok=True)
+        compress = backup_path.endswith('.gz')
+        db_copy_path = backup_path[:-3] if compress else backup_path
+        partial_path = f"{db_copy_path}.partial"
+
+        def on_step(status: int, remaining: int, total: int) -> None:
+            if self._cancel.is_set():
+                raise BackupCancelled("Copia de seguridad cancelada")
+            if progress:
+                progress(total - remaining, total)
+            if remaining and self.step_sleep:
+                # Entre pasos no se mantiene ningún bloqueo: los escritores avanzan
+                time.sleep(self.step_sleep)
+
+        try:
+            source = sqlite3.connect(self.db_path)
+            target = sqlite3.connect(partial_path)
+            try:
+                source.backup(target, pages=self.pages_per_step, progress=on_step)
+            finally:
+                target.close()
+                source.close()
+
+            if compress:
+                with open(partial_path, 'rb') as src, gzip.open(f"{backup_path}.partial", 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.remove(partial_path)
+                partial_path = f"{backup_path}.partial"
+            os.replace(partial_path, backup_path)
+        except BaseException:
+            for leftover in (partial_path, f"{backup_path}.partial"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+
+        if self.keep:
+            self.rotate()
+        return backup_path
+
+    def start(
+        self,
+        backup_path: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        on_done: Optional[DoneCallback] = None
+    ) -> threading.Thread:
+        """
+        Realiza la copia en un hilo de fondo.
+
+        Los callbacks se ejecutan en el hilo de la copia; desde Tkinter deben
+        reenviarse al hilo principal (por ejemplo con widget.after).
+
+        Args:
+            backup_path (str): Ruta de destino (opcional)
+            progress (callable): Función llamada tras cada paso con (copiadas, totales)
+            on_done (callable): Función llamada al terminar con (ruta, error)
+
+        Returns:
+            threading.Thread: Hilo de la copia
+
+        Raises:
+            RuntimeError: Si ya hay una copia en curso con este motor
+        """
+        if self.is_running():
+            raise RuntimeError("Ya hay una copia de seguridad en curso")
+
+        def worker() -> None:
+            try:
+                path = self._copy(backup_path, progress)
+            except BaseException as e:
+                if on_done:
+                    on_done(None, e)
+                return
+            if on_done:
+                on_done(path, None)
+
+        self._cancel.clear()
+        self._thread = threading.Thread(target=worker, name='db-backup', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def is_running(self) -> bool:
+        """Indica si hay una copia en curso en segundo plano."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self) -> None:
+        """Solicita cancelar la copia en curso (se detiene tras el paso actual)."""
+        self._cancel.set()
+
+    # =============================================
+    # Rotación
+    # =============================================
+    def list_backups(self) -> List[str]:
+        """
+        Lista las copias existentes, de la más antigua a la más reciente.
+
+        Returns:
+            list: Rutas de los archivos clinic_backup_*.db y clinic_backup_*.db.gz
+        """
+        pattern = os.path.join(self.backup_dir, f"{BACKUP_PREFIX}*")
+        backups = [
+            path for path in glob.glob(pattern)
+            if path.endswith('.db') or path.endswith('.db.gz')
+        ]
+        # El nombre contiene la fecha en formato ordenable
+        return sorted(backups, key=os.path.basename)
+
+    def rotate(self, keep: Optional[int] = None) -> List[str]:
+        """
+        Elimina las copias más antiguas conservando las más recientes.
+
+        Args:
+            keep (int): Número de copias a conservar (por defecto, el del motor)
+
+        Returns:
+            list: Rutas eliminadas
+        """
+        keep = self.keep if keep is None else keep
+        backups = self.list_backups()
+        removed = backups[:-keep] if keep > 0 else []
+        for path in removed:
+            os.remove(path)
+        return removed
@@ -0,0 +1,303 @@
+# connection_pool.py
+"""
+Pool de conexiones SQLite reutilizables por hilo.
+
+Archivo: connection_pool.py
+Propósito: Evitar el coste de abrir, configurar y cerrar una conexión en cada consulta
+           reutilizando conexiones ya abiertas, con un límite global de conexiones,
+           comprobaciones de salud y cierre ordenado.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# =============================================
+# Configuración global
+# =============================================
+DEFAULT_POOL_SIZE = 5
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0  # Segundos de inactividad antes de verificar la conexión
+DEFAULT_ACQUIRE_TIMEOUT = 10.0  # Segundos máximos de espera cuando el pool está lleno
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite con afinidad por hilo.
+
+    Hay dos formas de usarlo:
+    - connection(): presta una conexión para una operación y la devuelve al pool
+      al terminar, de modo que los hilos de larga duración (interfaz, envío de
+      notificaciones, reportes) no retienen una conexión entre consultas.
+    - acquire(): asigna una conexión al hilo hasta que éste la devuelva con
+      release() o termine.
+
+    Dentro de un préstamo el hilo usa siempre la misma conexión, también en
+    préstamos anidados. El número total de conexiones abiertas está limitado por
+    pool_size; las conexiones de hilos terminados se recuperan automáticamente.
+
+    Las conexiones se abren en modo autocommit (isolation_level=None), de modo que
+    cada sentencia se confirma por sí misma salvo que se abra una transacción
+    explícita con BEGIN.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+        acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT,
+        on_connect: Optional[Callable[[sqlite3.Connection], None]] = None
+    ):
+        """
+        Inicializa el pool.
+
+        Args:
+            db_path (str): Ruta al archivo de base de datos SQLite
+            pool_size (int): Número máximo de conexiones abiertas simultáneamente
+            health_check_interval (float): Segundos de inactividad tras los cuales una
+                                           conexión se verifica antes de reutilizarla
+            acquire_timeout (float): Segundos máximos de espera por una conexión libre
+            on_connect (callable): Función opcional que se ejecuta sobre cada conexión nueva
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size debe ser mayor o igual a 1")
+
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.on_connect = on_connect
+
+        self._local = threading.local()
+        self._condition = threading.Condition(threading.Lock())
+        # Conexiones asignadas: id de hilo -> (hilo, conexión)
+        self._assigned: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        # Conexiones libres listas para ser reutilizadas: (conexión, momento en que se liberó)
+        self._idle: List[Tuple[sqlite3.Connection, float]] = []
+        self._last_used: Dict[int, float] = {}
+        self._closed = False
+
+    # =============================================
+    # Gestión de conexiones
+    # =============================================
+    def _create_connection(self) -> sqlite3.Connection:
+        """Abre y configura una conexión nueva."""
+        conn = sqlite3.connect(
+            self.db_path,
+            isolation_level=None,
+            check_same_thread=False  # El pool garantiza el uso desde un único hilo
+        )
+        conn.row_factory = sqlite3.Row  # Permite acceso a columnas por nombre
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _total_connections(self) -> int:
+        """Número de conexiones abiertas (asignadas + libres). Requiere el lock."""
+        return len(self._assigned) + len(self._idle)
+
+    def _reclaim_dead_threads(self) -> None:
+        """Devuelve al pool las conexiones de hilos que ya terminaron. Requiere el lock."""
+        for ident, (thread, conn) in list(self._assigned.items()):
+            if not thread.is_alive():
+                del self._assigned[ident]
+                self._last_used.pop(ident, None)
+                self._idle.append((conn, 0.0))  # Se verifica antes de reutilizarla
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """
+        Verifica que la conexión sigue siendo utilizable.
+
+        Args:
+            conn (sqlite3.Connection): Conexión a verificar
+
+        Returns:
+            bool: True si la conexión responde correctamente
+        """
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        """Cierra una conexión ignorando errores."""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Obtiene la conexión asociada al hilo actual.
+
+        Returns:
+            sqlite3.Connection: Conexión reutilizable del hilo actual
+
+        Raises:
+            sqlite3.OperationalError: Si el pool está cerrado o no hay conexiones
+                                      libres dentro del tiempo de espera
+        """
+        conn = getattr(self._local, 'conn', None)
+        ident = threading.get_ident()
+        if conn is not None and self._assigned.get(ident, (None, None))[1] is not conn:
+            # Un préstamo cerrado desde otro hilo (p. ej. un iter_query abandonado) ya la devolvió
+            self._local.conn = conn = None
+        if conn is not None:
+            last_used = self._last_used.get(ident, 0.0)
+            now = time.monotonic()
+            if now - last_used < self.health_check_interval or self._is_healthy(conn):
+                self._last_used[ident] = now
+                return conn
+
+            # La conexión dejó de responder: descartarla y obtener otra
+            self._forget_current(conn)
+
+        return self._checkout()
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Asigna una conexión libre o nueva al hilo actual."""
+        thread = threading.current_thread()
+        ident = threading.get_ident()
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise sqlite3.OperationalError("El pool de conexiones está cerrado")
+
+                conn = None
+                while self._idle:
+                    # La última liberada primero: es la que más probablemente sigue en uso reciente
+                    candidate, idle_since = self._idle.pop()
+                    if time.monotonic() - idle_since < self.health_check_interval or self._is_healthy(candidate):
+                        conn = candidate
+                        break
+                    self._discard(candidate)
+
+                if conn is None:
+                    self._reclaim_dead_threads()
+                    if self._idle:
+                        continue
+                    if self._total_connections() < self.pool_size:
+                        conn = self._create_connection()
+
+                if conn is not None:
+                    self._assigned[ident] = (thread, conn)
+                    self._last_used[ident] = time.monotonic()
+                    self._local.conn = conn
+                    return conn
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"No hay conexiones disponibles en el pool (tamaño {self.pool_size})"
+                    )
+                self._condition.wait(remaining)
+
+    def _forget_current(self, conn: sqlite3.Connection) -> None:
+        """Elimina y cierra la conexión del hilo actual."""
+        ident = threading.get_ident()
+        with self._condition:
+            self._assigned.pop(ident, None)
+            self._last_used.pop(ident, None)
+            self._condition.notify()
+        self._local.conn = None
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Presta la conexión del hilo actual durante el bloque.
+
+        Al salir del bloque la conexión vuelve al pool, salvo que el hilo ya la
+        tuviera asignada (préstamo anidado o acquire() explícito): en ese caso la
+        devuelve quien la obtuvo.
+
+        Yields:
+            sqlite3.Connection: Conexión del hilo actual
+
+        Raises:
+            sqlite3.OperationalError: Igual que acquire()
+        """
+        ident = threading.get_ident()
+        owner = ident not in self._assigned
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            if owner:
+                self._give_back(ident, conn)
+
+    def release(self) -> None:
+        """
+        Devuelve al pool la conexión del hilo actual para que otro hilo la reutilice.
+
+        Útil en hilos de trabajo de larga duración que obtuvieron la conexión con
+        acquire() y ya no necesitan la base de datos.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._give_back(threading.get_ident(), conn)
+
+    def _give_back(self, ident: int, conn: sqlite3.Connection) -> None:
+        """Devuelve al pool la conexión asignada al hilo ident (revierte lo que quede abierto)."""
+        if ident == threading.get_ident():
+            self._local.conn = None
+        with self._condition:
+            if self._assigned.get(ident, (None, None))[1] is not conn:
+                return  # Ya devuelta o descartada (p. ej. por close_all)
+            del self._assigned[ident]
+            self._last_used.pop(ident, None)
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self) -> None:
+        """
+        Cierra todas las conexiones del pool y lo marca como cerrado.
+
+        Los hilos que sigan usando el pool recibirán un error en su próxima consulta.
+        """
+        with self._condition:
+            self._closed = True
+            for _, conn in self._assigned.values():
+                self._discard(conn)
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._assigned.clear()
+            self._idle.clear()
+            self._last_used.clear()
+            self._condition.notify_all()
+        self._local = threading.local()
+
+    @property
+    def closed(self) -> bool:
+        """Indica si el pool fue cerrado con close_all()."""
+        return self._closed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devuelve el estado actual del pool.
+
+        Returns:
+            dict: Conexiones asignadas, libres y tamaño máximo
+        """
+        with self._condition:
+            return {
+                'assigned': len(self._assigned),
+                'idle': len(self._idle),
+                'pool_size': self.pool_size
+            }
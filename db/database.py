@@ -9,14 +9,25 @@ Autor: Eliazar
 Fecha de creación: 01/05/2025
 """
 
-import datetime
 # =============================================
 # Importaciones
 # =============================================
 # Librerías estándar de Python
 import os
+import random
 import sqlite3
-from typing import Dict, List, Any, Union
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Union
+
+# Librerías propias del proyecto
+from db import query_stats
+from db.backup import DEFAULT_KEEP, BackupEngine, DoneCallback, ProgressCallback
+from db.connection_pool import ConnectionPool, DEFAULT_POOL_SIZE
+from db.migrations import LATEST_VERSION, apply_migrations
+from db.pragmas import DEFAULT_PROFILE, WalCheckpointer, apply_profile, get_profile, read_settings, wal_file_size
 
 # =============================================
 # Configuración global
@@ -27,29 +38,188 @@ DB_PATH = os.path.join(
     'clinic.db'
 )
 
+# Lectura por bloques de iter_query
+DEFAULT_BATCH_SIZE = 500
+ROW_FORMATS = ('dict', 'row', 'tuple')
+
+# Pools compartidos por ruta de base de datos y perfil: todas las instancias de
+# DatabaseManager que apuntan al mismo archivo con el mismo perfil reutilizan
+# las mismas conexiones.
+_POOLS: Dict[tuple, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+# Rutas cuyo esquema ya se verificó en este proceso
+_MIGRATED_PATHS = set()
+
+# Checkpoints periódicos del WAL en marcha: ruta absoluta -> WalCheckpointer
+_CHECKPOINTERS: Dict[str, WalCheckpointer] = {}
+
+
+def _get_shared_pool(db_path: str, pool_size: int, profile: str = DEFAULT_PROFILE) -> ConnectionPool:
+    """
+    Obtiene (o crea) el pool compartido para una base de datos.
+
+    Args:
+        db_path (str): Ruta al archivo de base de datos
+        pool_size (int): Tamaño del pool si hay que crearlo
+        profile (str): Perfil de rendimiento aplicado a cada conexión del pool
+
+    Returns:
+        ConnectionPool: Pool asociado a la ruta y al perfil
+    """
+    key = (os.path.abspath(db_path), profile)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.closed:
+            pool = ConnectionPool(
+                db_path,
+                pool_size=pool_size,
+                on_connect=lambda conn: apply_profile(conn, profile)
+            )
+            _POOLS[key] = pool
+        return pool
+
 # =============================================
-# Funciones de utilidad para transacciones
+# Tablas temporales
 # =============================================
-def rollback_transaction(conn: sqlite3.Connection) -> None:
+# No forman parte del esquema ni cambian user_version: cada transacción que las
+# necesita las crea en su conexión con Transaction.temp_table. Nombre -> DDL.
+TEMP_TABLES = {
+    # IDs del lote de pacientes que se borran en cascada (PatientManager.purge_patients)
+    'purge_ids': "CREATE TEMP TABLE IF NOT EXISTS purge_ids (id INTEGER PRIMARY KEY)",
+}
+
+# =============================================
+# Transacciones
+# =============================================
+# Transacciones abiertas por hilo: ruta absoluta -> Transaction
+_TRANSACTIONS = threading.local()
+
+
+class Transaction:
     """
-    Revierte una transacción manual en caso de error.
-    
-    Args:
-        conn (sqlite3.Connection): Objeto de conexión activa a la base de datos
+    Transacción activa de DatabaseManager en el hilo actual.
+
+    Se obtiene con DatabaseManager.transaction(). Mientras está abierta, todas las
+    llamadas de cualquier DatabaseManager del mismo hilo y la misma base de datos
+    (execute_query, insert_record, update_record, insert_records...) se ejecutan
+    dentro de ella y no confirman nada por su cuenta.
     """
-    conn.rollback()
-    conn.close()
 
+    def __init__(self, connection: sqlite3.Connection, immediate: bool):
+        """
+        Args:
+            connection (sqlite3.Connection): Conexión en modo autocommit que aloja la transacción
+            immediate (bool): Si la transacción se abrió con BEGIN IMMEDIATE
+        """
+        self.connection = connection
+        self.immediate = immediate
+        self.depth = 0  # Nivel de anidamiento (0 = transacción exterior)
+
+    def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
+        """
+        Ejecuta una sentencia directamente sobre la conexión de la transacción.
+
+        Args:
+            query (str): Sentencia SQL
+            params (tuple): Parámetros de la sentencia
+
+        Returns:
+            sqlite3.Cursor: Cursor con el resultado
+        """
+        return self.connection.execute(query, params)
+
+    def temp_table(self, name: str) -> str:
+        """
+        Crea (si no existe) y vacía una tabla temporal de TEMP_TABLES.
+
+        Las conexiones del pool se reutilizan, así que la tabla puede conservar
+        filas de una transacción anterior en la misma conexión.
+
+        Args:
+            name (str): Nombre de la tabla en TEMP_TABLES
+
+        Returns:
+            str: Nombre calificado de la tabla (temp.nombre)
+
+        Raises:
+            KeyError: Si la tabla no está en TEMP_TABLES
+        """
+        self.connection.execute(TEMP_TABLES[name])
+        self.connection.execute(f"DELETE FROM temp.{name}")
+        return f"temp.{name}"
 
-def commit_transaction(conn: sqlite3.Connection) -> None:
+
+class RetryPolicy:
     """
-    Confirma y finaliza una transacción manual exitosa.
-    
+    Reintentos con espera exponencial para transacciones que encuentran la base
+    de datos bloqueada por otro proceso.
+
+    Cada intento ya espera hasta busy_timeout (ver db/pragmas.py) dentro de
+    SQLite; la política decide cuántas veces se vuelve a intentar después y
+    cuánto se espera entre intentos.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 5,
+        base_delay: float = 0.05,
+        max_delay: float = 1.0,
+        jitter: float = 0.5
+    ):
+        """
+        Args:
+            attempts (int): Intentos totales (1 = sin reintentos)
+            base_delay (float): Segundos de espera antes del primer reintento
+            max_delay (float): Espera máxima entre intentos; se dobla hasta alcanzarla
+            jitter (float): Fracción aleatoria que se resta a cada espera (0-1) para
+                            que los procesos en conflicto no reintenten a la vez
+
+        Raises:
+            ValueError: Si attempts es menor que 1 o jitter está fuera de [0, 1]
+        """
+        if attempts < 1:
+            raise ValueError("attempts debe ser al menos 1")
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter debe estar entre 0 y 1")
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delays(self) -> Iterator[float]:
+        """
+        Esperas antes de cada reintento (attempts - 1 valores).
+
+        Yields:
+            float: Segundos a esperar
+        """
+        for retry in range(self.attempts - 1):
+            delay = min(self.max_delay, self.base_delay * (2 ** retry))
+            yield delay * (1 - self.jitter * random.random())
+
+
+def is_busy_error(error: BaseException) -> bool:
+    """
+    Indica si un error se debe a que otra conexión tiene bloqueada la base de datos.
+
     Args:
-        conn (sqlite3.Connection): Objeto de conexión activa a la base de datos
+        error (BaseException): Excepción capturada (también las que execute_query
+                               vuelve a lanzar como sqlite3.Error)
+
+    Returns:
+        bool: True si merece la pena reintentar
     """
-    conn.commit()
-    conn.close()
+    message = str(error).lower()
+    return isinstance(error, sqlite3.Error) and ('database is locked' in message or 'database is busy' in message)
+
+
+def _active_transactions() -> Dict[str, Transaction]:
+    """Devuelve el mapa de transacciones abiertas del hilo actual."""
+    transactions = getattr(_TRANSACTIONS, 'by_path', None)
+    if transactions is None:
+        transactions = _TRANSACTIONS.by_path = {}
+    return transactions
 
 
 # =============================================
@@ -65,17 +235,39 @@ class DatabaseManager:
     - Gestionar transacciones
     - Realizar operaciones CRUD (Crear, Leer, Actualizar, Eliminar)
     - Generar backups de la base de datos
+
+    En modo pooled (por defecto) las consultas reutilizan una conexión por hilo
+    en lugar de abrir y cerrar una conexión en cada llamada. Cada conexión del
+    pool se configura con un perfil de rendimiento (ver db/pragmas.py).
     """
     
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        pooled: bool = True,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        profile: str = DEFAULT_PROFILE
+    ):
         """
         Inicializa el gestor de base de datos.
         
         Args:
             db_path (str): Ruta al archivo de base de datos SQLite. 
                           Por defecto usa DB_PATH global.
+            pooled (bool): Si True, reutiliza conexiones por hilo mediante un pool
+                           compartido entre instancias con la misma ruta
+            pool_size (int): Número máximo de conexiones abiertas del pool
+            profile (str): Perfil de rendimiento de las conexiones del pool:
+                           'desktop', 'shared' o 'bulk-load'
+
+        Raises:
+            ValueError: Si el perfil no existe
         """
+        get_profile(profile)  # Valida el nombre antes de abrir nada
         self.db_path = db_path
+        self.pooled = pooled
+        self.pool_size = pool_size
+        self.profile = profile
         self._ensure_data_dir()
         self.setup_database()
 
@@ -97,186 +289,285 @@ class DatabaseManager:
         conn.row_factory = sqlite3.Row  # Permite acceso a columnas por nombre
         return conn
 
-    def setup_database(self) -> None:
-        """Crea todas las tablas necesarias si no existen."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Tabla de pacientes
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS patients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT NOT NULL,
-                last_name TEXT NOT NULL,
-                birthdate TEXT,
-                gender TEXT,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                registration_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                notes TEXT
-            )
-        ''')
-
-        # Tabla de citas
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS appointments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                patient_id INTEGER,
-                date TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                status TEXT DEFAULT 'scheduled',
-                notes TEXT,
-                FOREIGN KEY (patient_id) REFERENCES patients (id)
-            )
-        ''')
-
-        # Tabla de categorías de tratamientos
-        cursor.execute('''
-           CREATE TABLE IF NOT EXISTS treatment_categories
-           (
-               id          INTEGER PRIMARY KEY AUTOINCREMENT,
-               name        TEXT NOT NULL,
-               description TEXT,
-               active      INTEGER DEFAULT 1,
-               created_at  TEXT    DEFAULT CURRENT_TIMESTAMP
-           )
-        ''')
-
-        # Tabla de tratamientos (versión mejorada)
-        cursor.execute('''
-           CREATE TABLE IF NOT EXISTS treatments
-           (
-               id            INTEGER PRIMARY KEY AUTOINCREMENT,
-               category_id   INTEGER,
-               name          TEXT NOT NULL,
-               description   TEXT,
-               default_price REAL NOT NULL DEFAULT 0,
-               duration      INTEGER       DEFAULT 30,
-               active        INTEGER       DEFAULT 1,
-               created_at    TEXT          DEFAULT CURRENT_TIMESTAMP,
-               updated_at    TEXT          DEFAULT CURRENT_TIMESTAMP,
-               FOREIGN KEY (category_id) REFERENCES treatment_categories (id)
-           )
-        ''')
-
-        # Tabla de historial de precios de tratamientos
-        cursor.execute('''
-           CREATE TABLE IF NOT EXISTS treatment_price_history
-           (
-               id           INTEGER PRIMARY KEY AUTOINCREMENT,
-               treatment_id INTEGER NOT NULL,
-               price        REAL    NOT NULL,
-               start_date   TEXT    NOT NULL,
-               end_date     TEXT,
-               created_at   TEXT DEFAULT CURRENT_TIMESTAMP,
-               FOREIGN KEY (treatment_id) REFERENCES treatments (id)
-           )
-        ''')
-
-        # Tabla de tratamientos aplicados
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS appointment_treatments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                appointment_id INTEGER,
-                treatment_id INTEGER,
-                quantity INTEGER DEFAULT 1,
-                price_applied REAL NOT NULL,
-                notes TEXT,
-                FOREIGN KEY (appointment_id) REFERENCES appointments (id),
-                FOREIGN KEY (treatment_id) REFERENCES treatments (id)
-            )
-        ''')
-
-        # Tabla de pagos
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                appointment_id INTEGER,
-                amount REAL NOT NULL,
-                payment_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                payment_method TEXT,
-                notes TEXT,
-                FOREIGN KEY (appointment_id) REFERENCES appointments (id)
-            )
-        ''')
-
-        # Tabla de historial médico
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS medical_records (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                patient_id INTEGER,
-                record_date TEXT DEFAULT CURRENT_TIMESTAMP,
-                symptoms TEXT,
-                diagnosis TEXT,
-                treatment_plan TEXT,
-                notes TEXT,
-                FOREIGN KEY (patient_id) REFERENCES patients (id)
-            )
-        ''')
-
-        # Tabla de configuración de email
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS email_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                smtp_server TEXT NOT NULL,
-                smtp_port INTEGER NOT NULL,
-                username TEXT NOT NULL,
-                password TEXT NOT NULL,
-                sender_email TEXT NOT NULL,
-                sender_name TEXT,
-                signature TEXT
-            )
-        ''')
-
-        # Tabla de plantillas de email
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS email_templates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                subject TEXT NOT NULL,
-                body TEXT NOT NULL,
-                active INTEGER DEFAULT 1
-            )
-        ''')
-
-        # Tabla de horarios de trabajo
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS work_schedule (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                day_of_week INTEGER,
-                start_time TEXT,
-                end_time TEXT,
-                is_working_day INTEGER DEFAULT 1
-            )
-        ''')
-
-        # Tabla de seguimiento de emails
-        cursor.execute('''
-                       CREATE TABLE IF NOT EXISTS email_tracking
-                       (
-                           id               INTEGER PRIMARY KEY AUTOINCREMENT,
-                           tracking_id      TEXT UNIQUE NOT NULL,              -- UUID para identificación única
-                           appointment_id   INTEGER,                           -- Relación con citas
-                           email_type       TEXT,                              -- Tipo de email (confirmación, recordatorio, etc.)
-                           recipient_email  TEXT        NOT NULL,              -- Email del destinatario
-                           subject          TEXT        NOT NULL,              -- Asunto del email
-                           sent_date        TEXT    DEFAULT CURRENT_TIMESTAMP, -- Fecha de envío (automática)
-                           status           TEXT    DEFAULT 'sent',            -- Estado (sent, delivered, read, failed)
-                           delivery_status  TEXT,                              -- Estado de entrega (opcional para servicios avanzados)
-                           open_count       INTEGER DEFAULT 0,                 -- Veces que se abrió el email
-                           last_open_date   TEXT,                              -- Última fecha de apertura
-                           response_content TEXT,                              -- Contenido de la respuesta
-                           response_date    TEXT,                              -- Fecha de respuesta
-                           error_message    TEXT,                              -- Mensaje de error si falla el envío
-                           metadata         TEXT,                              -- JSON con datos adicionales
-                           FOREIGN KEY (appointment_id) REFERENCES appointments (id)
-                       )
-        ''')
-
-        conn.commit()
-        conn.close()
+    # =============================================
+    # Pool de conexiones
+    # =============================================
+    @property
+    def pool(self) -> ConnectionPool:
+        """Pool compartido de conexiones para esta base de datos y perfil."""
+        return _get_shared_pool(self.db_path, self.pool_size, self.profile)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Proporciona una conexión para una operación.
+
+        En modo pooled toma prestada una conexión del pool y la devuelve al
+        terminar la operación (ver ConnectionPool.connection); en caso contrario
+        abre una conexión nueva y la cierra al terminar.
+
+        Yields:
+            sqlite3.Connection: Conexión lista para usar
+        """
+        tx = _active_transactions().get(os.path.abspath(self.db_path))
+        if tx is not None:
+            # Dentro de transaction(): la confirmación la decide el bloque exterior
+            yield tx.connection
+        elif self.pooled:
+            # Conexión en autocommit: cada sentencia se confirma por sí misma
+            with self.pool.connection() as conn:
+                yield conn
+        else:
+            conn = self.get_connection()
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    @contextmanager
+    def transaction(
+        self,
+        immediate: bool = False,
+        attach: Optional[Dict[str, str]] = None
+    ) -> Iterator[Transaction]:
+        """
+        Abre una transacción que confirma una única vez al salir del bloque.
+
+        Uso:
+            with db.transaction(immediate=True) as tx:
+                db.update_record(...)
+                db.insert_record(...)
+
+        Las llamadas a DatabaseManager dentro del bloque (en el mismo hilo) se
+        unen a la transacción. Si se anida otro transaction(), se crea un
+        SAVEPOINT que se revierte por separado si su bloque falla. Ante cualquier
+        excepción se revierte todo lo hecho en el bloque y la excepción se propaga.
+
+        Args:
+            immediate (bool): Si True, usa BEGIN IMMEDIATE para reservar el bloqueo
+                              de escritura desde el inicio (recomendado si se va a
+                              leer y luego escribir)
+            attach (dict): Bases de datos {alias: ruta} que se adjuntan (ATTACH) a la
+                           conexión durante la transacción, p. ej. un archivo histórico.
+                           Sus tablas se usan como alias.tabla y se confirman a la vez.
+
+        Yields:
+            Transaction: Transacción activa
+
+        Raises:
+            ValueError: Si se pide adjuntar una base de datos en una transacción anidada
+                        (SQLite no permite ATTACH con una transacción abierta)
+        """
+        key = os.path.abspath(self.db_path)
+        transactions = _active_transactions()
+        tx = transactions.get(key)
+
+        for alias in attach or {}:
+            if not alias.isidentifier():
+                raise ValueError(f"Alias de base de datos no válido: {alias}")
+
+        if tx is not None:
+            attached = {row[1] for row in tx.connection.execute("PRAGMA database_list")}
+            missing = set(attach or {}) - attached
+            if missing:
+                raise ValueError(
+                    f"No se puede adjuntar {', '.join(sorted(missing))} dentro de una transacción abierta"
+                )
+            tx.depth += 1
+            savepoint = f"sp_{tx.depth}"
+            tx.connection.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield tx
+                tx.connection.execute(f"RELEASE {savepoint}")
+            except BaseException:
+                tx.connection.execute(f"ROLLBACK TO {savepoint}")
+                tx.connection.execute(f"RELEASE {savepoint}")
+                raise
+            finally:
+                tx.depth -= 1
+            return
+
+        with ExitStack() as stack:
+            if self.pooled:
+                # La conexión vuelve al pool al terminar la transacción
+                conn = stack.enter_context(self.pool.connection())
+            else:
+                conn = sqlite3.connect(self.db_path, isolation_level=None)
+                conn.row_factory = sqlite3.Row
+                stack.callback(conn.close)
+
+            tx = Transaction(conn, immediate)
+            attached = []
+            try:
+                for alias, path in (attach or {}).items():
+                    # El alias ya se validó como identificador; la ruta va como parámetro
+                    conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+                    attached.append(alias)
+                conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+                transactions[key] = tx
+                try:
+                    yield tx
+                    conn.execute("COMMIT")
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+                finally:
+                    transactions.pop(key, None)
+            finally:
+                for alias in attached:
+                    conn.execute(f"DETACH DATABASE {alias}")
+
+    def in_transaction(self) -> bool:
+        """Indica si el hilo actual tiene una transacción abierta en esta base de datos."""
+        return os.path.abspath(self.db_path) in _active_transactions()
+
+    def run_transaction(
+        self,
+        work: Callable[[Transaction], Any],
+        immediate: bool = False,
+        retry: Optional[RetryPolicy] = None
+    ) -> Any:
+        """
+        Ejecuta work(tx) en una transacción y la repite si la base de datos está ocupada.
+
+        Si el intento falla por un bloqueo (también al hacer COMMIT), la transacción
+        se revierte entera y work se vuelve a llamar tras la espera de la política,
+        así que work debe poder repetirse (leer y escribir sólo dentro de tx). Dentro
+        de una transacción ya abierta no se reintenta: el bloqueo es del bloque exterior.
+
+        Args:
+            work (callable): Función que recibe la Transaction y devuelve el resultado
+            immediate (bool): Si True, usa BEGIN IMMEDIATE (ver transaction)
+            retry (RetryPolicy): Política de reintentos; por defecto, un solo intento
+
+        Returns:
+            El valor devuelto por work
+
+        Raises:
+            sqlite3.Error: Si falla por otro motivo o se agotan los reintentos
+        """
+        if self.in_transaction():
+            with self.transaction(immediate=immediate) as tx:
+                return work(tx)
+
+        delays = (retry or RetryPolicy(attempts=1)).delays()
+        while True:
+            try:
+                with self.transaction(immediate=immediate) as tx:
+                    return work(tx)
+            except sqlite3.Error as e:
+                delay = next(delays, None)
+                if delay is None or not is_busy_error(e):
+                    raise
+                time.sleep(delay)
+
+    def close_all(self) -> None:
+        """
+        Cierra todas las conexiones de los pools de esta base de datos (de cualquier perfil).
+
+        Si se vuelve a consultar después, se crea un pool nuevo bajo demanda.
+        """
+        path = os.path.abspath(self.db_path)
+        with _POOLS_LOCK:
+            pools = [_POOLS.pop(key) for key in list(_POOLS) if key[0] == path]
+        for pool in pools:
+            pool.close_all()
+
+    # =============================================
+    # Perfiles de rendimiento y WAL
+    # =============================================
+    def diagnostics(self) -> Dict[str, Any]:
+        """
+        Informa de la configuración realmente aplicada en la conexión del hilo actual.
+
+        Returns:
+            dict: Perfil solicitado, valores efectivos de los PRAGMA, diferencias
+                  respecto al perfil, tamaño del WAL y estado del pool
+        """
+        expected = get_profile(self.profile)
+        with self._connection() as conn:
+            settings = read_settings(conn)
+
+        mismatches = {}
+        for pragma, value in expected.items():
+            actual = settings.get(pragma)
+            if str(actual).upper() != str(value).upper():
+                mismatches[pragma] = {'expected': value, 'actual': actual}
+
+        checkpointer = _CHECKPOINTERS.get(os.path.abspath(self.db_path))
+        return {
+            'db_path': os.path.abspath(self.db_path),
+            'profile': self.profile,
+            'pooled': self.pooled,
+            'settings': settings,
+            'mismatches': mismatches,
+            'wal_bytes': wal_file_size(self.db_path),
+            'pool': self.pool.stats() if self.pooled else None,
+            'checkpoint': checkpointer.last_result if checkpointer else None
+        }
+
+    def start_wal_checkpoint(
+        self,
+        interval: float = 60.0,
+        truncate_above_bytes: int = 64 * 1024 * 1024
+    ) -> WalCheckpointer:
+        """
+        Inicia (una sola vez por base de datos) el checkpoint periódico del WAL.
+
+        Args:
+            interval (float): Segundos entre checkpoints
+            truncate_above_bytes (int): Tamaño del WAL a partir del cual se trunca
+
+        Returns:
+            WalCheckpointer: Tarea en ejecución
+        """
+        key = os.path.abspath(self.db_path)
+        with _POOLS_LOCK:
+            checkpointer = _CHECKPOINTERS.get(key)
+            if checkpointer is None:
+                checkpointer = WalCheckpointer(self.db_path, interval, truncate_above_bytes)
+                _CHECKPOINTERS[key] = checkpointer
+        return checkpointer.start()
+
+    def stop_wal_checkpoint(self) -> None:
+        """Detiene el checkpoint periódico del WAL de esta base de datos, si existe."""
+        with _POOLS_LOCK:
+            checkpointer = _CHECKPOINTERS.pop(os.path.abspath(self.db_path), None)
+        if checkpointer is not None:
+            checkpointer.stop()
+
+    def setup_database(self, force: bool = False) -> int:
+        """
+        Lleva el esquema de la base de datos a la última versión.
+
+        Las migraciones se aplican una sola vez (ver db/migrations.py). Una vez que
+        una ruta ha sido verificada en este proceso, las siguientes llamadas no
+        abren ninguna conexión ni ejecutan sentencias DDL.
+
+        Args:
+            force (bool): Si True, vuelve a comprobar la versión aunque ya se
+                          haya verificado en este proceso
+
+        Returns:
+            int: Versión del esquema instalada
+        """
+        key = os.path.abspath(self.db_path)
+        if not force and key in _MIGRATED_PATHS:
+            return LATEST_VERSION
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            version = apply_migrations(conn)
+        finally:
+            conn.close()
+
+        _MIGRATED_PATHS.add(key)
+        return version
 
     def execute_query(
         self, 
@@ -306,38 +597,121 @@ class DatabaseManager:
         Raises:
             sqlite3.Error: Si ocurre un error en la base de datos
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        # Instrumentación opcional (db/query_stats.py); desactivada es None
+        stats = query_stats.active
+        start = time.perf_counter() if stats is not None else 0.0
 
-        try:
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
+        with self._connection() as conn:
+            cursor = conn.cursor()
 
-            if fetch_all:
-                results = cursor.fetchall()
-                conn.commit()
-                return [dict(row) for row in results]
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
 
-            elif fetch_one:
-                result = cursor.fetchone()
-                conn.commit()
-                return dict(result) if result else None
+                if fetch_all:
+                    result = [dict(row) for row in cursor.fetchall()]
 
-            elif return_last_id:
-                conn.commit()
-                return cursor.lastrowid
+                elif fetch_one:
+                    row = cursor.fetchone()
+                    result = dict(row) if row else None
 
-            else:
-                conn.commit()
-                return True
+                elif return_last_id:
+                    result = cursor.lastrowid
 
-        except sqlite3.Error as e:
-            conn.rollback()
-            raise sqlite3.Error(f"Error en la base de datos: {e}")
-        finally:
-            conn.close()
+                else:
+                    result = True
+
+                if stats is not None:
+                    self._record_stats(stats, conn, cursor, query, params, start, fetch_all, fetch_one, result)
+                return result
+
+            except sqlite3.Error as e:
+                raise sqlite3.Error(f"Error en la base de datos: {e}")
+            finally:
+                cursor.close()
+
+    def _record_stats(
+        self,
+        stats: 'query_stats.QueryStats',
+        conn: sqlite3.Connection,
+        cursor: sqlite3.Cursor,
+        query: str,
+        params: Optional[tuple],
+        start: float,
+        fetch_all: bool,
+        fetch_one: bool,
+        result: Any
+    ) -> None:
+        """Registra en la instrumentación activa una ejecución de execute_query."""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if fetch_all:
+            rows = result
+        elif fetch_one:
+            rows = [result] if result else []
+        else:
+            rows = None
+
+        def explain() -> List[str]:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params or ())
+            return [row[3] for row in plan]
+
+        stats.record(
+            query,
+            elapsed_ms,
+            rows=len(rows) if rows is not None else max(cursor.rowcount, 0),
+            bytes_materialized=query_stats.estimate_bytes(rows) if rows else 0,
+            explain=explain
+        )
+
+    def iter_query(
+        self,
+        query: str,
+        params: tuple = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        row_format: str = 'dict'
+    ) -> Iterator[Union[Dict[str, Any], sqlite3.Row, tuple]]:
+        """
+        Ejecuta una consulta y devuelve sus filas de forma perezosa.
+
+        A diferencia de execute_query(fetch_all=True), las filas se leen por bloques
+        con fetchmany y nunca se materializa el resultado completo.
+
+        Args:
+            query (str): Consulta SQL a ejecutar
+            params (tuple): Parámetros para la consulta (opcional)
+            batch_size (int): Número de filas leídas en cada fetchmany
+            row_format (str): 'dict', 'row' (sqlite3.Row) o 'tuple'
+
+        Yields:
+            Cada fila en el formato indicado
+
+        Raises:
+            ValueError: Si row_format no es válido
+            sqlite3.Error: Si ocurre un error en la base de datos
+        """
+        if row_format not in ROW_FORMATS:
+            raise ValueError(f"Formato de fila no válido: {row_format}")
+
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None if row_format == 'tuple' else sqlite3.Row
+            try:
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if row_format == 'dict':
+                        for row in rows:
+                            yield dict(row)
+                    else:
+                        yield from rows
+            except sqlite3.Error as e:
+                raise sqlite3.Error(f"Error en la base de datos: {e}")
+            finally:
+                cursor.close()
 
     def get_table_data(
         self, 
@@ -427,23 +801,208 @@ class DatabaseManager:
         query = f"DELETE FROM {table_name} WHERE id = ?"
         return self.execute_query(query, (record_id,))
 
-    def begin_transaction(self) -> sqlite3.Connection:
+    # =============================================
+    # Operaciones masivas
+    # =============================================
+    def insert_records(
+        self,
+        table_name: str,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
-        Inicia una transacción manual.
-        
+        Inserta muchos registros con executemany dentro de una transacción.
+
+        Todas las filas deben tener las mismas columnas que la primera. Si un
+        bloque falla, se reintenta fila a fila dentro de la misma transacción para
+        aislar las filas erróneas, que se informan sin abortar el resto del lote.
+
+        Args:
+            table_name (str): Nombre de la tabla
+            rows (iterable): Filas a insertar {columna: valor}; puede ser un generador
+            chunk_size (int): Si se indica, confirma cada bloque de este tamaño en su
+                              propia transacción; si es None, todo va en una sola
+
         Returns:
-            sqlite3.Connection: Conexión para gestionar la transacción
-            
-        Nota: Debe usarse con commit_transaction/rollback_transaction
+            dict: {
+                'inserted': Número de filas insertadas,
+                'first_id': Menor ID insertado (o None),
+                'last_id': Mayor ID insertado (o None),
+                'failed': Lista de {'index', 'row', 'error'} con las filas rechazadas
+            }
+
+        Raises:
+            sqlite3.Error: Si falla la transacción en su conjunto
         """
-        return self.get_connection()
+        result = {'inserted': 0, 'first_id': None, 'last_id': None, 'failed': []}
+        iterator = iter(rows)
+        first_row = next(iterator, None)
+        if first_row is None:
+            return result
+
+        columns = list(first_row.keys())
+        query = (f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                 f"VALUES ({', '.join(['?'] * len(columns))})")
+
+        def _record_ids(count: int, low: int, high: int) -> None:
+            result['inserted'] += count
+            result['first_id'] = low if result['first_id'] is None else min(result['first_id'], low)
+            result['last_id'] = high if result['last_id'] is None else max(result['last_id'], high)
+
+        def _insert_chunk(conn: sqlite3.Connection, offset: int, chunk: List[Dict[str, Any]]) -> None:
+            valid = []
+            for index, row in enumerate(chunk, start=offset):
+                if set(row.keys()) != set(columns):
+                    result['failed'].append({
+                        'index': index, 'row': row,
+                        'error': "Las columnas no coinciden con las de la primera fila"
+                    })
+                else:
+                    valid.append((index, row))
+            if not valid:
+                return
+
+            conn.execute("SAVEPOINT bulk_chunk")
+            try:
+                conn.executemany(query, [tuple(row[c] for c in columns) for _, row in valid])
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                if 'id' in columns:
+                    ids = [row['id'] for _, row in valid if row['id'] is not None]
+                    low, high = (min(ids), max(ids)) if ids else (last_id - len(valid) + 1, last_id)
+                else:
+                    low, high = last_id - len(valid) + 1, last_id
+                conn.execute("RELEASE bulk_chunk")
+                _record_ids(len(valid), low, high)
+            except sqlite3.Error:
+                # Aislar las filas erróneas: cada INSERT es atómico por sí mismo
+                conn.execute("ROLLBACK TO bulk_chunk")
+                conn.execute("RELEASE bulk_chunk")
+                for index, row in valid:
+                    try:
+                        cursor = conn.execute(query, tuple(row[c] for c in columns))
+                        _record_ids(1, cursor.lastrowid, cursor.lastrowid)
+                    except sqlite3.Error as e:
+                        result['failed'].append({'index': index, 'row': row, 'error': str(e)})
+
+        self._run_in_chunks(first_row, iterator, chunk_size, _insert_chunk)
+        result['failed'].sort(key=lambda failure: failure['index'])
+        return result
 
-    def get_backup(self, backup_path: str = None) -> bool:
+    def update_records(
+        self,
+        table_name: str,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Actualiza muchos registros por ID con executemany dentro de una transacción.
+
+        Cada fila debe incluir la clave 'id' y las columnas a modificar. Las filas
+        con el mismo conjunto de columnas se agrupan en una sola sentencia.
+
+        Args:
+            table_name (str): Nombre de la tabla
+            rows (iterable): Filas {'id': ..., columna: valor}
+            chunk_size (int): Si se indica, confirma cada bloque de este tamaño en su
+                              propia transacción; si es None, todo va en una sola
+
+        Returns:
+            dict: {
+                'updated': Número de filas modificadas,
+                'failed': Lista de {'index', 'row', 'error'} con las filas rechazadas
+            }
+
+        Raises:
+            sqlite3.Error: Si falla la transacción en su conjunto
+        """
+        result = {'updated': 0, 'failed': []}
+        iterator = iter(rows)
+        first_row = next(iterator, None)
+        if first_row is None:
+            return result
+
+        def _update_chunk(conn: sqlite3.Connection, offset: int, chunk: List[Dict[str, Any]]) -> None:
+            groups: Dict[tuple, List[tuple]] = {}
+            for index, row in enumerate(chunk, start=offset):
+                columns = tuple(k for k in row.keys() if k != 'id')
+                if row.get('id') is None or not columns:
+                    result['failed'].append({
+                        'index': index, 'row': row,
+                        'error': "La fila debe incluir 'id' y al menos una columna"
+                    })
+                    continue
+                groups.setdefault(columns, []).append((index, row))
+
+            for columns, group in groups.items():
+                set_clause = ", ".join([f"{k} = ?" for k in columns])
+                query = f"UPDATE {table_name} SET {set_clause} WHERE id = ?"
+                params = [tuple(row[c] for c in columns) + (row['id'],) for _, row in group]
+
+                conn.execute("SAVEPOINT bulk_chunk")
+                try:
+                    before = conn.total_changes
+                    conn.executemany(query, params)
+                    result['updated'] += conn.total_changes - before
+                    conn.execute("RELEASE bulk_chunk")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK TO bulk_chunk")
+                    conn.execute("RELEASE bulk_chunk")
+                    for (index, row), values in zip(group, params):
+                        try:
+                            result['updated'] += conn.execute(query, values).rowcount
+                        except sqlite3.Error as e:
+                            result['failed'].append({'index': index, 'row': row, 'error': str(e)})
+
+        self._run_in_chunks(first_row, iterator, chunk_size, _update_chunk)
+        result['failed'].sort(key=lambda failure: failure['index'])
+        return result
+
+    def _run_in_chunks(
+        self,
+        first_row: Dict[str, Any],
+        iterator: Iterator[Dict[str, Any]],
+        chunk_size: Optional[int],
+        handler: Callable[[sqlite3.Connection, int, List[Dict[str, Any]]], None]
+    ) -> None:
+        """
+        Recorre las filas por bloques y ejecuta handler(conn, offset, bloque) en transacción.
+
+        Con chunk_size=None todo el lote se confirma en una única transacción; en
+        otro caso se confirma una transacción por bloque. Si ya hay una transacción
+        abierta, cada bloque se ejecuta como un SAVEPOINT dentro de ella.
+        """
+        size = chunk_size if chunk_size and chunk_size > 0 else None
+        offset = 0
+        chunk = [first_row] + list(islice(iterator, (size - 1) if size else None))
+
+        try:
+            while chunk:
+                with self.transaction(immediate=True) as tx:
+                    handler(tx.connection, offset, chunk)
+                offset += len(chunk)
+                chunk = list(islice(iterator, size)) if size else []
+        except sqlite3.Error as e:
+            raise sqlite3.Error(f"Error en la base de datos: {e}")
+
+    def get_backup(
+        self,
+        backup_path: str = None,
+        progress: Optional[ProgressCallback] = None,
+        compress: bool = False,
+        keep: int = DEFAULT_KEEP
+    ) -> bool:
         """
         Crea una copia de seguridad de la base de datos.
+
+        La copia se hace por bloques de páginas (ver db/backup.py), de modo que los
+        demás puestos pueden seguir escribiendo mientras dura. Bloquea el hilo que
+        la llama; para no congelar la interfaz use start_backup().
         
         Args:
             backup_path (str): Ruta personalizada para el backup
+            progress (callable): Función llamada tras cada paso con (copiadas, totales)
+            compress (bool): Si True, guarda la copia comprimida (.db.gz)
+            keep (int): Copias de data/backups que se conservan (0 = no rotar)
             
         Returns:
             bool: True si el backup fue exitoso
@@ -452,19 +1011,30 @@ class DatabaseManager:
             RuntimeError: Si falla la creación del backup
         """
         try:
-            if not backup_path:
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_dir = os.path.join(os.path.dirname(self.db_path), 'backups')
-                
-                if not os.path.exists(backup_dir):
-                    os.makedirs(backup_dir)
-
-                backup_path = os.path.join(backup_dir, f"clinic_backup_{timestamp}.db")
-
-            with sqlite3.connect(self.db_path) as source_conn, \
-                 sqlite3.connect(backup_path) as backup_conn:
-                source_conn.backup(backup_conn)
-                
+            BackupEngine(self.db_path, compress=compress, keep=keep).run(backup_path, progress)
             return True
         except Exception as e:
-            raise RuntimeError(f"Error al crear backup: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Error al crear backup: {e}")
+
+    def start_backup(
+        self,
+        progress: Optional[ProgressCallback] = None,
+        on_done: Optional[DoneCallback] = None,
+        compress: bool = False,
+        keep: int = DEFAULT_KEEP
+    ) -> BackupEngine:
+        """
+        Inicia una copia de seguridad en segundo plano.
+
+        Args:
+            progress (callable): Función llamada tras cada paso con (copiadas, totales)
+            on_done (callable): Función llamada al terminar con (ruta, error)
+            compress (bool): Si True, guarda la copia comprimida (.db.gz)
+            keep (int): Copias de data/backups que se conservan (0 = no rotar)
+
+        Returns:
+            BackupEngine: Motor en ejecución (permite consultar is_running() o cancelar)
+        """
+        engine = BackupEngine(self.db_path, compress=compress, keep=keep)
+        engine.start(progress=progress, on_done=on_done)
+        return engine
@@ -0,0 +1,122 @@
+# maintenance.py
+"""
+Tareas de mantenimiento de la base de datos desde la línea de comandos.
+
+Archivo: maintenance.py
+Propósito: Ejecutar tareas puntuales sobre una base de datos existente, como
+           recalcular las claves de búsqueda normalizadas de los pacientes
+           insertados sin pasar por PatientManager (importaciones, SQL manual) o
+           eliminar los pacientes sin actividad según la política de retención.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python db/maintenance.py backfill-search-keys [--all] [--db RUTA]
+    python db/maintenance.py purge-inactive --before AAAA-MM-DD [--archive RUTA] [--dry-run]
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import os
+import sys
+from typing import Dict, List, Optional
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.patient_manager import PatientManager
+from db.database import DB_PATH, DatabaseManager
+from db.migrations import fill_patient_search_keys
+
+
+# =============================================
+# Tareas
+# =============================================
+def backfill_search_keys(db_manager: DatabaseManager, only_missing: bool = True) -> int:
+    """
+    Rellena las claves de búsqueda (first_name_key, last_name_key, phone_key, email_key).
+
+    Los triggers del índice FTS se encargan de reindexar los pacientes actualizados.
+
+    Args:
+        db_manager (DatabaseManager): Base de datos a procesar
+        only_missing (bool): Si True, sólo procesa pacientes con alguna clave vacía;
+                             si False, recalcula todas (p. ej. tras cambiar la normalización)
+
+    Returns:
+        int: Número de pacientes actualizados
+    """
+    with db_manager.transaction(immediate=True) as tx:
+        return fill_patient_search_keys(tx.connection, only_missing=only_missing)
+
+
+def inactive_patient_ids(db_manager: DatabaseManager, before: str) -> List[int]:
+    """
+    Pacientes sin citas desde una fecha y registrados antes de ella.
+
+    Args:
+        db_manager (DatabaseManager): Base de datos a procesar
+        before (str): Fecha límite (AAAA-MM-DD)
+
+    Returns:
+        list: IDs de los pacientes inactivos
+    """
+    query = """
+            SELECT p.id
+            FROM patients p
+            WHERE p.registration_date < ?
+              AND NOT EXISTS (SELECT 1 FROM appointments a WHERE a.patient_id = p.id AND a.date >= ?) \
+            """
+    return [row['id'] for row in db_manager.iter_query(query, (before, before))]
+
+
+def purge_inactive(db_manager: DatabaseManager, before: str, archive_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Elimina (y opcionalmente archiva) los pacientes inactivos con todos sus datos.
+
+    Args:
+        db_manager (DatabaseManager): Base de datos a procesar
+        before (str): Fecha límite (AAAA-MM-DD), ver inactive_patient_ids
+        archive_path (str): Base de datos de archivo; None para borrar sin archivar
+
+    Returns:
+        dict: Filas eliminadas por tabla (ver PatientManager.purge_patients)
+    """
+    patient_ids = inactive_patient_ids(db_manager, before)
+    return PatientManager(db_manager).purge_patients(patient_ids, archive_path=archive_path)
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de la base de datos")
+    parser.add_argument('--db', default=DB_PATH, help="Base de datos (por defecto data/clinic.db)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backfill = commands.add_parser('backfill-search-keys', help="Rellenar las claves de búsqueda de pacientes")
+    backfill.add_argument('--all', action='store_true', help="Recalcular todas las claves, no sólo las vacías")
+
+    purge = commands.add_parser('purge-inactive', help="Eliminar los pacientes sin citas desde una fecha")
+    purge.add_argument('--before', required=True, help="Fecha límite AAAA-MM-DD")
+    purge.add_argument('--archive', help="Base de datos de archivo donde copiar los datos eliminados")
+    purge.add_argument('--dry-run', action='store_true', help="Sólo contar los pacientes afectados")
+
+    args = parser.parse_args()
+    db_manager = DatabaseManager(args.db)
+
+    if args.command == 'backfill-search-keys':
+        updated = backfill_search_keys(db_manager, only_missing=not args.all)
+        print(f"Claves de búsqueda actualizadas: {updated} paciente(s)")
+    elif args.command == 'purge-inactive' and args.dry_run:
+        print(f"Pacientes inactivos: {len(inactive_patient_ids(db_manager, args.before))}")
+    elif args.command == 'purge-inactive':
+        removed = purge_inactive(db_manager, args.before, archive_path=args.archive)
+        for table, count in removed.items():
+            print(f"  {table}: {count}")
+
+    db_manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
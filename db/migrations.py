@@ -0,0 +1,581 @@
+# migrations.py
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+Archivo: migrations.py
+Propósito: Aplicar una única vez, en orden, los cambios de esquema de la base de datos
+           usando PRAGMA user_version para registrar la versión instalada.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import os
+import sqlite3
+import sys
+from typing import Callable, List, Optional, Sequence
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.text_utils import normalize_phone, normalize_text
+
+
+class Migration:
+    """
+    Representa un paso de migración del esquema.
+
+    Cada migración tiene un número de versión único y creciente, una descripción
+    y una lista de sentencias SQL y/o una función que recibe la conexión para
+    los cambios que no se pueden expresar sólo con SQL (por ejemplo, rellenar datos).
+    """
+
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        statements: Sequence[str] = (),
+        function: Optional[Callable[[sqlite3.Connection], None]] = None
+    ):
+        """
+        Inicializa la migración.
+
+        Args:
+            version (int): Versión del esquema que alcanza esta migración
+            description (str): Descripción breve del cambio
+            statements (list): Sentencias SQL a ejecutar en orden
+            function (callable): Función adicional ejecutada tras las sentencias
+        """
+        self.version = version
+        self.description = description
+        self.statements = list(statements)
+        self.function = function
+
+    def apply(self, conn: sqlite3.Connection) -> None:
+        """
+        Ejecuta la migración sobre una conexión con una transacción abierta.
+
+        Args:
+            conn (sqlite3.Connection): Conexión activa a la base de datos
+        """
+        for statement in self.statements:
+            conn.execute(statement)
+        if self.function:
+            self.function(conn)
+
+
+# =============================================
+# Versión 1: esquema base
+# =============================================
+_BASE_SCHEMA = [
+    # Tabla de pacientes
+    '''
+        CREATE TABLE IF NOT EXISTS patients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            birthdate TEXT,
+            gender TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            registration_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            notes TEXT
+        )
+    ''',
+    # Tabla de citas
+    '''
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER,
+            date TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            status TEXT DEFAULT 'scheduled',
+            notes TEXT,
+            FOREIGN KEY (patient_id) REFERENCES patients (id)
+        )
+    ''',
+    # Tabla de categorías de tratamientos
+    '''
+        CREATE TABLE IF NOT EXISTS treatment_categories
+        (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            name        TEXT NOT NULL,
+            description TEXT,
+            active      INTEGER DEFAULT 1,
+            created_at  TEXT    DEFAULT CURRENT_TIMESTAMP
+        )
+    ''',
+    # Tabla de tratamientos (versión mejorada)
+    '''
+        CREATE TABLE IF NOT EXISTS treatments
+        (
+            id            INTEGER PRIMARY KEY AUTOINCREMENT,
+            category_id   INTEGER,
+            name          TEXT NOT NULL,
+            description   TEXT,
+            default_price REAL NOT NULL DEFAULT 0,
+            duration      INTEGER       DEFAULT 30,
+            active        INTEGER       DEFAULT 1,
+            created_at    TEXT          DEFAULT CURRENT_TIMESTAMP,
+            updated_at    TEXT          DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (category_id) REFERENCES treatment_categories (id)
+        )
+    ''',
+    # Tabla de historial de precios de tratamientos
+    '''
+        CREATE TABLE IF NOT EXISTS treatment_price_history
+        (
+            id           INTEGER PRIMARY KEY AUTOINCREMENT,
+            treatment_id INTEGER NOT NULL,
+            price        REAL    NOT NULL,
+            start_date   TEXT    NOT NULL,
+            end_date     TEXT,
+            created_at   TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (treatment_id) REFERENCES treatments (id)
+        )
+    ''',
+    # Tabla de tratamientos aplicados
+    '''
+        CREATE TABLE IF NOT EXISTS appointment_treatments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appointment_id INTEGER,
+            treatment_id INTEGER,
+            quantity INTEGER DEFAULT 1,
+            price_applied REAL NOT NULL,
+            notes TEXT,
+            FOREIGN KEY (appointment_id) REFERENCES appointments (id),
+            FOREIGN KEY (treatment_id) REFERENCES treatments (id)
+        )
+    ''',
+    # Tabla de pagos
+    '''
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appointment_id INTEGER,
+            amount REAL NOT NULL,
+            payment_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            payment_method TEXT,
+            notes TEXT,
+            FOREIGN KEY (appointment_id) REFERENCES appointments (id)
+        )
+    ''',
+    # Tabla de historial médico
+    '''
+        CREATE TABLE IF NOT EXISTS medical_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patient_id INTEGER,
+            record_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            symptoms TEXT,
+            diagnosis TEXT,
+            treatment_plan TEXT,
+            notes TEXT,
+            FOREIGN KEY (patient_id) REFERENCES patients (id)
+        )
+    ''',
+    # Tabla de configuración de email
+    '''
+        CREATE TABLE IF NOT EXISTS email_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            smtp_server TEXT NOT NULL,
+            smtp_port INTEGER NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            sender_email TEXT NOT NULL,
+            sender_name TEXT,
+            signature TEXT
+        )
+    ''',
+    # Tabla de plantillas de email
+    '''
+        CREATE TABLE IF NOT EXISTS email_templates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            active INTEGER DEFAULT 1
+        )
+    ''',
+    # Tabla de horarios de trabajo
+    '''
+        CREATE TABLE IF NOT EXISTS work_schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            day_of_week INTEGER,
+            start_time TEXT,
+            end_time TEXT,
+            is_working_day INTEGER DEFAULT 1
+        )
+    ''',
+    # Tabla de seguimiento de emails
+    '''
+        CREATE TABLE IF NOT EXISTS email_tracking
+        (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            tracking_id      TEXT UNIQUE NOT NULL,              -- UUID para identificación única
+            appointment_id   INTEGER,                           -- Relación con citas
+            email_type       TEXT,                              -- Tipo de email (confirmación, recordatorio, etc.)
+            recipient_email  TEXT        NOT NULL,              -- Email del destinatario
+            subject          TEXT        NOT NULL,              -- Asunto del email
+            sent_date        TEXT    DEFAULT CURRENT_TIMESTAMP, -- Fecha de envío (automática)
+            status           TEXT    DEFAULT 'sent',            -- Estado (sent, delivered, read, failed)
+            delivery_status  TEXT,                              -- Estado de entrega (opcional para servicios avanzados)
+            open_count       INTEGER DEFAULT 0,                 -- Veces que se abrió el email
+            last_open_date   TEXT,                              -- Última fecha de apertura
+            response_content TEXT,                              -- Contenido de la respuesta
+            response_date    TEXT,                              -- Fecha de respuesta
+            error_message    TEXT,                              -- Mensaje de error si falla el envío
+            metadata         TEXT,                              -- JSON con datos adicionales
+            FOREIGN KEY (appointment_id) REFERENCES appointments (id)
+        )
+    ''',
+]
+
+# =============================================
+# Versión 2: índices secundarios de las consultas frecuentes
+# =============================================
+_HOT_PATH_INDEXES = [
+    # Agenda diaria y comprobación de disponibilidad (date = ? ORDER BY start_time)
+    "CREATE INDEX IF NOT EXISTS idx_appointments_date_start ON appointments (date, start_time)",
+    # Citas de un paciente ordenadas por fecha
+    "CREATE INDEX IF NOT EXISTS idx_appointments_patient_date ON appointments (patient_id, date)",
+    # Claves foráneas usadas en JOIN y filtros
+    "CREATE INDEX IF NOT EXISTS idx_appointment_treatments_appointment "
+    "ON appointment_treatments (appointment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_appointment_treatments_treatment "
+    "ON appointment_treatments (treatment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_payments_appointment ON payments (appointment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_medical_records_patient ON medical_records (patient_id)",
+    "CREATE INDEX IF NOT EXISTS idx_treatment_price_history_treatment "
+    "ON treatment_price_history (treatment_id, start_date)",
+    "CREATE INDEX IF NOT EXISTS idx_treatments_category ON treatments (category_id)",
+    "CREATE INDEX IF NOT EXISTS idx_email_tracking_appointment "
+    "ON email_tracking (appointment_id, sent_date)",
+]
+
+# =============================================
+# Versión 3: búsqueda de pacientes con FTS5 (tokenizador trigram)
+# =============================================
+# Tabla de contenido externo: el índice guarda sólo los trigramas y lee los
+# valores de patients. Los triggers la mantienen sincronizada.
+_PATIENT_SEARCH_FTS = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+        first_name, last_name, phone, email,
+        content='patients', content_rowid='id', tokenize='trigram'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS patients_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_fts (rowid, first_name, last_name, phone, email)
+        VALUES (new.id, new.first_name, new.last_name, new.phone, new.email);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS patients_fts_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_fts (patients_fts, rowid, first_name, last_name, phone, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.phone, old.email);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS patients_fts_au
+    AFTER UPDATE OF first_name, last_name, phone, email ON patients BEGIN
+        INSERT INTO patients_fts (patients_fts, rowid, first_name, last_name, phone, email)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.phone, old.email);
+        INSERT INTO patients_fts (rowid, first_name, last_name, phone, email)
+        VALUES (new.id, new.first_name, new.last_name, new.phone, new.email);
+    END
+    ''',
+    # Carga inicial con los pacientes existentes
+    "INSERT INTO patients_fts (patients_fts) VALUES ('rebuild')",
+]
+
+# =============================================
+# Versión 4: claves de búsqueda normalizadas (sin tildes ni mayúsculas)
+# =============================================
+_PATIENT_SEARCH_KEYS = [
+    "ALTER TABLE patients ADD COLUMN first_name_key TEXT",
+    "ALTER TABLE patients ADD COLUMN last_name_key TEXT",
+    "ALTER TABLE patients ADD COLUMN phone_key TEXT",
+    "ALTER TABLE patients ADD COLUMN email_key TEXT",
+    # Listado y búsqueda por prefijo ordenados por apellidos y nombre
+    "CREATE INDEX IF NOT EXISTS idx_patients_last_name_key ON patients (last_name_key, first_name_key)",
+    "CREATE INDEX IF NOT EXISTS idx_patients_first_name_key ON patients (first_name_key)",
+    "CREATE INDEX IF NOT EXISTS idx_patients_phone_key ON patients (phone_key)",
+    "CREATE INDEX IF NOT EXISTS idx_patients_email_key ON patients (email_key)",
+]
+
+
+def fill_patient_search_keys(conn: sqlite3.Connection, only_missing: bool = True) -> int:
+    """
+    Calcula las claves de búsqueda de los pacientes con las funciones de utils/text_utils.py.
+
+    Args:
+        conn (sqlite3.Connection): Conexión activa a la base de datos
+        only_missing (bool): Si True, sólo procesa pacientes con alguna clave NULL
+
+    Returns:
+        int: Número de pacientes actualizados
+    """
+    conn.create_function('normalize_text', 1, normalize_text, deterministic=True)
+    conn.create_function('normalize_phone', 1, normalize_phone, deterministic=True)
+    query = """
+        UPDATE patients
+        SET first_name_key = normalize_text(first_name),
+            last_name_key  = normalize_text(last_name),
+            phone_key      = normalize_phone(phone),
+            email_key      = normalize_text(email)
+    """
+    if only_missing:
+        query += """
+        WHERE first_name_key IS NULL
+           OR last_name_key IS NULL
+           OR phone_key IS NULL
+           OR email_key IS NULL
+        """
+    return conn.execute(query).rowcount
+
+
+# =============================================
+# Versión 5: índice FTS5 sobre las claves normalizadas
+# =============================================
+# Sustituye al índice de la versión 3: al indexar las claves, la búsqueda por
+# trigramas también ignora tildes y reconoce teléfonos escritos con separadores.
+_PATIENT_SEARCH_FTS_KEYS = [
+    "DROP TRIGGER IF EXISTS patients_fts_ai",
+    "DROP TRIGGER IF EXISTS patients_fts_ad",
+    "DROP TRIGGER IF EXISTS patients_fts_au",
+    "DROP TABLE IF EXISTS patients_fts",
+    '''
+    CREATE VIRTUAL TABLE patients_fts USING fts5(
+        first_name_key, last_name_key, phone_key, email_key,
+        content='patients', content_rowid='id', tokenize='trigram'
+    )
+    ''',
+    '''
+    CREATE TRIGGER patients_fts_ai AFTER INSERT ON patients BEGIN
+        INSERT INTO patients_fts (rowid, first_name_key, last_name_key, phone_key, email_key)
+        VALUES (new.id, new.first_name_key, new.last_name_key, new.phone_key, new.email_key);
+    END
+    ''',
+    '''
+    CREATE TRIGGER patients_fts_ad AFTER DELETE ON patients BEGIN
+        INSERT INTO patients_fts (patients_fts, rowid, first_name_key, last_name_key, phone_key, email_key)
+        VALUES ('delete', old.id, old.first_name_key, old.last_name_key, old.phone_key, old.email_key);
+    END
+    ''',
+    '''
+    CREATE TRIGGER patients_fts_au
+    AFTER UPDATE OF first_name_key, last_name_key, phone_key, email_key ON patients BEGIN
+        INSERT INTO patients_fts (patients_fts, rowid, first_name_key, last_name_key, phone_key, email_key)
+        VALUES ('delete', old.id, old.first_name_key, old.last_name_key, old.phone_key, old.email_key);
+        INSERT INTO patients_fts (rowid, first_name_key, last_name_key, phone_key, email_key)
+        VALUES (new.id, new.first_name_key, new.last_name_key, new.phone_key, new.email_key);
+    END
+    ''',
+    "INSERT INTO patients_fts (patients_fts) VALUES ('rebuild')",
+]
+
+# =============================================
+# Versión 6: listado paginado de pacientes
+# =============================================
+# Paginación por clave (keyset): (last_name, first_name, id) > (?, ?, ?) recorre
+# sólo la página pedida en el orden del índice, sin OFFSET ni ordenación en memoria.
+_PATIENT_LIST_INDEX = [
+    "CREATE INDEX IF NOT EXISTS idx_patients_name_order ON patients (last_name, first_name, id)",
+]
+
+# =============================================
+# Versión 7: trabajos de importación de pacientes
+# =============================================
+# Cada importación registra las filas del archivo ya confirmadas; se actualiza en
+# la misma transacción que inserta el bloque, de modo que una importación
+# interrumpida se reanuda exactamente desde el último bloque confirmado.
+_IMPORT_JOBS = [
+    '''
+    CREATE TABLE IF NOT EXISTS import_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_path TEXT NOT NULL,
+        source_fingerprint TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'running',
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        inserted INTEGER NOT NULL DEFAULT 0,
+        rejected INTEGER NOT NULL DEFAULT 0,
+        rejects_path TEXT,
+        error TEXT,
+        started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_import_jobs_source ON import_jobs (source_path, source_fingerprint, status)",
+]
+
+# =============================================
+# Versión 8: historial médico paginado por paciente
+# =============================================
+# Sustituye al índice de patient_id: el nuevo también sirve a las consultas por
+# paciente y devuelve sus registros ya ordenados por fecha para paginarlos.
+_MEDICAL_RECORDS_INDEX = [
+    "CREATE INDEX IF NOT EXISTS idx_medical_records_patient_date ON medical_records (patient_id, record_date, id)",
+    "DROP INDEX IF EXISTS idx_medical_records_patient",
+]
+
+# =============================================
+# Versión 9: fotografías de pacientes por contenido
+# =============================================
+# Los archivos se guardan en data/photos con el SHA-256 de su contenido como
+# nombre; esta tabla los enlaza con los pacientes. La foto vigente de un paciente
+# es su fila más reciente, y el índice de sha256 permite saber si un archivo
+# sigue en uso antes de borrarlo.
+_PATIENT_PHOTOS = [
+    '''
+    CREATE TABLE IF NOT EXISTS patient_photos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        width INTEGER,
+        height INTEGER,
+        format TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (patient_id) REFERENCES patients (id)
+    )
+    ''',
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_patient_photos_patient ON patient_photos (patient_id, sha256)",
+    "CREATE INDEX IF NOT EXISTS idx_patient_photos_sha256 ON patient_photos (sha256)",
+]
+
+# =============================================
+# Versión 10: índice de ocupación de la agenda
+# =============================================
+# Cubre las consultas de disponibilidad (horas y estado de las citas de un día)
+# sin leer la tabla. Se conserva el índice (date, start_time): sin estadísticas,
+# el planificador no usa este más ancho para los rangos de fechas de los reportes.
+_APPOINTMENT_SLOT_INDEX = [
+    "CREATE INDEX IF NOT EXISTS idx_appointments_date_slot ON appointments (date, start_time, end_time, status)",
+]
+
+# =============================================
+# Versión 11: bandeja de salida de notificaciones
+# =============================================
+# Las notificaciones de citas se guardan en la misma transacción que la cita y un
+# hilo las envía después. next_attempt_at (UTC) es a la vez la hora del próximo
+# intento y el plazo de la reserva del envío en curso: si el proceso cae antes de
+# marcarla como enviada, vuelve a estar pendiente al vencer.
+_NOTIFICATION_OUTBOX = [
+    '''
+    CREATE TABLE IF NOT EXISTS notification_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        appointment_id INTEGER,
+        recipient TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        last_error TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        sent_at TEXT,
+        FOREIGN KEY (appointment_id) REFERENCES appointments (id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_notification_outbox_due ON notification_outbox (status, next_attempt_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_notification_outbox_appointment ON notification_outbox (appointment_id)",
+]
+
+# =============================================
+# Versión 12: importaciones por contenido del archivo
+# =============================================
+# Un archivo ya importado se reconoce por su huella aunque se haya copiado o
+# movido; el índice empieza por la huella para servir a las dos búsquedas de
+# PatientImporter (importación terminada y reanudación en la misma ruta).
+_IMPORT_JOBS_FINGERPRINT_INDEX = [
+    "CREATE INDEX IF NOT EXISTS idx_import_jobs_fingerprint ON import_jobs (source_fingerprint, status, source_path)",
+    "DROP INDEX IF EXISTS idx_import_jobs_source",
+]
+
+# =============================================
+# Lista ordenada de migraciones
+# =============================================
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Esquema base de la clínica", _BASE_SCHEMA),
+    Migration(2, "Índices de las consultas frecuentes", _HOT_PATH_INDEXES),
+    Migration(3, "Búsqueda de pacientes con FTS5", _PATIENT_SEARCH_FTS),
+    Migration(
+        4, "Claves de búsqueda normalizadas de pacientes", _PATIENT_SEARCH_KEYS,
+        function=lambda conn: fill_patient_search_keys(conn, only_missing=False)
+    ),
+    Migration(5, "Índice FTS5 sobre las claves normalizadas", _PATIENT_SEARCH_FTS_KEYS),
+    Migration(6, "Índice del listado paginado de pacientes", _PATIENT_LIST_INDEX),
+    Migration(7, "Trabajos de importación de pacientes", _IMPORT_JOBS),
+    Migration(8, "Índice del historial médico por fecha", _MEDICAL_RECORDS_INDEX),
+    Migration(9, "Fotografías de pacientes por contenido", _PATIENT_PHOTOS),
+    Migration(10, "Índice de ocupación de la agenda", _APPOINTMENT_SLOT_INDEX),
+    Migration(11, "Bandeja de salida de notificaciones", _NOTIFICATION_OUTBOX),
+    Migration(12, "Índice de importaciones por huella del archivo", _IMPORT_JOBS_FINGERPRINT_INDEX),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# =============================================
+# Funciones de aplicación
+# =============================================
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Obtiene la versión de esquema registrada en la base de datos.
+
+    Args:
+        conn (sqlite3.Connection): Conexión activa a la base de datos
+
+    Returns:
+        int: Valor de PRAGMA user_version (0 en una base de datos nueva)
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Aplica las migraciones pendientes en orden.
+
+    Si la base de datos ya está en la última versión no ejecuta ninguna sentencia
+    DDL. Cada migración se aplica en su propia transacción IMMEDIATE y la versión
+    se vuelve a leer dentro de ella, de modo que dos procesos que arrancan a la vez
+    no aplican la misma migración dos veces.
+
+    Args:
+        conn (sqlite3.Connection): Conexión en modo autocommit (isolation_level=None)
+
+    Returns:
+        int: Versión del esquema tras aplicar las migraciones
+
+    Raises:
+        sqlite3.Error: Si falla alguna migración (se revierte sólo esa migración)
+    """
+    current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        return current
+
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = get_schema_version(conn)
+            if migration.version <= current:
+                conn.execute("COMMIT")
+                continue
+
+            migration.apply(conn)
+            # PRAGMA no admite parámetros; la versión es un entero controlado por el código
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.execute("COMMIT")
+            current = migration.version
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return current
@@ -0,0 +1,231 @@
+# pragmas.py
+"""
+Perfiles de rendimiento (PRAGMA) y mantenimiento del WAL.
+
+Archivo: pragmas.py
+Propósito: Definir perfiles con nombre (desktop, shared, bulk-load) que configuran
+           journal_mode, synchronous, caché, mmap, temp_store y busy_timeout en cada
+           conexión del pool, consultar los valores realmente aplicados y mantener
+           acotado el archivo WAL con checkpoints periódicos.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger('database')
+
+# =============================================
+# Perfiles de rendimiento
+# =============================================
+# Nota: WAL requiere que todos los procesos accedan al archivo desde el mismo
+# equipo (usa memoria compartida). Para varias estaciones, la base de datos debe
+# residir en un disco local del equipo que la sirve, no en una carpeta de red.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Un único puesto: lecturas rápidas y escrituras seguras sin fsync en cada commit
+    'desktop': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,         # ~16 MB (valores negativos = KiB)
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,         # milisegundos
+        'journal_size_limit': 64 * 1024 * 1024,
+    },
+    # Varios puestos concurrentes: más paciencia con los bloqueos y durabilidad total
+    'shared': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 15000,
+        'journal_size_limit': 64 * 1024 * 1024,
+    },
+    # Importaciones masivas: máximo rendimiento, se acepta perder la última
+    # transacción ante un corte de luz
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+        'journal_size_limit': 256 * 1024 * 1024,
+    },
+}
+
+DEFAULT_PROFILE = 'desktop'
+
+# Orden en que se aplican: busy_timeout primero para que el cambio de journal_mode
+# espere si otro puesto tiene la base de datos bloqueada
+_PRAGMA_ORDER = (
+    'busy_timeout', 'journal_mode', 'synchronous', 'cache_size',
+    'mmap_size', 'temp_store', 'journal_size_limit'
+)
+
+# Valores numéricos que devuelve SQLite para los PRAGMA enumerados
+_SYNCHRONOUS_NAMES = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+_TEMP_STORE_NAMES = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+
+def get_profile(name: str) -> Dict[str, Any]:
+    """
+    Obtiene la configuración de un perfil.
+
+    Args:
+        name (str): Nombre del perfil
+
+    Returns:
+        dict: PRAGMA y valores del perfil
+
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de rendimiento desconocido: {name} (disponibles: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def apply_profile(conn: sqlite3.Connection, name: str = DEFAULT_PROFILE) -> None:
+    """
+    Aplica un perfil de rendimiento a una conexión.
+
+    Args:
+        conn (sqlite3.Connection): Conexión recién abierta
+        name (str): Nombre del perfil
+    """
+    profile = get_profile(name)
+    for pragma in _PRAGMA_ORDER:
+        if pragma in profile:
+            # PRAGMA no admite parámetros; los valores provienen de PROFILES
+            conn.execute(f"PRAGMA {pragma} = {profile[pragma]}").fetchall()
+
+
+def read_settings(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    Lee los valores efectivos de los PRAGMA de rendimiento en una conexión.
+
+    Args:
+        conn (sqlite3.Connection): Conexión a inspeccionar
+
+    Returns:
+        dict: Valor actual de cada PRAGMA
+    """
+    settings = {}
+    for pragma in _PRAGMA_ORDER:
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        settings[pragma] = row[0] if row else None
+
+    settings['journal_mode'] = str(settings['journal_mode']).upper()
+    settings['synchronous'] = _SYNCHRONOUS_NAMES.get(settings['synchronous'], settings['synchronous'])
+    settings['temp_store'] = _TEMP_STORE_NAMES.get(settings['temp_store'], settings['temp_store'])
+    settings['wal_autocheckpoint'] = conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0]
+    return settings
+
+
+def wal_file_size(db_path: str) -> int:
+    """
+    Tamaño en bytes del archivo WAL de la base de datos (0 si no existe).
+
+    Args:
+        db_path (str): Ruta al archivo de base de datos
+    """
+    wal_path = f"{db_path}-wal"
+    return os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+
+# =============================================
+# Checkpoint periódico del WAL
+# =============================================
+class WalCheckpointer:
+    """
+    Tarea en segundo plano que ejecuta checkpoints periódicos del WAL.
+
+    En cada ciclo ejecuta un checkpoint PASSIVE (no bloquea a lectores ni
+    escritores). Si el WAL supera truncate_above_bytes, intenta un checkpoint
+    TRUNCATE para devolver el archivo a tamaño cero.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        interval: float = 60.0,
+        truncate_above_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Inicializa la tarea.
+
+        Args:
+            db_path (str): Ruta al archivo de base de datos
+            interval (float): Segundos entre checkpoints
+            truncate_above_bytes (int): Tamaño del WAL a partir del cual se trunca
+        """
+        self.db_path = db_path
+        self.interval = interval
+        self.truncate_above_bytes = truncate_above_bytes
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Ejecuta un checkpoint inmediatamente.
+
+        Returns:
+            dict: Modo usado, resultado de wal_checkpoint y tamaño del WAL antes y después
+        """
+        size_before = wal_file_size(self.db_path)
+        mode = 'TRUNCATE' if size_before > self.truncate_above_bytes else 'PASSIVE'
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=1.0)
+        try:
+            busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        finally:
+            conn.close()
+
+        self.last_result = {
+            'mode': mode,
+            'busy': bool(busy),
+            'log_frames': log_frames,
+            'checkpointed_frames': checkpointed,
+            'wal_bytes_before': size_before,
+            'wal_bytes_after': wal_file_size(self.db_path)
+        }
+        return self.last_result
+
+    def _run(self) -> None:
+        """Bucle del hilo de checkpoints."""
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.checkpoint()
+            except sqlite3.Error as e:
+                logger.warning(f"Checkpoint del WAL fallido: {e}")
+
+    def start(self) -> 'WalCheckpointer':
+        """Inicia la tarea en un hilo demonio (si no estaba iniciada)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='wal-checkpoint', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Detiene la tarea.
+
+        Args:
+            timeout (float): Segundos máximos de espera a que termine el hilo
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
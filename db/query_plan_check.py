@@ -0,0 +1,254 @@
+# query_plan_check.py
+"""
+Verificación de planes de consulta de los gestores del sistema.
+
+Archivo: query_plan_check.py
+Propósito: Extraer las consultas SQL escritas en los gestores de core/ (y en el
+           rastreador de correos), ejecutar EXPLAIN QUERY PLAN sobre un esquema
+           recién migrado y fallar si alguna recorre una tabla completa.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    python db/query_plan_check.py [--verbose]
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import argparse
+import ast
+import glob
+import os
+import re
+import sqlite3
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Librerías propias del proyecto
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db.database import TEMP_TABLES
+from db.migrations import apply_migrations
+
+# =============================================
+# Configuración global
+# =============================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCE_PATTERNS = [
+    os.path.join('core', '*.py'),
+    os.path.join('utils', 'email_handler.py'),
+]
+
+# Tablas de catálogo pequeñas: recorrerlas completas es más barato que un índice
+CATALOG_TABLES = {
+    'treatment_categories',
+    'treatments',
+    'work_schedule',
+    'email_settings',
+    'email_templates',
+}
+
+# Consultas que recorren una tabla a propósito, con el motivo.
+# La clave es 'archivo:función'.
+ACCEPTED_SCANS = {
+    'duplicate_detector.py:load_records': 'recorre todos los pacientes para formar los bloques',
+    'patient_manager.py:count_patients': 'COUNT(*) recorre el índice más pequeño de la tabla',
+    'treatment_manager.py:get_popular_treatments': 'agregado sobre todo el histórico sin filtro de fechas',
+    'treatment_manager.py:calculate_treatment_revenue': 'agregado sobre todo el histórico sin filtro de fechas',
+    'appointment_manager.py:get_filtered_appointments': 'listado sin filtros (WHERE 1 = 1)',
+}
+
+# Valor con el que se sustituyen las expresiones de los f-strings
+FSTRING_PLACEHOLDER = '?'
+
+_SQL_START = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE)\b')
+_TABLE_REF = re.compile(
+    r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|INNER\b|GROUP\b|ORDER\b|SET\b|LIMIT\b)(\w+))?',
+    re.IGNORECASE
+)
+_SCAN_DETAIL = re.compile(r'^SCAN (\w+)')
+
+
+# =============================================
+# Extracción de consultas
+# =============================================
+def _enclosing_functions(tree: ast.AST) -> Dict[int, str]:
+    """Asocia cada número de línea con el nombre de la función que lo contiene."""
+    owners = {}
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for line in range(node.lineno, (node.end_lineno or node.lineno) + 1):
+                # Las funciones internas sobrescriben a las externas (se visitan después)
+                owners[line] = node.name
+    return owners
+
+
+def _render(node: ast.AST) -> Optional[str]:
+    """
+    Texto de una cadena literal; en los f-strings, cada expresión se sustituye por '?'.
+
+    Las expresiones de las consultas dinámicas son listas de parámetros
+    ("IN ({placeholders})"), así que el plan es el de un solo valor.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return ''.join(
+            part.value if isinstance(part, ast.Constant) else FSTRING_PLACEHOLDER
+            for part in node.values
+        )
+    return None
+
+
+def extract_queries(path: str) -> List[Tuple[str, int, str]]:
+    """
+    Extrae las consultas SQL de un archivo Python.
+
+    Se consideran las cadenas completas (literales o f-strings) que empiezan por
+    SELECT, WITH, UPDATE o DELETE; los fragmentos que se concatenan después
+    (" AND a.date >= ?") se ignoran, de modo que para consultas dinámicas se
+    analiza la versión base. Las expresiones de los f-strings se sustituyen por
+    FSTRING_PLACEHOLDER.
+
+    Args:
+        path (str): Ruta al archivo fuente
+
+    Returns:
+        list: Tuplas (función, línea, consulta)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    owners = _enclosing_functions(tree)
+    # Las partes literales de un f-string se analizan con el f-string completo
+    fragments = {
+        id(part)
+        for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+        for part in node.values
+    }
+    queries = []
+    for node in ast.walk(tree):
+        if id(node) in fragments:
+            continue
+        text = _render(node)
+        if text is not None and _SQL_START.match(text):
+            queries.append((owners.get(node.lineno, '<módulo>'), node.lineno, text))
+    return sorted(queries, key=lambda item: item[1])
+
+
+def _alias_map(query: str) -> Dict[str, str]:
+    """Relaciona alias y nombres de tabla usados en la consulta con la tabla real."""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(query):
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+# =============================================
+# Análisis de planes
+# =============================================
+def explain(conn: sqlite3.Connection, query: str) -> List[str]:
+    """
+    Ejecuta EXPLAIN QUERY PLAN con parámetros nulos.
+
+    Args:
+        conn (sqlite3.Connection): Conexión con el esquema migrado
+        query (str): Consulta a analizar
+
+    Returns:
+        list: Líneas de detalle del plan
+    """
+    params = (None,) * query.count('?')
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+
+def find_scans(query: str, plan: List[str]) -> List[str]:
+    """
+    Devuelve las tablas que el plan recorre completas.
+
+    Args:
+        query (str): Consulta analizada
+        plan (list): Líneas de detalle de EXPLAIN QUERY PLAN
+
+    Returns:
+        list: Nombres de tabla recorridos sin índice (excluye tablas de catálogo)
+    """
+    aliases = _alias_map(query)
+    scanned = []
+    for detail in plan:
+        match = _SCAN_DETAIL.match(detail)
+        if not match or 'VIRTUAL TABLE INDEX' in detail:
+            continue
+        table = aliases.get(match.group(1).lower(), match.group(1).lower())
+        if table not in CATALOG_TABLES:
+            scanned.append(table)
+    return scanned
+
+
+def check(verbose: bool = False, db_path: Optional[str] = None) -> int:
+    """
+    Analiza todas las consultas de los gestores.
+
+    Args:
+        verbose (bool): Si True, imprime el plan de cada consulta
+        db_path (str): Base de datos a usar; por defecto un esquema nuevo en memoria
+
+    Returns:
+        int: Número de consultas con recorridos completos no aceptados
+    """
+    conn = sqlite3.connect(db_path or ':memory:', isolation_level=None)
+    apply_migrations(conn)
+    for statement in TEMP_TABLES.values():
+        conn.execute(statement)
+
+    failures = 0
+    for pattern in SOURCE_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(BASE_DIR, pattern))):
+            filename = os.path.basename(path)
+            for function, line, query in extract_queries(path):
+                location = f"{filename}:{line} ({function})"
+                try:
+                    plan = explain(conn, query)
+                except sqlite3.Error as e:
+                    print(f"ERROR  {location}: {e}")
+                    failures += 1
+                    continue
+
+                scans = find_scans(query, plan)
+                accepted = ACCEPTED_SCANS.get(f"{filename}:{function}")
+                if scans and not accepted:
+                    failures += 1
+                    print(f"SCAN   {location}: {', '.join(scans)}")
+                elif scans:
+                    print(f"ACEPT  {location}: {', '.join(scans)} ({accepted})")
+                elif verbose:
+                    print(f"OK     {location}")
+
+                if verbose or (scans and not accepted):
+                    for detail in plan:
+                        print(f"         {detail}")
+
+    conn.close()
+    return failures
+
+
+def main() -> None:
+    """Punto de entrada de la línea de comandos."""
+    parser = argparse.ArgumentParser(description="Verifica que las consultas de los gestores usan índices")
+    parser.add_argument('--verbose', '-v', action='store_true', help="Mostrar el plan de todas las consultas")
+    parser.add_argument('--db', help="Base de datos a analizar (por defecto, esquema nuevo en memoria)")
+    args = parser.parse_args()
+
+    failures = check(verbose=args.verbose, db_path=args.db)
+    if failures:
+        print(f"\n{failures} consulta(s) recorren tablas completas")
+        sys.exit(1)
+    print("\nTodas las consultas usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+# query_stats.py
+"""
+Instrumentación opcional de las consultas ejecutadas por DatabaseManager.
+
+Archivo: query_stats.py
+Propósito: Medir cada llamada a execute_query (SQL normalizado, método del gestor que
+           la originó, tiempo, filas y bytes materializados), acumular histogramas en
+           memoria exportables a JSON y registrar las consultas lentas, con su plan de
+           ejecución si se desea. Desactivada por defecto: mientras no se active,
+           execute_query sólo comprueba una variable del módulo.
+Empresa: DiamondNetSolutions
+Autor: Eliazar
+
+Uso:
+    from db import query_stats
+    stats = query_stats.enable(slow_threshold_ms=50, slow_log_path='data/slow_queries.log')
+    ...
+    stats.dump_json('data/query_stats.json')
+    query_stats.disable()
+"""
+
+# =============================================
+# Importaciones
+# =============================================
+# Librerías estándar de Python
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+# =============================================
+# Configuración global
+# =============================================
+# Límites superiores (ms) de los intervalos del histograma; el último es abierto
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+DEFAULT_SLOW_THRESHOLD_MS = 100.0
+MAX_SLOW_ENTRIES = 200  # Consultas lentas conservadas en memoria
+
+# Instrumentación activa (None = desactivada). execute_query sólo lee esta variable.
+active: Optional['QueryStats'] = None
+
+# Archivos cuyos marcos se omiten al buscar el método que originó la consulta
+_INTERNAL_FILES = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.py'),
+    os.path.abspath(__file__),
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+# =============================================
+# Utilidades
+# =============================================
+@lru_cache(maxsize=1024)
+def normalize_sql(query: str) -> str:
+    """
+    Normaliza una consulta para agrupar ejecuciones equivalentes.
+
+    Sustituye literales por '?', colapsa las listas IN (?, ?, ...) y los espacios.
+
+    Args:
+        query (str): Consulta original
+
+    Returns:
+        str: Consulta normalizada
+    """
+    normalized = _STRING_LITERAL.sub('?', query)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _IN_LIST.sub('(?...)', normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def find_caller() -> str:
+    """
+    Identifica el método de la aplicación que originó la consulta.
+
+    Returns:
+        str: 'Clase.método' si la llamada viene de un método, 'módulo.función' en otro caso
+    """
+    frame = sys._getframe(1)
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return '<desconocido>'
+
+    instance = frame.f_locals.get('self')
+    if instance is not None:
+        return f"{type(instance).__name__}.{frame.f_code.co_name}"
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def estimate_bytes(rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Estima los bytes materializados por un resultado.
+
+    Cuenta la longitud de textos y BLOB y 8 bytes por cada número.
+
+    Args:
+        rows (iterable): Filas en forma de diccionario
+
+    Returns:
+        int: Tamaño aproximado en bytes
+    """
+    total = 0
+    for row in rows:
+        for value in row.values():
+            if isinstance(value, (str, bytes)):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total
+
+
+# =============================================
+# Acumulador de estadísticas
+# =============================================
+class QueryStats:
+    """
+    Acumula métricas por (consulta normalizada, método que la origina).
+
+    Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(
+        self,
+        slow_threshold_ms: float = DEFAULT_SLOW_THRESHOLD_MS,
+        slow_log_path: Optional[str] = None,
+        explain_slow: bool = False
+    ):
+        """
+        Inicializa el acumulador.
+
+        Args:
+            slow_threshold_ms (float): Tiempo a partir del cual una consulta se considera lenta
+            slow_log_path (str): Archivo donde se añade una línea JSON por consulta lenta (opcional)
+            explain_slow (bool): Si True, captura EXPLAIN QUERY PLAN de las consultas lentas
+        """
+        self.slow_threshold_ms = slow_threshold_ms
+        self.slow_log_path = slow_log_path
+        self.explain_slow = explain_slow
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, Dict[str, Any]] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=MAX_SLOW_ENTRIES)
+
+    def record(
+        self,
+        query: str,
+        elapsed_ms: float,
+        rows: int = 0,
+        bytes_materialized: int = 0,
+        caller: Optional[str] = None,
+        explain: Optional[Callable[[], List[str]]] = None
+    ) -> None:
+        """
+        Registra una ejecución.
+
+        Args:
+            query (str): Consulta ejecutada (sin normalizar)
+            elapsed_ms (float): Tiempo de ejecución en milisegundos
+            rows (int): Filas devueltas o afectadas
+            bytes_materialized (int): Bytes aproximados del resultado
+            caller (str): Método que originó la consulta (se detecta si no se indica)
+            explain (callable): Función que devuelve el plan de la consulta; sólo se
+                                invoca si la consulta es lenta y explain_slow está activo
+        """
+        sql = normalize_sql(query)
+        caller = caller or find_caller()
+        bucket = next(
+            (i for i, limit in enumerate(HISTOGRAM_BUCKETS_MS) if elapsed_ms < limit),
+            len(HISTOGRAM_BUCKETS_MS)
+        )
+
+        with self._lock:
+            entry = self._entries.get((sql, caller))
+            if entry is None:
+                entry = self._entries[(sql, caller)] = {
+                    'sql': sql,
+                    'caller': caller,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'bytes': 0,
+                    'histogram': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            entry['rows'] += rows
+            entry['bytes'] += bytes_materialized
+            entry['histogram'][bucket] += 1
+
+        if elapsed_ms >= self.slow_threshold_ms:
+            self._log_slow(sql, caller, elapsed_ms, rows, bytes_materialized, explain)
+
+    def _log_slow(
+        self,
+        sql: str,
+        caller: str,
+        elapsed_ms: float,
+        rows: int,
+        bytes_materialized: int,
+        explain: Optional[Callable[[], List[str]]]
+    ) -> None:
+        """Guarda una consulta lenta en memoria y, si se configuró, en el archivo de registro."""
+        slow = {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'sql': sql,
+            'caller': caller,
+            'elapsed_ms': round(elapsed_ms, 3),
+            'rows': rows,
+            'bytes': bytes_materialized
+        }
+        if self.explain_slow and explain is not None:
+            try:
+                slow['plan'] = explain()
+            except Exception as e:
+                slow['plan_error'] = str(e)
+
+        with self._lock:
+            self._slow.append(slow)
+            if self.slow_log_path:
+                with open(self.slow_log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(slow, ensure_ascii=False) + '\n')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Devuelve el estado actual de las métricas.
+
+        Returns:
+            dict: Consultas ordenadas por tiempo total (con media y límites del
+                  histograma) y últimas consultas lentas
+        """
+        with self._lock:
+            queries = [dict(entry, histogram=list(entry['histogram'])) for entry in self._entries.values()]
+            slow = list(self._slow)
+
+        for entry in queries:
+            entry['avg_ms'] = entry['total_ms'] / entry['count']
+        queries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+
+        return {
+            'histogram_buckets_ms': list(HISTOGRAM_BUCKETS_MS),
+            'slow_threshold_ms': self.slow_threshold_ms,
+            'queries': queries,
+            'slow_queries': slow
+        }
+
+    def dump_json(self, path: str) -> None:
+        """
+        Escribe las métricas en un archivo JSON.
+
+        Args:
+            path (str): Ruta del archivo de salida
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def reset(self) -> None:
+        """Borra todas las métricas acumuladas."""
+        with self._lock:
+            self._entries.clear()
+            self._slow.clear()
+
+
+# =============================================
+# Activación
+# =============================================
+def enable(
+    slow_threshold_ms: float = DEFAULT_SLOW_THRESHOLD_MS,
+    slow_log_path: Optional[str] = None,
+    explain_slow: bool = False
+) -> QueryStats:
+    """
+    Activa la instrumentación para todas las instancias de DatabaseManager.
+
+    Args:
+        slow_threshold_ms (float): Tiempo a partir del cual una consulta se considera lenta
+        slow_log_path (str): Archivo de registro de consultas lentas (opcional)
+        explain_slow (bool): Si True, captura EXPLAIN QUERY PLAN de las consultas lentas
+
+    Returns:
+        QueryStats: Acumulador activo
+    """
+    global active
+    active = QueryStats(slow_threshold_ms, slow_log_path, explain_slow)
+    return active
+
+
+def disable() -> Optional[QueryStats]:
+    """
+    Desactiva la instrumentación.
+
+    Returns:
+        QueryStats: El acumulador que estaba activo (para consultar sus métricas), o None
+    """
+    global active
+    stats, active = active, None
+    return stats
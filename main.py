@@ -12,12 +12,16 @@ Fecha de creación: 01/05/2025
 # ========================== #
 
 # Librerías estándar de Python
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 
 # Librerías propias del proyecto
 from ui.main_window import MainWindow
-from db.database import DatabaseManager
+from core.appointment_manager import AppointmentManager
+from core.notification_outbox import OutboxWorker
+from db.database import DatabaseManager, DB_PATH
+from db import query_stats
 
 # ========================== #
 #       FUNCIÓN MAIN         #
@@ -55,10 +59,23 @@ def main():
     #  INICIALIZACIÓN DE LA DB   #
     # ========================== #
 
+    # Instrumentación de consultas opcional: CLINIC_QUERY_STATS=1 python main.py
+    data_dir = os.path.dirname(DB_PATH)
+    if os.environ.get('CLINIC_QUERY_STATS'):
+        query_stats.enable(
+            slow_threshold_ms=float(os.environ.get('CLINIC_SLOW_QUERY_MS', query_stats.DEFAULT_SLOW_THRESHOLD_MS)),
+            slow_log_path=os.path.join(data_dir, 'slow_queries.log'),
+            explain_slow=True
+        )
+
     try:
-        # Se crea una instancia del gestor de base de datos
+        # Se crea una instancia del gestor de base de datos; al crearla se aplican
+        # las migraciones pendientes del esquema (sólo la primera vez)
         db_manager = DatabaseManager()
-        db_manager.setup_database()  # Se crea la base de datos y tablas si no existen
+        # Checkpoint periódico para que el archivo WAL no crezca sin límite
+        db_manager.start_wal_checkpoint()
+        # Envío en segundo plano de los correos guardados en la bandeja de salida
+        outbox_worker = OutboxWorker(db_manager, AppointmentManager(db_manager).deliver_notification).start()
     except Exception as e:
         # Si ocurre un error en la creación o conexión a la base de datos, se muestra un mensaje al usuario
         messagebox.showerror("Error de Base de Datos",
@@ -79,6 +96,17 @@ def main():
     # Se inicia el bucle principal de Tkinter, que mantiene la aplicación abierta
     root.mainloop()
 
+    # Al cerrar la ventana: detener el envío y el checkpoint y cerrar las conexiones
+    # (al cerrar la última conexión SQLite vuelca el WAL al archivo principal). Los
+    # correos que queden pendientes se envían en el próximo inicio.
+    outbox_worker.stop(timeout=10)
+    db_manager.stop_wal_checkpoint()
+    db_manager.close_all()
+
+    stats = query_stats.disable()
+    if stats is not None:
+        stats.dump_json(os.path.join(data_dir, 'query_stats.json'))
+
 # ========================== #
 #  PUNTO DE ENTRADA DEL APP  #
 # ========================== #
@@ -15,7 +15,7 @@ from typing import Optional, Dict, Any
 from tkcalendar import Calendar, DateEntry
 
 from core.appointment_manager import AppointmentManager
-from core.patient_manager import PatientManager
+from core.patient_manager import LIST_PAGE_SIZE, PatientManager
 from core.treatment_manager import TreatmentManager
 from utils.email_handler import send_appointment_email
 
@@ -86,6 +86,9 @@ class AppointmentsFrame(ttk.Frame):
         self.patient_var = tk.StringVar()
         self.patient_combo = ttk.Combobox(self.filter_frame, textvariable=self.patient_var, width=20)
         self.patient_combo.grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+        # Al escribir en el combo se filtran los pacientes con la búsqueda indexada
+        self._patient_search_job = None
+        self.patient_combo.bind("<KeyRelease>", self.on_patient_typed)
         self.load_patients_combo()
 
         # Filtro por estado
@@ -166,13 +169,33 @@ class AppointmentsFrame(ttk.Frame):
         self.edit_appointment()
 
     def load_patients_combo(self):
-        """Carga la lista de pacientes en el combobox"""
-        patients = self.patient_manager.get_all_patients()
-        print(patients)  # Debug
+        """Carga la primera página de pacientes en el combobox (el resto se encuentra escribiendo)"""
+        patients = self.patient_manager.list_patients(limit=LIST_PAGE_SIZE)
         patient_values = ["Todos"] + [f"{p['nombre']} {p['apellidos']} (ID: {p['id']})" for p in patients]
         self.patient_combo['values'] = patient_values
         self.patient_var.set("Todos")
 
+    def on_patient_typed(self, event=None):
+        """Programa la búsqueda de pacientes cuando el usuario deja de escribir"""
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self._patient_search_job is not None:
+            self.after_cancel(self._patient_search_job)
+        self._patient_search_job = self.after(200, self.filter_patients)
+
+    def filter_patients(self):
+        """Filtra la lista del combobox con el texto escrito"""
+        self._patient_search_job = None
+        search_text = self.patient_var.get().strip()
+        if search_text == "Todos" or re.search(r'ID: (\d+)', search_text):
+            return
+
+        if search_text:
+            patients = self.patient_manager.search_patients(search_text)
+        else:
+            patients = self.patient_manager.list_patients(limit=LIST_PAGE_SIZE)
+        self.patient_combo['values'] = ["Todos"] + [f"{p['nombre']} {p['apellidos']} (ID: {p['id']})" for p in patients]
+
     def load_appointments(self, date=None, patient_id=None, status=None):
         """Carga las citas según los filtros aplicados"""
         # Limpiar tabla
@@ -406,6 +429,9 @@ class AppointmentDialog(tk.Toplevel):
         ttk.Label(main_frame, text="Paciente:").grid(row=0, column=0, sticky=tk.W, pady=5)
         self.patient_combo = ttk.Combobox(main_frame, textvariable=self.patient_var, width=30)
         self.patient_combo.grid(row=0, column=1, sticky=tk.W, pady=5)
+        # Al escribir en el combo se filtran los pacientes con la búsqueda indexada
+        self._search_job = None
+        self.patient_combo.bind("<KeyRelease>", self.on_patient_typed)
         self.load_patients()
 
         # Fecha
@@ -441,8 +467,29 @@ class AppointmentDialog(tk.Toplevel):
         ttk.Button(button_frame, text="Cancelar", command=self.destroy).pack(side=tk.LEFT, padx=5)
 
     def load_patients(self):
-        """Carga la lista de pacientes en el combobox"""
-        patients = self.parent.patient_manager.get_all_patients()
+        """Carga la primera página de pacientes en el combobox (el resto se encuentra escribiendo)"""
+        patients = self.parent.patient_manager.list_patients(limit=LIST_PAGE_SIZE)
+        self.patient_combo['values'] = [f"{p['nombre']} {p['apellidos']} (ID: {p['id']})" for p in patients]
+
+    def on_patient_typed(self, event=None):
+        """Programa la búsqueda de pacientes cuando el usuario deja de escribir"""
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(200, self.filter_patients)
+
+    def filter_patients(self):
+        """Filtra la lista del combobox con el texto escrito"""
+        self._search_job = None
+        search_text = self.patient_var.get().strip()
+        if not search_text:
+            self.load_patients()
+            return
+        if re.search(r'ID: (\d+)', search_text):
+            return
+
+        patients = self.parent.patient_manager.search_patients(search_text)
         self.patient_combo['values'] = [f"{p['nombre']} {p['apellidos']} (ID: {p['id']})" for p in patients]
 
     def load_appointment_data(self):
@@ -483,12 +530,6 @@ class AppointmentDialog(tk.Toplevel):
             end_time = self.end_time_var.get()
             notes = self.notes_text.get("1.0", tk.END).strip()
 
-            # Verificar disponibilidad (solo para citas nuevas)
-            if self.mode == "nueva":
-                if not self.parent.appointment_manager.is_time_available(date, start_time, end_time):
-                    messagebox.showerror("Error", "El horario seleccionado no está disponible.")
-                    return
-
             # Crear/actualizar cita
             appointment_data = {
                 'patient_id': patient_id,
@@ -499,11 +540,19 @@ class AppointmentDialog(tk.Toplevel):
             }
 
             if self.mode == "nueva":
-                appointment_id = self.parent.appointment_manager.create_appointment(
+                # La disponibilidad se comprueba dentro de la misma transacción que crea la cita
+                result = self.parent.appointment_manager.create_appointment(
                     patient_id, date, start_time, end_time, "", notes
                 )
-                if appointment_id:
-                    messagebox.showinfo("Éxito", "Cita creada correctamente.")
+                if not result:
+                    if result.conflicts:
+                        occupied = ", ".join(f"{c['start_time']}-{c['end_time']}" for c in result.conflicts)
+                        messagebox.showerror("Horario no disponible",
+                                             f"{result.message}.\nOcupado: {occupied}")
+                    else:
+                        messagebox.showerror("Error", result.message or "No se pudo crear la cita.")
+                    return
+                messagebox.showinfo("Éxito", "Cita creada correctamente.")
             else:
                 success = self.parent.appointment_manager.update_appointment(
                     self.appointment_id,
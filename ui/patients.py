@@ -21,8 +21,20 @@ import json
 # Añadir la ruta raíz del proyecto al path de Python
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.patient_manager import PatientManager
-from utils.image_utils import resize_image, save_image
+from core.patient_manager import LIST_PAGE_SIZE, TIMELINE_PAGE_SIZE, PatientManager
+from utils.image_utils import resize_image
+
+# Milisegundos sin pulsaciones antes de lanzar la búsqueda
+SEARCH_DELAY_MS = 200
+
+# Nombre de cada tipo de evento del historial del paciente
+TIMELINE_KINDS = {
+    'appointment': "Cita",
+    'treatment': "Tratamiento",
+    'payment': "Pago",
+    'email': "Correo",
+    'medical_record': "Historial médico",
+}
 
 
 class PatientsFrame(ttk.Frame):
@@ -33,6 +45,12 @@ class PatientsFrame(ttk.Frame):
         self.selected_patient_id = None
         self.photo_path = None
         self.thumbnail = None
+        self._search_job = None  # Búsqueda pendiente (se agrupan las pulsaciones)
+        self._next_page = None  # Cursor de la siguiente página del listado (None = no hay más)
+        self._page_job = None  # Carga de página pendiente al llegar al final de la lista
+        self._total_patients = 0
+        self._timeline_next = None  # Cursor de la siguiente página del historial (None = no hay más)
+        self._timeline_job = None
 
         # Crear widgets
         self.create_widgets()
@@ -54,7 +72,7 @@ class PatientsFrame(ttk.Frame):
 
         ttk.Label(search_frame, text="Buscar paciente:").pack(side=tk.LEFT)
         self.search_var = tk.StringVar()
-        self.search_var.trace("w", lambda name, index, mode: self.search_patients())
+        self.search_var.trace("w", lambda name, index, mode: self.schedule_search())
         ttk.Entry(search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
         # Lista de pacientes
@@ -71,10 +89,14 @@ class PatientsFrame(ttk.Frame):
 
         self.patient_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
-        # Scrollbar para la lista
-        scrollbar = ttk.Scrollbar(left_frame, orient=tk.VERTICAL, command=self.patient_tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.patient_tree.configure(yscrollcommand=scrollbar.set)
+        # Scrollbar para la lista (al llegar al final se carga la siguiente página)
+        self.patient_scrollbar = ttk.Scrollbar(left_frame, orient=tk.VERTICAL, command=self.patient_tree.yview)
+        self.patient_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.patient_tree.configure(yscrollcommand=self.on_patient_scroll)
+
+        # Total de pacientes y cuántos se muestran
+        self.patient_count_var = tk.StringVar()
+        ttk.Label(left_frame, textvariable=self.patient_count_var).pack(anchor=tk.W, padx=5)
 
         # Botones de acción para la lista
         button_frame = ttk.Frame(left_frame)
@@ -169,6 +191,29 @@ class PatientsFrame(ttk.Frame):
         self.cancel_button = ttk.Button(action_frame, text="Cancelar", command=self.clear_form)
         self.cancel_button.pack(side=tk.LEFT, padx=5)
 
+        # Historial del paciente (citas, tratamientos, pagos, correos e historial médico)
+        timeline_frame = ttk.LabelFrame(right_frame, text="Historial")
+        timeline_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self.timeline_tree = ttk.Treeview(timeline_frame, columns=("fecha", "tipo", "descripcion", "estado", "importe"),
+                                          show="headings", height=8)
+        self.timeline_tree.heading("fecha", text="Fecha")
+        self.timeline_tree.heading("tipo", text="Tipo")
+        self.timeline_tree.heading("descripcion", text="Descripción")
+        self.timeline_tree.heading("estado", text="Estado")
+        self.timeline_tree.heading("importe", text="Importe")
+
+        self.timeline_tree.column("fecha", width=120)
+        self.timeline_tree.column("tipo", width=100)
+        self.timeline_tree.column("descripcion", width=200)
+        self.timeline_tree.column("estado", width=80)
+        self.timeline_tree.column("importe", width=70, anchor=tk.E)
+
+        self.timeline_scrollbar = ttk.Scrollbar(timeline_frame, orient=tk.VERTICAL, command=self.timeline_tree.yview)
+        self.timeline_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.timeline_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.timeline_tree.configure(yscrollcommand=self.on_timeline_scroll)
+
         # Inicialmente deshabilitar botones de guardar y cancelar
         self.save_button.config(state=tk.DISABLED)
         self.cancel_button.config(state=tk.DISABLED)
@@ -178,21 +223,56 @@ class PatientsFrame(ttk.Frame):
         for item in self.patient_tree.get_children():
             self.patient_tree.delete(item)
 
-        # Obtener pacientes de la base de datos
-        patients = self.patient_manager.get_all_patients()
+        # Sólo se carga la primera página; el resto al desplazarse hasta el final
+        self._total_patients = self.patient_manager.count_patients()
+        self._next_page = None
+        self.load_next_page(first=True)
+
+    def load_next_page(self, first=False):
+        self._page_job = None
+        if not first and self._next_page is None:
+            return
+
+        # Obtener la página siguiente de la base de datos
+        patients = self.patient_manager.list_patients(after=self._next_page, limit=LIST_PAGE_SIZE)
+        if len(patients) == LIST_PAGE_SIZE:
+            self._next_page = self.patient_manager.page_cursor(patients[-1])
+        else:
+            self._next_page = None
 
         # Insertar pacientes en el treeview
         for patient in patients:
             self.patient_tree.insert("", tk.END, values=(patient['id'], patient['nombre'], patient['apellidos'],
                                                          patient['telefono']))
 
+        shown = len(self.patient_tree.get_children())
+        self.patient_count_var.set(f"Mostrando {shown} de {self._total_patients} pacientes")
+
+    def on_patient_scroll(self, first, last):
+        self.patient_scrollbar.set(first, last)
+        # Cerca del final de la lista: pedir la página siguiente cuando Tk quede libre
+        if float(last) >= 0.95 and self._next_page is not None and self._page_job is None:
+            self._page_job = self.after_idle(self.load_next_page)
+
+    def schedule_search(self):
+        # Esperar a que el usuario deje de escribir antes de consultar la base de datos
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(SEARCH_DELAY_MS, self.search_patients)
+
     def search_patients(self):
+        self._search_job = None
+
         # Obtener texto de búsqueda
-        search_text = self.search_var.get().lower()
+        search_text = self.search_var.get().strip()
+        if not search_text:
+            self.load_patients()
+            return
 
-        # Limpiar treeview
+        # Limpiar treeview (los resultados de búsqueda no se paginan)
         for item in self.patient_tree.get_children():
             self.patient_tree.delete(item)
+        self._next_page = None
 
         # Obtener pacientes de la base de datos
         patients = self.patient_manager.search_patients(search_text)
@@ -201,6 +281,7 @@ class PatientsFrame(ttk.Frame):
         for patient in patients:
             self.patient_tree.insert("", tk.END, values=(patient['id'], patient['nombre'], patient['apellidos'],
                                                          patient['telefono']))
+        self.patient_count_var.set(f"{len(patients)} resultado(s)")
 
     def on_patient_select(self, event):
         # Obtener ID del paciente seleccionado
@@ -228,10 +309,44 @@ class PatientsFrame(ttk.Frame):
             # Cargar foto si existe
             self.load_patient_photo(patient['foto_path'])
 
+            # Cargar la primera página del historial
+            self.load_timeline()
+
             # Habilitar botones
             self.save_button.config(state=tk.NORMAL)
             self.cancel_button.config(state=tk.NORMAL)
 
+    def load_timeline(self):
+        # Limpiar historial
+        for item in self.timeline_tree.get_children():
+            self.timeline_tree.delete(item)
+        self._timeline_next = None
+        if self.selected_patient_id:
+            self.load_next_timeline_page(first=True)
+
+    def load_next_timeline_page(self, first=False):
+        self._timeline_job = None
+        if not first and self._timeline_next is None:
+            return
+
+        events = self.patient_manager.get_timeline(self.selected_patient_id, limit=TIMELINE_PAGE_SIZE,
+                                                   before=self._timeline_next)
+        if len(events) == TIMELINE_PAGE_SIZE:
+            self._timeline_next = self.patient_manager.timeline_cursor(events[-1])
+        else:
+            self._timeline_next = None
+
+        for event in events:
+            amount = f"{event['amount']:.2f}" if event['amount'] is not None else ""
+            self.timeline_tree.insert("", tk.END, values=(event['event_at'], TIMELINE_KINDS.get(event['kind'], event['kind']),
+                                                          event['description'] or "", event['status'] or "", amount))
+
+    def on_timeline_scroll(self, first, last):
+        self.timeline_scrollbar.set(first, last)
+        # Cerca del final del historial: pedir la página siguiente cuando Tk quede libre
+        if float(last) >= 0.95 and self._timeline_next is not None and self._timeline_job is None:
+            self._timeline_job = self.after_idle(self.load_next_timeline_page)
+
     def load_patient_photo(self, photo_path):
         # Resetear foto actual
         self.photo_path = None
@@ -293,10 +408,13 @@ class PatientsFrame(ttk.Frame):
 
         # Confirmar eliminación
         if messagebox.askyesno("Confirmar Eliminación",
-                               "¿Está seguro de que desea eliminar este paciente? Esta acción no se puede deshacer."):
+                               "¿Está seguro de que desea eliminar este paciente? Se eliminarán también sus "
+                               "citas, pagos, historial médico y fotografías. Esta acción no se puede deshacer."):
             try:
-                # Eliminar paciente
-                self.patient_manager.delete_patient(self.selected_patient_id)
+                # Eliminar paciente y sus datos dependientes
+                if not self.patient_manager.delete_patient(self.selected_patient_id):
+                    messagebox.showerror("Error", "No se pudo eliminar el paciente.")
+                    return
 
                 # Actualizar lista
                 self.load_patients()
@@ -343,24 +461,10 @@ class PatientsFrame(ttk.Frame):
                 'email': email,
                 'direccion': direccion,
                 'notas_medicas': notas_medicas,
-                'foto_path': None
+                # La imagen se guarda en el almacén de fotos (sin duplicados) al guardar el paciente
+                'foto_path': self.photo_path
             }
 
-            # Guardar foto si existe
-            if self.photo_path:
-                # Crear carpeta de fotos si no existe
-                photos_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'photos'))
-                os.makedirs(photos_dir, exist_ok=True)
-
-                # Generar nombre de archivo único
-                filename = f"{nombre}_{apellidos}_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.jpg"
-                new_path = os.path.join(photos_dir, filename)
-
-                # Guardar imagen
-                if self.photo_path != new_path:
-                    save_image(self.photo_path, new_path)
-                    patient_data['foto_path'] = new_path
-
             # Guardar o actualizar paciente
             if self.selected_patient_id:
                 patient_data['id'] = self.selected_patient_id
@@ -391,6 +495,11 @@ class PatientsFrame(ttk.Frame):
         self.photo_path = None
         self.photo_label.config(image="")
 
+        # Limpiar historial
+        for item in self.timeline_tree.get_children():
+            self.timeline_tree.delete(item)
+        self._timeline_next = None
+
         # Desactivar botones
         self.save_button.config(state=tk.DISABLED)
         self.cancel_button.config(state=tk.DISABLED)
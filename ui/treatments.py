@@ -16,7 +16,7 @@ import os
 
 # Importaciones de módulos internos
 from core.treatment_manager import TreatmentManager
-from core.patient_manager import PatientManager
+from core.patient_manager import LIST_PAGE_SIZE, PatientManager
 from db.database import DatabaseManager  # Añadido para inicializar los managers
 
 
@@ -41,6 +41,7 @@ class TreatmentsFrame(ttk.Frame):
         # Variables de control
         self.current_treatment_id = None
         self.current_patient_id = None
+        self._patient_search_jobs = {}  # Búsqueda pendiente de cada combo de pacientes
         self.current_assignment_id = None
 
         # Widgets
@@ -135,9 +136,11 @@ class TreatmentsFrame(ttk.Frame):
         patient_frame.pack(fill=tk.X, padx=10, pady=5)
 
         ttk.Label(patient_frame, text="Paciente:").pack(side=tk.LEFT, padx=5)
-        self.patient_combo = ttk.Combobox(patient_frame, state="readonly")
+        self.patient_combo = ttk.Combobox(patient_frame)
         self.patient_combo.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         self.patient_combo.bind("<<ComboboxSelected>>", self.on_patient_selected)
+        # Al escribir en el combo se filtran los pacientes con la búsqueda indexada
+        self.patient_combo.bind("<KeyRelease>", lambda event: self.on_patient_typed(self.patient_combo, event))
 
         # Frame para selección de tratamiento
         treatment_frame = ttk.LabelFrame(self.assignment_tab, text="Seleccionar Tratamiento")
@@ -184,8 +187,11 @@ class TreatmentsFrame(ttk.Frame):
         filter_frame.pack(fill=tk.X, padx=10, pady=5)
 
         ttk.Label(filter_frame, text="Paciente:").pack(side=tk.LEFT, padx=5)
-        self.history_patient_combo = ttk.Combobox(filter_frame, state="readonly")
+        self.history_patient_combo = ttk.Combobox(filter_frame)
         self.history_patient_combo.pack(side=tk.LEFT, padx=5)
+        self.history_patient_combo.bind(
+            "<KeyRelease>", lambda event: self.on_patient_typed(self.history_patient_combo, event)
+        )
 
         ttk.Label(filter_frame, text="Fecha desde:").pack(side=tk.LEFT, padx=5)
         self.date_from_entry = ttk.Entry(filter_frame, width=10)
@@ -254,9 +260,9 @@ class TreatmentsFrame(ttk.Frame):
             messagebox.showerror("Error", f"No se pudieron cargar los tratamientos: {str(e)}")
 
     def load_patients_combo(self):
-        """Carga la lista de pacientes en los combobox correspondientes"""
+        """Carga la primera página de pacientes en los combobox (el resto se encuentra escribiendo)"""
         try:
-            patients = self.patient_manager.get_all_patients()
+            patients = self.patient_manager.list_patients(limit=LIST_PAGE_SIZE)
             patient_list = [f"{p['id']} - {p['nombre']} {p['apellidos']}" for p in patients]
 
             self.patient_combo['values'] = patient_list
@@ -265,11 +271,39 @@ class TreatmentsFrame(ttk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron cargar los pacientes: {str(e)}")
 
+    def on_patient_typed(self, combo, event=None):
+        """Programa la búsqueda de pacientes del combo cuando el usuario deja de escribir"""
+        if event is not None and event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        job = self._patient_search_jobs.pop(combo, None)
+        if job is not None:
+            self.after_cancel(job)
+        self._patient_search_jobs[combo] = self.after(200, lambda: self.filter_patients(combo))
+
+    def filter_patients(self, combo):
+        """Filtra la lista del combo con el texto escrito"""
+        self._patient_search_jobs.pop(combo, None)
+        search_text = combo.get().strip()
+        if self._parse_patient_id(search_text) is not None:
+            return
+
+        if search_text:
+            patients = self.patient_manager.search_patients(search_text)
+        else:
+            patients = self.patient_manager.list_patients(limit=LIST_PAGE_SIZE)
+        combo['values'] = [f"{p['id']} - {p['nombre']} {p['apellidos']}" for p in patients]
+
+    @staticmethod
+    def _parse_patient_id(text):
+        """Extrae el ID de un texto "id - nombre apellidos" (None si no tiene ese formato)"""
+        patient_id, separator, _ = text.partition(" - ")
+        return int(patient_id) if separator and patient_id.isdigit() else None
+
     def on_patient_selected(self, event=None):
         """Manejador de evento cuando se selecciona un paciente"""
         selected = self.patient_combo.get()
         if selected:
-            self.current_patient_id = int(selected.split(" - ")[0])
+            self.current_patient_id = self._parse_patient_id(selected)
 
     def add_treatment(self):
         """Muestra diálogo para agregar un nuevo tratamiento"""
@@ -591,7 +625,7 @@ class TreatmentsFrame(ttk.Frame):
         try:
             # Obtener paciente seleccionado
             patient_text = self.history_patient_combo.get()
-            patient_id = int(patient_text.split(" - ")[0]) if patient_text else None
+            patient_id = self._parse_patient_id(patient_text) if patient_text else None
 
             # Obtener fechas
             date_from = self.date_from_entry.get().strip()
@@ -631,6 +665,9 @@ class TreatmentsFrame(ttk.Frame):
             # Mostrar en la tabla
             self.history_table.delete(*self.history_table.get_children())
 
+            # Cargar de una vez los pacientes del historial (quedan en la caché)
+            self.patient_manager.get_patients_by_ids(t.get('patient_id') for t in treatments)
+
             for treatment in treatments:
                 self.history_table.insert("", "end", values=(
                     treatment['id'],
@@ -0,0 +1,114 @@
+# =============================================
+# Nombre del archivo: cache.py
+# Propósito: Caché LRU en memoria con caducidad opcional y contadores de uso
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Caché acotada en memoria para registros que se consultan repetidamente desde la
+interfaz (por ejemplo, pacientes por ID). Es segura para usar desde varios hilos.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Valor centinela para distinguir "no está en caché" de un valor None guardado
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Caché LRU (menos usado recientemente) con caducidad opcional por entrada.
+
+    Cuando se supera maxsize se descarta la entrada usada hace más tiempo. Si se
+    indica ttl, las entradas con más de ttl segundos se consideran ausentes.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: Optional[float] = None):
+        """
+        Inicializa la caché.
+
+        Args:
+            maxsize (int): Número máximo de entradas
+            ttl (float): Segundos de validez de cada entrada (None = sin caducidad)
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize debe ser mayor o igual a 1")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Obtiene un valor y lo marca como usado recientemente.
+
+        Args:
+            key: Clave buscada
+            default: Valor devuelto si la clave no está o caducó
+
+        Returns:
+            El valor guardado o default
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                stored_at, value = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Guarda un valor, descartando la entrada menos usada si la caché está llena.
+
+        Args:
+            key: Clave
+            value: Valor a guardar
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Elimina una entrada (si existe)."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Elimina todas las entradas (los contadores se conservan)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de uso.
+
+        Returns:
+            dict: Aciertos, fallos, tasa de aciertos, descartes, tamaño y capacidad
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,184 @@
+# =============================================
+# Nombre del archivo: photo_store.py
+# Propósito: Almacén de fotografías direccionado por contenido
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Almacén de archivos de imagen cuyo nombre es el SHA-256 de su contenido.
+
+Los archivos se reparten en subdirectorios con los dos primeros pares de
+caracteres del hash (ab/cd/abcd...) para no acumular miles de entradas en una
+sola carpeta. Subir dos veces la misma imagen no crea un segundo archivo.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, BinaryIO, Dict, Optional
+
+# Bloque de lectura al calcular el hash
+HASH_CHUNK_SIZE = 1024 * 1024
+# Formato y calidad con los que se guardan las fotos (los de save_image)
+PHOTO_FORMAT = 'JPEG'
+PHOTO_QUALITY = 85
+
+
+class PhotoStore:
+    """Guarda, localiza y borra fotografías por su hash de contenido."""
+
+    def __init__(self, root: str):
+        """
+        Inicializa el almacén.
+
+        Args:
+            root: Directorio raíz del almacén (se crea si no existe)
+        """
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, sha256: str) -> str:
+        """
+        Ruta del archivo correspondiente a un hash.
+
+        Args:
+            sha256: Hash SHA-256 en hexadecimal
+
+        Returns:
+            str: Ruta dentro del almacén (exista o no el archivo)
+        """
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def ingest(self, source_path: str) -> Dict[str, Any]:
+        """
+        Guarda una imagen en el almacén si todavía no está.
+
+        Como hacía save_image, la imagen se vuelve a codificar como JPEG
+        optimizado (calidad PHOTO_QUALITY) para que las fotos de cámara no ocupen
+        varios MB; el hash se calcula sobre el resultado, de modo que la misma
+        imagen sigue guardándose una sola vez. La imagen se escribe en un
+        temporal del mismo directorio y después se renombra, así que nunca queda
+        un archivo a medias con el nombre definitivo. Sin Pillow se guarda una
+        copia exacta del original. Un archivo que ya está en el almacén se
+        devuelve tal cual, sin volver a codificarlo.
+
+        Args:
+            source_path: Ruta de la imagen original
+
+        Returns:
+            dict: sha256, path, size_bytes, width, height, format (las
+                  dimensiones y el formato son None si Pillow no está instalado)
+                  y created (True si el archivo no estaba en el almacén)
+
+        Raises:
+            OSError: Si no se puede leer el original o escribir en el almacén
+            ValueError: Si el archivo no es una imagen válida
+        """
+        info = read_image_info(source_path)
+
+        sha256 = os.path.basename(source_path)
+        if os.path.abspath(source_path) == os.path.abspath(self.path_for(sha256)):
+            # Ya es un archivo del almacén (p. ej. al guardar un paciente sin cambiar su foto)
+            info.update({'sha256': sha256, 'path': self.path_for(sha256),
+                         'size_bytes': os.path.getsize(source_path), 'created': False})
+            return info
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                if info['format'] is not None:
+                    info['format'] = encode_photo(source_path, tmp)
+                else:
+                    with open(source_path, 'rb') as src:
+                        for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b''):
+                            tmp.write(chunk)
+
+            digest = hashlib.sha256()
+            size = 0
+            with open(tmp_path, 'rb') as tmp:
+                for chunk in iter(lambda: tmp.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256)
+            created = not os.path.exists(path)
+            if not created:
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        info.update({'sha256': sha256, 'path': path, 'size_bytes': size, 'created': created})
+        return info
+
+    def remove(self, sha256: str) -> bool:
+        """
+        Borra el archivo de un hash (quien llama comprueba que nadie lo usa).
+
+        Args:
+            sha256: Hash SHA-256 en hexadecimal
+
+        Returns:
+            bool: True si se borró el archivo, False si no existía
+        """
+        try:
+            os.remove(self.path_for(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+
+def read_image_info(path: str) -> Dict[str, Optional[Any]]:
+    """
+    Lee las dimensiones y el formato de una imagen sin decodificarla entera.
+
+    Pillow se importa aquí para que el almacén funcione (sin dimensiones) en
+    instalaciones sin interfaz gráfica.
+
+    Args:
+        path: Ruta de la imagen
+
+    Returns:
+        dict: width, height y format
+
+    Raises:
+        ValueError: Si Pillow está disponible y el archivo no es una imagen
+    """
+    try:
+        from PIL import Image, UnidentifiedImageError
+    except ImportError:
+        return {'width': None, 'height': None, 'format': None}
+
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            return {'width': width, 'height': height, 'format': image.format}
+    except UnidentifiedImageError as e:
+        raise ValueError(f"El archivo no es una imagen válida: {path}") from e
+
+
+def encode_photo(source_path: str, output: BinaryIO) -> str:
+    """
+    Codifica una imagen como JPEG optimizado (sólo se llama si Pillow está instalado).
+
+    Args:
+        source_path: Ruta de la imagen original
+        output: Archivo binario abierto donde escribir la imagen
+
+    Returns:
+        str: Formato de la imagen guardada (PHOTO_FORMAT)
+    """
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        # JPEG no admite transparencia ni paleta
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.save(output, format=PHOTO_FORMAT, optimize=True, quality=PHOTO_QUALITY)
+    return PHOTO_FORMAT
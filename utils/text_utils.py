@@ -0,0 +1,109 @@
+# =============================================
+# Nombre del archivo: text_utils.py
+# Propósito: Normalización de textos para búsquedas (acentos, mayúsculas, teléfonos)
+# Empresa: DiamondNetSolutions
+# Autor: Eliazar
+# =============================================
+
+"""
+Funciones de normalización usadas para generar y consultar las claves de búsqueda
+de pacientes. Las claves guardadas en la base de datos y los textos buscados deben
+pasar por las mismas funciones para que coincidan.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Optional
+
+_WHITESPACE = re.compile(r'\s+')
+_NON_DIGITS = re.compile(r'\D')
+_PHONE_LIKE = re.compile(r'^[\d+\-().\s]+$')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Normaliza un texto para compararlo sin tildes ni mayúsculas.
+
+    "Núñez" -> "nunez", "JOSÉ  María" -> "jose maria".
+
+    Args:
+        text (str): Texto original (None se trata como vacío)
+
+    Returns:
+        str: Texto sin marcas diacríticas, en minúsculas y con espacios simples
+    """
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _WHITESPACE.sub(' ', stripped.casefold()).strip()
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """
+    Reduce un teléfono a sus dígitos: "+34 612-345 678" -> "34612345678".
+
+    Args:
+        phone (str): Teléfono original (None se trata como vacío)
+
+    Returns:
+        str: Sólo los dígitos del teléfono
+    """
+    if not phone:
+        return ''
+    return _NON_DIGITS.sub('', phone)
+
+
+def is_phone_like(text: str) -> bool:
+    """
+    Indica si un texto de búsqueda parece (parte de) un teléfono.
+
+    Args:
+        text (str): Texto a evaluar
+
+    Returns:
+        bool: True si sólo contiene dígitos y separadores habituales y al menos un dígito
+    """
+    return bool(_PHONE_LIKE.match(text)) and any(char.isdigit() for char in text)
+
+
+def patient_search_keys(
+    first_name: Optional[str],
+    last_name: Optional[str],
+    phone: Optional[str],
+    email: Optional[str]
+) -> Dict[str, str]:
+    """
+    Calcula las columnas de búsqueda normalizadas de un paciente.
+
+    Args:
+        first_name (str): Nombre
+        last_name (str): Apellidos
+        phone (str): Teléfono
+        email (str): Correo electrónico
+
+    Returns:
+        dict: Valores de first_name_key, last_name_key, phone_key y email_key
+    """
+    return {
+        'first_name_key': normalize_text(first_name),
+        'last_name_key': normalize_text(last_name),
+        'phone_key': normalize_phone(phone),
+        'email_key': normalize_text(email),
+    }
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """
+    Límite superior exclusivo de las cadenas que empiezan por prefix.
+
+    Permite sustituir "col LIKE 'pre%'" por "col >= 'pre' AND col < 'prf'",
+    que SQLite resuelve con un índice.
+
+    Args:
+        prefix (str): Prefijo no vacío
+
+    Returns:
+        str: El prefijo con su último carácter incrementado
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)